@@ -6,7 +6,7 @@ logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
 from .signal import (Signal, EpicsSignal)
-from .positioner import (EpicsMotor, PVPositioner)
+from .positioner import (EpicsMotor, PVPositioner, PositionerGroup)
 from .pseudopos import PseudoPositioner
 from .scaler import EpicsScaler
 
@@ -0,0 +1,178 @@
+# vi: ts=4 sw=4
+'''
+:mod:`ophyd.control.posgraph` - Positioner dependency graphs
+============================================================
+
+.. module:: ophyd.control.posgraph
+   :synopsis: Ordered updates of nested pseudo positioners
+'''
+
+from __future__ import print_function
+import logging
+import threading
+
+from collections import OrderedDict
+
+
+logger = logging.getLogger(__name__)
+
+
+def _pseudo_dependencies(pseudo):
+    '''The pseudo positioners that a pseudo positioner is built upon'''
+    deps = []
+    for real in pseudo._real:
+        # PseudoSingle axes depend on their master
+        master = getattr(real, '_master', real)
+        if hasattr(master, '_real') and master not in deps:
+            deps.append(master)
+
+    return deps
+
+
+class PositionerGraph(object):
+    '''A dependency graph over nested pseudo positioners
+
+    When pseudo positioners are built upon other pseudo positioners (or
+    their :class:`PseudoSingle` axes), a single real positioner update
+    would otherwise cascade through the subscriptions once per path,
+    recalculating dependent positioners several times with partially
+    updated inputs.
+
+    Pseudo positioners in a graph instead only mark themselves as stale when
+    an input changes. Stale positioners are then recalculated once each, in
+    topological order, so every recalculation sees consistent inputs.
+
+    Parameters
+    ----------
+    positioners : sequence of PseudoPositioner, optional
+        Pseudo positioners to add
+
+    Attributes
+    ----------
+    evaluations : int
+        Number of pseudo position recalculations performed
+    '''
+
+    def __init__(self, positioners=None):
+        self._lock = threading.RLock()
+        self._deps = OrderedDict()
+        self._rank = {}
+        self._dirty = set()
+        self._propagating = False
+        self.evaluations = 0
+
+        if positioners is not None:
+            for pseudo in positioners:
+                self.add(pseudo)
+
+    def __repr__(self):
+        names = [pseudo.name for pseudo in self.order]
+        return '{}(positioners={!r})'.format(self.__class__.__name__, names)
+
+    def __contains__(self, pseudo):
+        return pseudo in self._deps
+
+    def add(self, pseudo):
+        '''Add a pseudo positioner, and everything it depends on, to the
+        graph
+
+        Pseudo positioners belonging to another graph are moved (along with
+        the rest of that graph) into this one.
+        '''
+        with self._lock:
+            pending = [pseudo]
+            while pending:
+                node = pending.pop()
+                if node in self._deps:
+                    continue
+
+                other = node._graph
+                if other is not None and other is not self:
+                    pending.extend(other.order)
+
+                deps = _pseudo_dependencies(node)
+                self._deps[node] = deps
+                node._graph = self
+                pending.extend(deps)
+
+            self._sort()
+
+    def _sort(self):
+        '''Topologically sort the pseudo positioners'''
+        order = []
+        state = {}
+
+        def visit(node):
+            mark = state.get(node)
+            if mark == 'done':
+                return
+            elif mark == 'visiting':
+                raise ValueError('Pseudo positioner dependency cycle at %s' %
+                                 node.name)
+
+            state[node] = 'visiting'
+            for dep in self._deps[node]:
+                visit(dep)
+
+            state[node] = 'done'
+            order.append(node)
+
+        for node in self._deps:
+            visit(node)
+
+        self._rank = dict((node, i) for i, node in enumerate(order))
+
+    @property
+    def order(self):
+        '''Pseudo positioners, in update (topological) order'''
+        return sorted(self._deps, key=self._rank.get)
+
+    @property
+    def dependencies(self):
+        '''Dictionary of pseudo positioner name to the names of the pseudo
+        positioners it depends on, in update order'''
+        return OrderedDict((node.name, [dep.name for dep in self._deps[node]])
+                           for node in self.order)
+
+    def dependents(self, pseudo):
+        '''Pseudo positioners which depend (directly) on `pseudo`'''
+        return [node for node in self.order if pseudo in self._deps[node]]
+
+    def _input_changed(self, pseudo):
+        '''An input of `pseudo` has changed; recalculate stale positioners
+        in order'''
+        with self._lock:
+            self._dirty.add(pseudo)
+            if self._propagating:
+                # Picked up by the update already in progress
+                return
+
+            self._propagating = True
+
+        try:
+            while True:
+                with self._lock:
+                    if not self._dirty:
+                        self._propagating = False
+                        return
+
+                    node = min(self._dirty, key=self._rank.get)
+                    self._dirty.remove(node)
+
+                # Recalculating may mark dependents as stale, which are
+                # necessarily later in the order
+                node._update_position()
+                self.evaluations += 1
+        except:
+            with self._lock:
+                self._propagating = False
+            raise
+
+    def update_all(self):
+        '''Recalculate every pseudo positioner, in order'''
+        with self._lock:
+            self._dirty.update(self._deps)
+            order = self.order
+
+        if order:
+            self._input_changed(order[0])
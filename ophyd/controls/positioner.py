@@ -8,15 +8,23 @@
 '''
 
 from __future__ import print_function
+import functools
+import itertools
 import logging
+import threading
 import time
 import warnings
+from collections import (OrderedDict, deque)
+
 import numpy as np
 
+import epics
+from epics.ca import CAThread
 from epics.pv import fmt_time
 
 from .signal import (EpicsSignal, SignalGroup)
 from ..utils import TimeoutError
+from ..utils.buffers import TimestampedBuffer
 from ..utils.epics_pvs import record_field
 
 logger = logging.getLogger(__name__)
@@ -34,6 +42,8 @@ class MoveStatus(object):
         Whether or not the motion has already completed
     start_ts : float, optional
         The motion start timestamp
+    timeout : float, optional
+        Time after which the motion is considered to have timed out
 
     Attributes
     ----------
@@ -50,10 +60,12 @@ class MoveStatus(object):
         The final position
     success : bool
         Motion successfully completed
+    superseded : bool
+        The move was replaced by a newer request before completing
     '''
 
     def __init__(self, positioner, target, done=False,
-                 start_ts=None):
+                 start_ts=None, timeout=None):
         if start_ts is None:
             start_ts = time.time()
 
@@ -64,6 +76,12 @@ class MoveStatus(object):
         self.start_ts = start_ts
         self.finish_ts = None
         self.finish_pos = None
+        self.superseded = False
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._callbacks = []
 
     @property
     def error(self):
@@ -78,10 +96,54 @@ class MoveStatus(object):
             return None
 
     def _finished(self, success=True, **kwargs):
-        self.done = True
-        self.success = success
-        self.finish_ts = kwargs.get('timestamp', time.time())
-        self.finish_pos = self.pos.position
+        with self._lock:
+            self.done = True
+            self.success = success
+            self.finish_ts = kwargs.get('timestamp', time.time())
+            self.finish_pos = self.pos.position
+
+            callbacks, self._callbacks = self._callbacks, []
+
+        self._event.set()
+        for cb in callbacks:
+            try:
+                cb(self)
+            except Exception as ex:
+                logger.error('Move status callback failed (%s)' % self,
+                             exc_info=ex)
+
+    def add_callback(self, cb):
+        '''Call `cb(status)` when the motion completes
+
+        If the motion has already completed, `cb` is called immediately.
+        '''
+        with self._lock:
+            if not self.done:
+                self._callbacks.append(cb)
+                return
+
+        cb(self)
+
+    def wait(self, timeout=None):
+        '''Block until the motion completes
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time to wait, in seconds
+
+        Returns
+        -------
+        done : bool
+            Whether the motion completed within the timeout
+        '''
+        return self._event.wait(timeout) or self.done
+
+    @property
+    def timed_out(self):
+        '''The motion has not completed within the timeout'''
+        return (not self.done and self.timeout is not None and
+                self.elapsed > self.timeout)
 
     @property
     def elapsed(self):
@@ -98,6 +160,407 @@ class MoveStatus(object):
     __repr__ = __str__
 
 
+class CoalescingMover(object):
+    '''Latest-wins move requests for a rapidly re-commanded positioner
+
+    Feedback loops and GUI controls may request new targets far faster than
+    a positioner (or the IOC behind it) can usefully follow. Requests made
+    through this object replace any pending request, and moves are issued
+    to the positioner at no more than `max_rate`.
+
+    Statuses of requests which are replaced (either before being issued, or
+    while in motion) complete with `success=False` and `superseded=True`.
+
+    Parameters
+    ----------
+    positioner : Positioner
+    max_rate : float, optional
+        Maximum rate (in Hz) at which moves are issued
+
+    Attributes
+    ----------
+    requested : int
+        Number of move requests
+    issued : int
+        Number of moves issued to the positioner
+    superseded : int
+        Number of requests replaced by newer ones
+    '''
+
+    def __init__(self, positioner, max_rate=10.0):
+        self.pos = positioner
+        self.max_rate = float(max_rate)
+        self.requested = 0
+        self.issued = 0
+        self.superseded = 0
+
+        self._cond = threading.Condition()
+        self._pending = None
+        self._in_flight = None
+        self._last_issued = 0.0
+        self._thread = None
+        self._running = False
+
+    def __repr__(self):
+        return '{0}(positioner={1.pos!r}, max_rate={1.max_rate!r})' \
+               ''.format(self.__class__.__name__, self)
+
+    def move(self, position, moved_cb=None, **kwargs):
+        '''Request a move to a position, replacing any pending request
+
+        Keyword arguments are passed on to :func:`Positioner.move`
+
+        Parameters
+        ----------
+        position
+            Position to move to
+        moved_cb : callable, optional
+            Called when this request has finished (or been superseded)
+
+        Returns
+        -------
+        status : MoveStatus
+        '''
+        status = MoveStatus(self.pos, position)
+
+        with self._cond:
+            replaced = self._pending
+            if replaced is not None:
+                self.superseded += 1
+
+            self._pending = (position, status, moved_cb, kwargs)
+            self.requested += 1
+
+            if not self._running:
+                self._start()
+
+            self._cond.notify()
+
+        if replaced is not None:
+            self._supersede(replaced)
+
+        return status
+
+    def _supersede(self, request):
+        '''Finish a replaced request
+
+        Called without the lock held, as the callbacks may request further
+        moves.
+        '''
+        position, status, moved_cb, kwargs = request
+        status.superseded = True
+        status._finished(success=False)
+
+        if moved_cb is not None:
+            moved_cb(obj=self.pos, success=False, superseded=True)
+
+    def _start(self):
+        self._running = True
+        self._thread = CAThread(target=self._issue_loop,
+                                name='%s mover' % self.pos.name)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        '''Drop any pending request and stop the issuing thread'''
+        with self._cond:
+            replaced, self._pending = self._pending, None
+            if replaced is not None:
+                self.superseded += 1
+
+            self._running = False
+            self._cond.notify()
+
+        if replaced is not None:
+            self._supersede(replaced)
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _issue_loop(self):
+        period = 1.0 / self.max_rate if self.max_rate > 0 else 0.0
+
+        while True:
+            with self._cond:
+                while self._running and self._pending is None:
+                    self._cond.wait()
+
+                if not self._running:
+                    return
+
+                # Bound the issue rate; newer requests arriving while waiting
+                # replace the pending one
+                remaining = self._last_issued + period - time.time()
+                while self._running and remaining > 0:
+                    self._cond.wait(remaining)
+                    remaining = self._last_issued + period - time.time()
+
+                if not self._running or self._pending is None:
+                    continue
+
+                position, status, moved_cb, kwargs = self._pending
+                self._pending = None
+
+                in_flight = self._in_flight
+                if in_flight is not None and not in_flight.done:
+                    # Issuing the next move finishes the in-flight request
+                    # unsuccessfully
+                    in_flight.superseded = True
+                    self.superseded += 1
+
+                self._in_flight = status
+                self._last_issued = time.time()
+                self.issued += 1
+
+            self._issue(position, status, moved_cb, kwargs)
+
+    def _issue(self, position, status, moved_cb, kwargs):
+        def finished(**cb_kwargs):
+            status._finished(**cb_kwargs)
+
+            if moved_cb is not None:
+                moved_cb(superseded=status.superseded, **cb_kwargs)
+
+        try:
+            self.pos.move(position, wait=False, moved_cb=finished, **kwargs)
+        except Exception as ex:
+            logger.error('Failed to move %s to %s' % (self.pos, position),
+                         exc_info=ex)
+            status._finished(success=False)
+
+
+class MotionModel(object):
+    '''A motion time model for a positioner
+
+    Moves follow a trapezoidal velocity profile, with optional backlash
+    correction and a fixed settle time.  All methods accept scalars or
+    numpy arrays.
+
+    Parameters
+    ----------
+    velocity : float, optional
+        Velocity in engineering units per second. If None or 0, moves take
+        only the settle time.
+    acceleration : float, optional
+        Time taken to reach full velocity, in seconds (as with the EPICS
+        motor record ACCL field)
+    backlash : float, optional
+        Backlash distance. Its sign gives the direction of the final
+        approach (as with the motor record BDST field)
+    settle_time : float, optional
+        Time added to each move, in seconds
+    '''
+
+    def __init__(self, velocity=None, acceleration=0.0, backlash=0.0,
+                 settle_time=0.0):
+        self.velocity = velocity
+        self.acceleration = float(acceleration)
+        self.backlash = float(backlash)
+        self.settle_time = float(settle_time)
+
+    def __repr__(self):
+        return ('{0}(velocity={1.velocity!r}, acceleration={1.acceleration!r}, '
+                'backlash={1.backlash!r}, settle_time={1.settle_time!r})'
+                ''.format(self.__class__.__name__, self))
+
+    def _profile_time(self, distance):
+        '''Time for a single trapezoidal move over `distance`'''
+        if not self.velocity:
+            return np.zeros_like(distance)
+
+        velocity = abs(float(self.velocity))
+        accel_time = self.acceleration
+        if accel_time <= 0.0:
+            return distance / velocity
+
+        # Distance covered while accelerating and decelerating
+        ramp_distance = velocity * accel_time
+        return np.where(distance >= ramp_distance,
+                        distance / velocity + accel_time,
+                        2.0 * np.sqrt(distance * accel_time / velocity))
+
+    def move_time(self, start, target):
+        '''Estimated time to move from `start` to `target`, in seconds'''
+        delta = np.asarray(target, dtype=float) - np.asarray(start, dtype=float)
+        distance = np.abs(delta)
+
+        if self.backlash:
+            bdst = abs(self.backlash)
+            # Moves against the final approach direction overshoot by the
+            # backlash distance and come back
+            against = (np.sign(delta) == -np.sign(self.backlash))
+            main = np.where(against, distance + bdst,
+                            np.maximum(distance - bdst, 0.0))
+            final = np.where(against, bdst, np.minimum(distance, bdst))
+            t = self._profile_time(main) + self._profile_time(final)
+        else:
+            t = self._profile_time(distance)
+
+        t = t + self.settle_time
+        if np.ndim(t) == 0:
+            return float(t)
+        return t
+
+
+class FlyCapture(object):
+    '''Buffered capture of a positioner's readback and detector monitors
+    during a single continuous (fly) move
+
+    Parameters
+    ----------
+    positioner : Positioner
+    detectors : list of Signal or SignalGroup, optional
+        Detectors to capture. Their monitor (value) updates are recorded,
+        so they should be free-running during the move.
+    capacity : int, optional
+        Number of samples to preallocate per buffer
+
+    Attributes
+    ----------
+    pos : Positioner
+    readback : TimestampedBuffer
+        The positioner readback values
+    detectors : OrderedDict
+        Detector signal name to TimestampedBuffer
+    '''
+
+    def __init__(self, positioner, detectors=None, capacity=4096):
+        self.pos = positioner
+        self.readback = TimestampedBuffer(capacity)
+        self.detectors = OrderedDict()
+        self._signals = []
+
+        if detectors is None:
+            detectors = []
+
+        for det in detectors:
+            if isinstance(det, SignalGroup):
+                signals = det.signals
+            else:
+                signals = [det]
+
+            for sig in signals:
+                shape = np.shape(sig.value)
+                buf = TimestampedBuffer(capacity, shape=shape)
+                self.detectors[sig.name] = buf
+                self._signals.append((sig, buf))
+
+    def start(self):
+        '''Start capturing readback and detector updates'''
+        self.readback.append(self.pos.position, time.time())
+        self.pos.subscribe(self.readback.capture,
+                           event_type=self.pos.SUB_READBACK, run=False)
+
+        for sig, buf in self._signals:
+            sig.subscribe(buf.capture, event_type=sig.SUB_VALUE, run=False)
+
+    def stop(self):
+        '''Stop capturing'''
+        self.pos.clear_sub(self.readback.capture,
+                           event_type=self.pos.SUB_READBACK)
+
+        for sig, buf in self._signals:
+            sig.clear_sub(buf.capture, event_type=sig.SUB_VALUE)
+
+        self.readback.append(self.pos.position, time.time())
+
+    def positions_at(self, timestamps):
+        '''Positioner positions at the given times, interpolated from the
+        captured readback'''
+        rb_ts = self.readback.timestamps
+        order = np.argsort(rb_ts, kind='mergesort')
+        return np.interp(timestamps, rb_ts[order],
+                         self.readback.values[order])
+
+    def times_at(self, positions):
+        '''Times at which the positioner passed the given positions,
+        interpolated from the captured readback'''
+        rb_values = self.readback.values
+        order = np.argsort(rb_values, kind='mergesort')
+        return np.interp(positions, rb_values[order],
+                         self.readback.timestamps[order])
+
+    def _interpolate(self, grid, buf):
+        positions = self.positions_at(buf.timestamps)
+        order = np.argsort(positions, kind='mergesort')
+        positions = positions[order]
+        values = buf.values[order].reshape(len(buf), -1)
+
+        ret = np.empty((len(grid), values.shape[1]))
+        for col in range(values.shape[1]):
+            ret[:, col] = np.interp(grid, positions, values[:, col])
+
+        return ret.reshape((len(grid), ) + buf.values.shape[1:])
+
+    def _bin(self, grid, buf):
+        positions = self.positions_at(buf.timestamps)
+        values = buf.values.reshape(len(buf), -1).astype(float)
+
+        # Bin edges are the midpoints between (sorted) grid points
+        order = np.argsort(grid, kind='mergesort')
+        sorted_grid = grid[order]
+        edges = (sorted_grid[1:] + sorted_grid[:-1]) / 2.
+        idx = order[np.searchsorted(edges, positions)]
+
+        sums = np.zeros((len(grid), values.shape[1]))
+        np.add.at(sums, idx, values)
+        counts = np.bincount(idx, minlength=len(grid)).astype(float)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ret = sums / counts[:, np.newaxis]
+
+        return ret.reshape((len(grid), ) + buf.values.shape[1:])
+
+    def reconstruct(self, grid, mode='interpolate'):
+        '''Map the captured detector data onto a position grid
+
+        Parameters
+        ----------
+        grid : array-like
+            Monotonic positions to map onto
+        mode : {'interpolate', 'bin'}, optional
+            Interpolate each detector onto the grid, or average all samples
+            falling within the bin around each grid point (empty bins are
+            NaN)
+
+        Returns
+        -------
+        data : dict
+            {name: ndarray} including the positioner grid
+        '''
+        grid = np.asarray(grid, dtype=float)
+
+        if mode == 'interpolate':
+            method = self._interpolate
+        elif mode == 'bin':
+            method = self._bin
+        else:
+            raise ValueError('Unknown reconstruction mode: %s' % mode)
+
+        data = OrderedDict()
+        data[self.pos.name] = grid
+        for name, buf in self.detectors.items():
+            if len(buf) == 0:
+                data[name] = np.nan * np.ones(len(grid))
+            else:
+                data[name] = method(grid, buf)
+
+        return data
+
+
+def _indexable(traj):
+    '''Whether a trajectory supports len() and slicing'''
+    return hasattr(traj, '__len__') and hasattr(traj, '__getitem__')
+
+
+def _iter_from(traj, index, chunk_size=65536):
+    '''Iterate over an indexable trajectory from a point index on, in chunks'''
+    for start in range(index, len(traj), chunk_size):
+        for position in traj[start:start + chunk_size]:
+            yield position
+
+
 class Positioner(SignalGroup):
     '''A soft positioner.
 
@@ -109,6 +572,17 @@ class Positioner(SignalGroup):
     SUB_READBACK = 'readback'
     _SUB_REQ_DONE = '_req_done'  # requested move finished subscription
 
+    # Move timeouts are the estimated move time scaled by the safety factor,
+    # plus a fixed allowance for channel access latency and motion start.
+    # Without a motion model velocity, the default timeout is used.
+    timeout_factor = 2.0
+    timeout_allowance = 2.0
+    default_timeout = 30.0
+
+    # Trajectories which can not be indexed (e.g., generators) can only be
+    # rewound by this many points
+    rewind_limit = 16
+
     def __init__(self, *args, **kwargs):
         SignalGroup.__init__(self, *args, **kwargs)
 
@@ -118,9 +592,11 @@ class Positioner(SignalGroup):
         self._position = None
         self._timeout = kwargs.get('timeout', 0.0)
         self._trajectory = None
-        self._trajectory_idx = None
-        self._followed = []
+        self._trajectory_source = None
+        self._trajectory_idx = 0
+        self._recent = None
         self._egu = kwargs.get('egu', '')
+        self._motion_model = None
 
     def set_trajectory(self, traj):
         '''Set the trajectory of the motion
@@ -130,8 +606,115 @@ class Positioner(SignalGroup):
         traj : iterable
             Sequence of positions to follow
         '''
+        self._trajectory_source = traj
         self._trajectory = iter(traj)
-        self._followed = []
+        self._trajectory_idx = 0
+
+        if _indexable(traj):
+            self._recent = None
+        else:
+            self._recent = deque(maxlen=self.rewind_limit)
+
+    @property
+    def trajectory_index(self):
+        '''The number of trajectory points followed so far'''
+        return self._trajectory_idx
+
+    def rewind_trajectory(self, index):
+        '''Return to an earlier point in the trajectory
+
+        The points followed from `index` onward are followed again, in
+        order, by subsequent calls to :func:`move_next`. Indexable
+        trajectories (sequences, arrays or a
+        :class:`~ophyd.userapi.scan_api.GridPath`) are resumed from the
+        index; others only keep the last `rewind_limit` points followed.
+
+        Parameters
+        ----------
+        index : int
+            The number of trajectory points to keep as followed
+        '''
+        if self._trajectory is None:
+            raise ValueError('Trajectory unset')
+
+        index = int(index)
+        if not 0 <= index <= self._trajectory_idx:
+            raise ValueError('Invalid trajectory index %d (%d points followed)'
+                             % (index, self._trajectory_idx))
+
+        if self._recent is None:
+            self._trajectory = _iter_from(self._trajectory_source, index)
+        else:
+            count = self._trajectory_idx - index
+            if count > len(self._recent):
+                raise ValueError('Unable to rewind a trajectory by more than '
+                                 '%d points' % len(self._recent))
+
+            repeat = [self._recent.pop() for i in range(count)]
+            self._trajectory = itertools.chain(reversed(repeat),
+                                               self._trajectory)
+
+        self._trajectory_idx = index
+
+    @property
+    def motion_model(self):
+        '''The :class:`MotionModel` used to estimate move times'''
+        if self._motion_model is None:
+            self._motion_model = MotionModel()
+        return self._motion_model
+
+    @motion_model.setter
+    def motion_model(self, model):
+        self._motion_model = model
+
+    @property
+    def _move_time_known(self):
+        '''Whether move times can be estimated from the motion model'''
+        return bool(self.motion_model.velocity)
+
+    def move_timeout(self, position, start=None):
+        '''The timeout for a move to a position
+
+        Computed from the estimated move time (see
+        :func:`estimate_move_time`) as::
+
+            timeout_factor * move_time + timeout_allowance
+
+        If no motion model velocity is available, `default_timeout` is
+        used instead.
+
+        Parameters
+        ----------
+        position
+            The target position
+        start : optional
+            The starting position. Defaults to the current position.
+        '''
+        if not self._move_time_known:
+            return self.default_timeout
+
+        move_time = self.estimate_move_time(position, start)
+        return self.timeout_factor * move_time + self.timeout_allowance
+
+    def estimate_move_time(self, position, start=None):
+        '''Estimate the time taken to move to a position
+
+        Parameters
+        ----------
+        position : float or ndarray
+            The target position(s)
+        start : float or ndarray, optional
+            The starting position(s). Defaults to the current position.
+
+        Returns
+        -------
+        float or ndarray
+            Estimated move time(s), in seconds
+        '''
+        if start is None:
+            start = self.position
+
+        return self.motion_model.move_time(start, position)
 
     @property
     def egu(self):
@@ -161,7 +744,10 @@ class Positioner(SignalGroup):
         except StopIteration:
             return None
 
-        self._followed.append(next_pos)
+        self._trajectory_idx += 1
+        if self._recent is not None:
+            self._recent.append(next_pos)
+
         return next_pos
 
     def move_next(self, **kwargs):
@@ -174,7 +760,7 @@ class Positioner(SignalGroup):
         return pos, ret
 
     def move(self, position, wait=True,
-             moved_cb=None, timeout=30.0):
+             moved_cb=None, timeout=None):
         '''Move to a specified position, optionally waiting for motion to
         complete.
 
@@ -187,15 +773,19 @@ class Positioner(SignalGroup):
         moved_cb : callable
             Call this callback when movement has finished (not applicable if
             `wait` is set)
-        timeout : float
-            Timeout in seconds
+        timeout : float, optional
+            Timeout in seconds. If None, it is computed from the distance and
+            the motion model (see :func:`move_timeout`).  Asynchronous moves
+            report the timeout via :attr:`MoveStatus.timed_out`.
 
         Raises
         ------
         TimeoutError, ValueError (on invalid positions)
         '''
-        self._run_subs(sub_type=self._SUB_REQ_DONE, success=False)
-        self._reset_sub(self._SUB_REQ_DONE)
+        self._run_req_done(success=False)
+
+        if timeout is None:
+            timeout = self.move_timeout(position)
 
         if wait:
             t0 = time.time()
@@ -222,28 +812,72 @@ class Positioner(SignalGroup):
                 self.subscribe(moved_cb, event_type=self._SUB_REQ_DONE,
                                run=False)
 
-            status = MoveStatus(self, position)
+            status = MoveStatus(self, position, timeout=timeout)
             self.subscribe(status._finished,
                            event_type=self._SUB_REQ_DONE, run=False)
 
             return status
 
+    def fly(self, position, detectors=None, capacity=4096, **kwargs):
+        '''Perform a single continuous move, capturing the readback and
+        detector monitor updates along the way
+
+        Keyword arguments are passed on to :func:`move`
+
+        Parameters
+        ----------
+        position
+            Position to move to
+        detectors : list of Signal or SignalGroup, optional
+            Free-running detectors to capture
+        capacity : int, optional
+            Number of samples to preallocate per buffer
+
+        Returns
+        -------
+        capture : FlyCapture
+        '''
+        capture = FlyCapture(self, detectors, capacity=capacity)
+        capture.start()
+
+        try:
+            self.move(position, wait=True, **kwargs)
+        finally:
+            capture.stop()
+
+        return capture
+
     def _done_moving(self, timestamp=None, value=None, **kwargs):
         '''Call when motion has completed.  Runs SUB_DONE subscription.'''
 
         self._run_subs(sub_type=self.SUB_DONE, timestamp=timestamp,
                        value=value, **kwargs)
 
-        self._run_subs(sub_type=self._SUB_REQ_DONE, timestamp=timestamp,
-                       value=value, success=True,
-                       **kwargs)
-        self._reset_sub(self._SUB_REQ_DONE)
+        self._run_req_done(timestamp=timestamp, value=value, success=True,
+                           **kwargs)
+
+    def _run_req_done(self, **kwargs):
+        '''Run the requested move finished subscriptions, once
+
+        The subscriptions are removed before they run: a callback may wake
+        a thread which requests the next move, and the subscriptions of
+        that move have to survive.
+        '''
+        subs = self._subs[self._SUB_REQ_DONE]
+        self._subs[self._SUB_REQ_DONE] = []
+
+        kwargs['sub_type'] = self._SUB_REQ_DONE
+        kwargs.setdefault('obj', self)
+        if kwargs.get('timestamp') is None:
+            kwargs['timestamp'] = time.time()
+
+        for cb in subs:
+            self._run_sub(cb, **kwargs)
 
     def stop(self):
         '''Stops motion'''
 
-        self._run_subs(sub_type=self._SUB_REQ_DONE, success=False)
-        self._reset_sub(self._SUB_REQ_DONE)
+        self._run_req_done(success=False)
 
     @property
     def position(self):
@@ -339,6 +973,36 @@ class EpicsMotor(Positioner):
 
         Positioner.stop(self)
 
+    @property
+    def motion_model(self):
+        '''The :class:`MotionModel` used to estimate move times
+
+        Built from the velocity (VELO), acceleration (ACCL), backlash
+        distance (BDST) and readback settle time (DLY) fields on first
+        access, and cached. See :func:`refresh_motion_model`.
+        '''
+        if self._motion_model is None:
+            self.refresh_motion_model()
+        return self._motion_model
+
+    @motion_model.setter
+    def motion_model(self, model):
+        self._motion_model = model
+
+    def refresh_motion_model(self):
+        '''Re-read the motion parameters from the motor record'''
+        def get_field(field, default=0.0):
+            value = epics.caget(self.field_pv(field))
+            if value is None:
+                return default
+            return value
+
+        self._motion_model = MotionModel(velocity=get_field('VELO', None),
+                                         acceleration=get_field('ACCL'),
+                                         backlash=get_field('BDST'),
+                                         settle_time=get_field('DLY'))
+        return self._motion_model
+
     @property
     def record(self):
         '''The EPICS record name'''
@@ -348,16 +1012,22 @@ class EpicsMotor(Positioner):
         '''Return a full PV from the field name'''
         return record_field(self._record, field)
 
-    def move(self, position, wait=True,
+    def move(self, position, wait=True, timeout=None,
              **kwargs):
 
         self._started_moving = False
 
+        if timeout is None:
+            timeout = self.move_timeout(position)
+
         try:
-            self._user_setpoint.put(position, wait=wait)
+            if wait:
+                self._user_setpoint.put(position, wait=True, timeout=timeout)
+            else:
+                self._user_setpoint.put(position, wait=False)
 
             return Positioner.move(self, position, wait=wait,
-                                   **kwargs)
+                                   timeout=timeout, **kwargs)
         except KeyboardInterrupt:
             self.stop()
 
@@ -432,6 +1102,12 @@ class PVPositioner(Positioner):
         Time to wait after a move to ensure a move complete callback is received
     limits : 2-element sequence, optional
         (low_limit, high_limit)
+    velocity : float, optional
+        Approximate velocity in engineering units per second, used only to
+        estimate move times
+    acceleration : float, optional
+        Approximate time to reach full velocity, used only to estimate move
+        times
     '''
 
     def __init__(self, setpoint, readback=None,
@@ -441,6 +1117,8 @@ class PVPositioner(Positioner):
                  put_complete=False,
                  settle_time=0.05,
                  limits=None,
+                 velocity=None,
+                 acceleration=0.0,
                  **kwargs):
 
         Positioner.__init__(self, **kwargs)
@@ -450,6 +1128,9 @@ class PVPositioner(Positioner):
         self._act_val = act_val
         self._put_complete = bool(put_complete)
         self._settle_time = float(settle_time)
+        self._motion_model = MotionModel(velocity=velocity,
+                                         acceleration=acceleration,
+                                         settle_time=self._settle_time)
 
         self._actuate = None
         self._stop = None
@@ -564,8 +1245,13 @@ class PVPositioner(Positioner):
                 logger.debug('Actuating: %s = %s' % (self._actuate.setpoint_pvname,
                                                      self._act_val))
 
-    def _move_async(self, position, **kwargs):
-        '''Move and do not wait until motion is complete (asynchronous)'''
+    def _move_async(self, position, actuate=True, **kwargs):
+        '''Move and do not wait until motion is complete (asynchronous)
+
+        If `actuate` is not set, only the setpoint is written; the caller is
+        then responsible for actuating the motion (see
+        :class:`PositionerGroup`).
+        '''
         self._started_moving = False
 
         def done_moving(**kwargs):
@@ -577,7 +1263,9 @@ class PVPositioner(Positioner):
             # No done signal, so we rely on put completion
             self._move_changed(value=True)
 
-        if self._actuate is not None:
+        if not actuate:
+            self._setpoint.put(position, wait=False)
+        elif self._actuate is not None:
             self._setpoint.put(position, wait=False)
             self._actuate.put(self._act_val, wait=False,
                               callback=done_moving)
@@ -585,7 +1273,10 @@ class PVPositioner(Positioner):
             self._setpoint.put(position, wait=False,
                                callback=done_moving)
 
-    def move(self, position, wait=True, **kwargs):
+    def move(self, position, wait=True, actuate=True, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.move_timeout(position)
+
         if wait:
             try:
                 self._move_wait(position, **kwargs)
@@ -598,7 +1289,7 @@ class PVPositioner(Positioner):
                 # Setup the async retval first
                 ret = Positioner.move(self, position, wait=False, **kwargs)
 
-                self._move_async(position, **kwargs)
+                self._move_async(position, actuate=actuate, **kwargs)
                 return ret
             except KeyboardInterrupt:
                 self.stop()
@@ -661,3 +1352,192 @@ class PVPositioner(Positioner):
         repr.append('limits={0._limits!r}'.format(self))
 
         return self._get_repr(repr)
+
+
+class PositionerGroup(Positioner):
+    '''A group of positioners moved together, with a single status
+
+    All targets are validated before any motion starts, then all setpoints
+    are written back-to-back. Optionally, a shared actuation PV can be used
+    to start all motion at once.
+
+    Parameters
+    ----------
+    positioners : sequence of Positioner
+        The positioners to move together
+    act : str, optional
+        A shared actuation PV, written after all setpoints. All positioners
+        must then be :class:`PVPositioner`s with a `done` PV.
+    act_val : any, optional
+        The actuation value
+    '''
+
+    def __init__(self, positioners, act=None, act_val=1, **kwargs):
+        Positioner.__init__(self, **kwargs)
+
+        self._positioners = list(positioners)
+        self._act_val = act_val
+        self._actuate = None
+        self._waiting = []
+        self._failed = False
+        self._move_id = 0
+        self._status_lock = threading.Lock()
+
+        if not self._positioners:
+            raise ValueError('Must have at least 1 positioner')
+
+        if act is not None:
+            for pos in self._positioners:
+                if not isinstance(pos, PVPositioner) or pos._done is None:
+                    raise ValueError('Shared actuation requires PVPositioners '
+                                     'with a done PV (%s)' % pos)
+
+            self.add_signal(EpicsSignal(act, alias='_actuate'))
+
+    def __repr__(self):
+        repr = ['positioners={0._positioners!r}'.format(self)]
+        if self._actuate is not None:
+            repr.append('act={0._actuate.pvname!r}'.format(self))
+            repr.append('act_val={0._act_val!r}'.format(self))
+
+        return self._get_repr(repr)
+
+    @property
+    def positioners(self):
+        '''The positioners in the group'''
+        return list(self._positioners)
+
+    @property
+    def position(self):
+        return [pos.position for pos in self._positioners]
+
+    @property
+    def moving(self):
+        return any(pos.moving for pos in self._positioners)
+
+    def check_value(self, position):
+        '''Check that all target positions are valid
+
+        Raises
+        ------
+        ValueError
+        '''
+        if len(position) != len(self._positioners):
+            raise ValueError('Number of positions and positioners does not match')
+
+        for pos, value in zip(self._positioners, position):
+            pos.check_value(value)
+
+    @property
+    def _move_time_known(self):
+        return all(pos._move_time_known for pos in self._positioners)
+
+    def estimate_move_time(self, position, start=None):
+        if start is None:
+            start = self.position
+
+        return max(pos.estimate_move_time(target, begin)
+                   for pos, target, begin in zip(self._positioners, position,
+                                                 start))
+
+    def _member_finished(self, pos, move_id, success=True, **kwargs):
+        with self._status_lock:
+            if move_id != self._move_id or pos not in self._waiting:
+                # Finished callback from a previous group move
+                return
+
+            self._waiting.remove(pos)
+            if not success:
+                self._failed = True
+
+            if self._waiting:
+                return
+
+            failed = self._failed
+
+        if failed:
+            self._run_req_done(success=False)
+        else:
+            self._done_moving()
+
+    def move(self, position, wait=True, moved_cb=None, timeout=None,
+             **kwargs):
+        '''Move all positioners, optionally waiting for all motion to
+        complete
+
+        Keyword arguments are passed on to the positioners' move methods
+
+        Parameters
+        ----------
+        position : sequence
+            Positions to move to, in the order of the positioners
+        wait : bool
+            Wait for move completion
+        moved_cb : callable
+            Call this callback when all movement has finished (not
+            applicable if `wait` is set)
+        timeout : float, optional
+            Timeout in seconds. If None, it is computed from the distance and
+            the motion models of the positioners.
+
+        Returns
+        -------
+        status : MoveStatus
+            The aggregated status (if not waiting)
+
+        Raises
+        ------
+        TimeoutError, ValueError (on invalid positions), RuntimeError (if
+        any positioner failed to complete its move)
+        '''
+        position = list(position)
+        self.check_value(position)
+
+        if timeout is None:
+            timeout = self.move_timeout(position)
+
+        status = Positioner.move(self, position, wait=False,
+                                 moved_cb=moved_cb, timeout=timeout)
+
+        with self._status_lock:
+            self._move_id += 1
+            move_id = self._move_id
+            self._failed = False
+            self._waiting[:] = self._positioners
+
+        if self._actuate is not None:
+            kwargs['actuate'] = False
+
+        try:
+            for pos, value in zip(self._positioners, position):
+                moved = functools.partial(self._member_finished, pos,
+                                          move_id)
+                pos.move(value, wait=False, moved_cb=moved, **kwargs)
+
+            if self._actuate is not None:
+                self._actuate.put(self._act_val, wait=False)
+        except KeyboardInterrupt:
+            self.stop()
+            raise
+
+        if not wait:
+            return status
+
+        try:
+            if not status.wait(timeout):
+                self.stop()
+                raise TimeoutError('Failed to move %s to %s in %s s' %
+                                   (self, position, timeout))
+        except KeyboardInterrupt:
+            self.stop()
+            raise
+
+        if not status.success:
+            raise RuntimeError('Failed to move %s to %s' % (self, position))
+
+    def stop(self):
+        '''Stop all positioners in the group'''
+        for pos in self._positioners:
+            pos.stop()
+
+        Positioner.stop(self)
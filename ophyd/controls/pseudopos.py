@@ -9,19 +9,40 @@
 
 from __future__ import print_function
 import logging
+import threading
 import time
+import weakref
 
 from collections import OrderedDict
+from contextlib import contextmanager
 
 import numpy as np
+from epics.ca import CAThread
 
-from ..utils import TimeoutError
-from .positioner import Positioner
+from ..utils import (TimeoutError, LimitError)
+from ..utils.cache import PositionCache
+from .positioner import (Positioner, PositionerGroup)
+from .posgraph import PositionerGraph
 
 
 logger = logging.getLogger(__name__)
 
 
+def _update_loop(ref):
+    '''Update thread target of a PseudoPositioner
+
+    Only a weak reference to the positioner is held between updates, so the
+    thread ends once nothing else refers to the positioner, as well as when
+    it is destroyed.
+    '''
+    while True:
+        pseudo = ref()
+        if pseudo is None or not pseudo._update_step():
+            return
+
+        del pseudo
+
+
 class PseudoSingle(Positioner):
     '''A single axis of a PseudoPositioner'''
 
@@ -66,6 +87,30 @@ class PseudoSingle(Positioner):
     def stop(self):
         return self._master.stop()
 
+    @property
+    def _move_time_known(self):
+        return self._master._move_time_known
+
+    def estimate_move_time(self, position, start=None):
+        '''Estimate the time taken to move to a position (or positions)'''
+        if start is None:
+            start = self.position
+
+        scalar = (np.ndim(position) == 0 and np.ndim(start) == 0)
+        position, start = np.broadcast_arrays(np.ravel(position),
+                                              np.ravel(start))
+
+        current = np.asarray(self._master.position, dtype=float)
+        targets = np.tile(current, (position.size, 1))
+        starts = targets.copy()
+        targets[:, self._idx] = position
+        starts[:, self._idx] = start
+
+        times = self._master.estimate_move_time(targets, starts)
+        if scalar:
+            return float(times[0])
+        return times
+
     @property
     def sequential(self):
         return self._master.sequential
@@ -87,6 +132,180 @@ class PseudoSingle(Positioner):
         return self._master.move_single(self._idx, pos, **kwargs)
 
 
+class InverseSolver(object):
+    '''Numerical solver for the inverse of a forward calculation
+
+    Finds the pseudo position `x` for which `forward(x)` best matches a real
+    position, by damped (Levenberg-Marquardt) least-squares iteration. The
+    Jacobian is estimated by finite differences, then cached and refined
+    with Broyden updates between calls. Each solve starts from the previous
+    solution, so tracking a slowly-changing readback typically converges in
+    one or two iterations.
+
+    Parameters
+    ----------
+    forward : callable
+        Function of a pseudo position array, returning a real position array
+    npseudo : int
+        Number of pseudo axes
+    tolerance : float, optional
+        Convergence tolerance on the real position residual (norm)
+    max_iterations : int, optional
+        Maximum number of iterations per solve
+    step : float, optional
+        Finite difference step used to estimate the Jacobian
+    damping : float, optional
+        Initial damping factor
+
+    Attributes
+    ----------
+    calls : int
+        Number of solves
+    iterations : int
+        Total number of iterations over all solves
+    last_iterations : int
+        Number of iterations taken by the last solve
+    jacobian_evaluations : int
+        Number of finite-difference Jacobian estimates
+    total_time : float
+        Total time spent solving, in seconds
+    last_time : float
+        Time taken by the last solve, in seconds
+    '''
+
+    def __init__(self, forward, npseudo, tolerance=1e-9, max_iterations=50,
+                 step=1e-6, damping=1e-6):
+        self.forward = forward
+        self.npseudo = int(npseudo)
+        self.tolerance = float(tolerance)
+        self.max_iterations = int(max_iterations)
+        self.step = float(step)
+        self.damping = float(damping)
+
+        self.calls = 0
+        self.iterations = 0
+        self.last_iterations = 0
+        self.jacobian_evaluations = 0
+        self.total_time = 0.0
+        self.last_time = 0.0
+
+        self._jacobian = None
+        self._last_solution = np.zeros(self.npseudo)
+
+    def _residual(self, x, target):
+        return np.asarray(self.forward(x), dtype=float).ravel() - target
+
+    def _estimate_jacobian(self, x, residual, target):
+        self.jacobian_evaluations += 1
+
+        jac = np.empty((residual.size, self.npseudo))
+        for i in range(self.npseudo):
+            dx = np.zeros(self.npseudo)
+            dx[i] = self.step * max(1.0, abs(x[i]))
+            jac[:, i] = (self._residual(x + dx, target) - residual) / dx[i]
+
+        return jac
+
+    def reset(self):
+        '''Discard the cached Jacobian and last solution'''
+        self._jacobian = None
+        self._last_solution = np.zeros(self.npseudo)
+
+    def solve(self, real, guess=None):
+        '''Find the pseudo position corresponding to a real position
+
+        Parameters
+        ----------
+        real : array-like
+            The real position
+        guess : array-like, optional
+            Starting pseudo position. Defaults to the last solution.
+
+        Returns
+        -------
+        pseudo : ndarray
+        '''
+        t0 = time.time()
+        target = np.asarray(real, dtype=float).ravel()
+
+        if guess is None:
+            x = self._last_solution.copy()
+        else:
+            x = np.asarray(guess, dtype=float).ravel().copy()
+
+        residual = self._residual(x, target)
+        norm = np.linalg.norm(residual)
+
+        jac = self._jacobian
+        if jac is None or jac.shape[0] != residual.size:
+            jac = self._estimate_jacobian(x, residual, target)
+
+        damping = self.damping
+        identity = np.eye(self.npseudo)
+        iterations = 0
+        fresh_jacobian = True
+
+        while norm > self.tolerance and iterations < self.max_iterations:
+            iterations += 1
+
+            jtj = np.dot(jac.T, jac)
+            dx = np.linalg.solve(jtj + damping * np.diag(np.diag(jtj) + 1.0),
+                                 -np.dot(jac.T, residual))
+
+            new_x = x + dx
+            new_residual = self._residual(new_x, target)
+            new_norm = np.linalg.norm(new_residual)
+
+            if new_norm < norm:
+                # Broyden rank-1 update of the cached Jacobian
+                dr = new_residual - residual
+                jac = jac + np.outer(dr - np.dot(jac, dx), dx) / np.dot(dx, dx)
+
+                x, residual, norm = new_x, new_residual, new_norm
+                damping = max(damping / 10.0, self.damping)
+                fresh_jacobian = False
+            elif not fresh_jacobian:
+                # The cached Jacobian is no longer good enough
+                jac = self._estimate_jacobian(x, residual, target)
+                fresh_jacobian = True
+            else:
+                damping *= 10.0
+                if damping > 1e12:
+                    break
+
+        if norm > self.tolerance:
+            logger.warning('Inverse solver did not converge (residual=%g, '
+                           'iterations=%d)', norm, iterations)
+
+        self._jacobian = jac
+        self._last_solution = x
+
+        elapsed = time.time() - t0
+        self.calls += 1
+        self.iterations += iterations
+        self.last_iterations = iterations
+        self.total_time += elapsed
+        self.last_time = elapsed
+        return x
+
+    @property
+    def stats(self):
+        '''Solver statistics'''
+        if self.calls:
+            mean_iterations = float(self.iterations) / self.calls
+        else:
+            mean_iterations = 0.0
+
+        return {'calls': self.calls,
+                'iterations': self.iterations,
+                'mean_iterations': mean_iterations,
+                'last_iterations': self.last_iterations,
+                'jacobian_evaluations': self.jacobian_evaluations,
+                'total_time': self.total_time,
+                'last_time': self.last_time,
+                }
+
+
 class PseudoPositioner(Positioner):
     '''A pseudo positioner which can be comprised of multiple positioners
 
@@ -100,17 +319,36 @@ class PseudoPositioner(Positioner):
     reverse : callable
         Real -> pseudo positioner calculation function
         Optionally, subclass PseudoPositioner and replace _calc_reverse.
+    numeric_reverse : bool, optional
+        Derive the reverse calculation numerically from the forward
+        calculation (see :class:`InverseSolver`). `reverse` must not be
+        specified.
     concurrent : bool, optional
         If set, all real motors will be moved concurrently. If not, they will be
         moved in order of how they were defined initially
     pseudo : list of strings, optional
         List of pseudo positioner names
+    cache_size : int, optional
+        If non-zero, the number of forward and reverse calculation results
+        to keep in least-recently-used caches
+    cache_tolerance : float, optional
+        Positions within this tolerance (per axis) share a cache entry
+    update_rate : float, optional
+        If set, the maximum rate (in Hz) at which the pseudo position is
+        recalculated from real positioner readbacks. Readback updates
+        arriving in between are coalesced into a single recalculation, made
+        on the positioner's update thread. This applies to nested pseudo
+        positioners (updated through a :class:`PositionerGraph`) as well.
     '''
     def __init__(self, name, positioners,
                  forward=None,
                  reverse=None,
                  concurrent=True,
                  pseudo=None,
+                 cache_size=0,
+                 cache_tolerance=1e-9,
+                 update_rate=None,
+                 numeric_reverse=False,
                  **kwargs):
 
         Positioner.__init__(self, name=name, **kwargs)
@@ -127,17 +365,37 @@ class PseudoPositioner(Positioner):
 
             self._calc_reverse = reverse
 
+        if numeric_reverse and reverse is not None:
+            raise ValueError('Cannot specify both a reverse calculation and '
+                             'numeric_reverse')
+
         self._real = list(positioners)
         self._concurrent = bool(concurrent)
+        self._graph = None
+        self._vectorized = {'forward': None, 'reverse': None}
         self._finish_thread = None
-        self._real_waiting = []
         self._real_cur_pos = {}
 
-        for real in self._real:
-            real.subscribe(self._real_finished,
-                           event_type=real.SUB_DONE,
-                           run=False)
+        self._update_lock = threading.Lock()
+        self._update_cond = threading.Condition(self._update_lock)
+        self._update_pending = False
+        self._last_update = 0.0
+        self._batch_depth = 0
+        self._batch_dirty = False
+        self._destroyed = False
+
+        if update_rate:
+            self._update_period = 1.0 / update_rate
+            self._update_thread = CAThread(target=_update_loop,
+                                           args=(weakref.ref(self), ),
+                                           name='%s updates' % name)
+            self._update_thread.daemon = True
+            self._update_thread.start()
+        else:
+            self._update_period = None
+            self._update_thread = None
 
+        for real in self._real:
             self._real_cur_pos[real] = real.position
 
             real.subscribe(self._real_pos_update,
@@ -154,11 +412,33 @@ class PseudoPositioner(Positioner):
         self._pseudo_pos = [PseudoSingle(self, i) for i
                             in range(len(self._pseudo_names))]
 
-        # TODO will calculations ever be too complex to make caching x number of
-        #      fwd/rev calculation results worthwhile?
         if not self._pseudo_names or not self._real:
             raise ValueError('Must have at least 1 positioner and pseudo-positioner')
 
+        # Caching is worthwhile for expensive calculations (e.g., crystal
+        # analyzers, hexapods)
+        self.parameters = {}
+        if cache_size:
+            self._fwd_cache = PositionCache(cache_size, cache_tolerance)
+            self._rev_cache = PositionCache(cache_size, cache_tolerance)
+        else:
+            self._fwd_cache = self._rev_cache = None
+
+        self._real_group = PositionerGroup(self._real)
+
+        if numeric_reverse:
+            self._solver = InverseSolver(self._forward_vector,
+                                         len(self._pseudo_names))
+            self._calc_reverse = self._numeric_reverse
+        else:
+            self._solver = None
+
+        # Nested pseudo positioners are updated through a shared dependency
+        # graph, so that each is recalculated once per real positioner change
+        upstream = [getattr(real, '_master', real) for real in self._real]
+        if any(isinstance(pos, PseudoPositioner) for pos in upstream):
+            PositionerGraph([self])
+
     def __repr__(self):
         repr = ['positioners={0._real!r}'.format(self),
                 'concurrent={0._concurrent!r}'.format(self),
@@ -170,8 +450,7 @@ class PseudoPositioner(Positioner):
         return self._get_repr(repr)
 
     def stop(self):
-        for pos in self._real:
-            pos.stop()
+        self._real_group.stop()
 
         Positioner.stop(self)
 
@@ -198,6 +477,44 @@ class PseudoPositioner(Positioner):
         for real, pos in zip(self._real, real_pos):
             real.check_value(pos)
 
+    @property
+    def _move_time_known(self):
+        return all(real._move_time_known for real in self._real)
+
+    def estimate_move_time(self, position, start=None):
+        '''Estimate the time taken to move all pseudo positioners to a
+        position
+
+        Real positioner move times are combined according to whether the
+        motion is concurrent (longest move) or sequential (sum of moves).
+
+        Parameters
+        ----------
+        position : sequence or ndarray
+            The target pseudo position, or an array of shape
+            (npts, npseudo)
+        start : sequence or ndarray, optional
+            The starting pseudo position(s). Defaults to the current position.
+        '''
+        if start is None:
+            start = self.position
+
+        single = (np.ndim(position) <= 1)
+        targets = self.calc_forward_array(position)
+        starts = self.calc_forward_array(start)
+
+        times = np.array([real.estimate_move_time(targets[:, i], starts[:, i])
+                          for i, real in enumerate(self._real)])
+
+        if self.sequential:
+            times = times.sum(axis=0)
+        else:
+            times = times.max(axis=0)
+
+        if single:
+            return float(times[0])
+        return times
+
     @property
     def moving(self):
         return any(pos.moving for pos in self._real)
@@ -237,31 +554,152 @@ class PseudoPositioner(Positioner):
         '''Dictionary of real motors by name'''
         return OrderedDict((real.name, real) for real in self._real)
 
+    @property
+    def graph(self):
+        '''The :class:`PositionerGraph` this positioner is updated through,
+        if any'''
+        return self._graph
+
     def _update_position(self):
         pos_kw = dict((real.name, pos) for real, pos in self._real_cur_pos.items())
         new_pos = self.calc_reverse(**pos_kw)
         self._set_position(new_pos)
         return new_pos
 
+    def _recalculate(self):
+        '''Recalculate the pseudo position, through the graph if nested'''
+        if self._graph is not None:
+            self._graph._input_changed(self)
+        else:
+            self._update_position()
+
     def _real_pos_update(self, obj=None, value=None, **kwargs):
         '''A single real positioner has moved'''
         real = obj
         self._real_cur_pos[real] = value
-        self._update_position()
 
-    def _real_finished(self, obj=None, **kwargs):
-        '''A single real positioner has finished moving.
+        with self._update_lock:
+            if self._batch_depth > 0:
+                self._batch_dirty = True
+                return
+
+            if self._update_period is not None:
+                if not self._update_pending:
+                    self._update_pending = True
+                    self._update_cond.notify()
+
+                return
 
-        Used for asynchronous motion, if all have finished
-        moving then fire a callback (via `Positioner._done_moving`)
+        self._recalculate()
+
+    def _update_step(self, timeout=1.0):
+        '''Wait up to `timeout` for readback updates, and recalculate at most
+        once per update period (update thread)
+
+        Returns
+        -------
+        running : bool
+            False once the positioner has been destroyed
         '''
-        real = obj
+        with self._update_cond:
+            if not (self._update_pending or self._destroyed):
+                self._update_cond.wait(timeout)
 
-        if real in self._real_waiting:
-            self._real_waiting.remove(real)
+            if self._destroyed:
+                return False
+            elif not self._update_pending:
+                return True
 
-            if not self._real_waiting:
-                self._done_moving()
+            delay = self._last_update + self._update_period - time.time()
+
+        if delay > 0.0:
+            time.sleep(delay)
+
+        try:
+            self._coalesced_update()
+        except Exception as ex:
+            logger.error('%s: pseudo position update failed',
+                         self.name, exc_info=ex)
+
+        return True
+
+    def destroy(self):
+        '''Stop following the real positioners
+
+        The readback subscriptions are removed and the update thread, if
+        any, is stopped.
+        '''
+        for real in self._real:
+            try:
+                real.clear_sub(self._real_pos_update,
+                               event_type=real.SUB_READBACK)
+            except ValueError:
+                pass
+
+        with self._update_cond:
+            self._destroyed = True
+            self._update_cond.notify()
+
+        thread = self._update_thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _coalesced_update(self):
+        '''Recalculate once for all readback updates since the last one'''
+        with self._update_lock:
+            if not self._update_pending:
+                return
+
+            self._update_pending = False
+            self._last_update = time.time()
+
+        self._recalculate()
+
+    def _flush_update(self):
+        '''Run any pending coalesced recalculation now'''
+        with self._update_lock:
+            pending = self._update_pending
+            self._update_pending = False
+            self._last_update = time.time()
+
+        if pending:
+            self._recalculate()
+
+    @contextmanager
+    def batch_updates(self):
+        '''Context manager which defers recalculation of the pseudo position
+
+        Real positioner readback updates within the block result in a single
+        recalculation (and readback event) when the block exits.
+        '''
+        with self._update_lock:
+            self._batch_depth += 1
+
+        try:
+            yield self
+        finally:
+            with self._update_lock:
+                self._batch_depth -= 1
+                run = (self._batch_depth == 0 and self._batch_dirty)
+                if run:
+                    self._batch_dirty = False
+
+            if run:
+                self._recalculate()
+
+    def _real_finished(self, success=True, **kwargs):
+        '''All real positioners have finished moving.
+
+        Used for asynchronous motion, fires a callback (via
+        `Positioner._done_moving`)
+        '''
+        # Publish the final position before reporting completion
+        self._flush_update()
+
+        if success:
+            self._done_moving()
+        else:
+            self._run_req_done(success=False)
 
     def move_single(self, idx, position, **kwargs):
         if isinstance(idx, str):
@@ -271,11 +709,19 @@ class PseudoPositioner(Positioner):
         target[idx] = position
         return self.move(target, **kwargs)
 
-    def move(self, position, wait=True, timeout=30.0,
+    def move(self, position, wait=True, timeout=None,
              **kwargs):
+        '''Move the pseudo positioners to a position
+
+        If `timeout` is None, it is computed from the real positioners'
+        motion models and travel distances (see :func:`move_timeout`).
+        '''
         if np.size(position) != len(self._pseudo_pos):
             raise ValueError('Number of positions and pseudo positioners does not match')
 
+        if timeout is None:
+            timeout = self.move_timeout(position)
+
         position = np.array(position, ndmin=1)
         pos_kw = dict((pseudo, value) for pseudo, value in
                       zip(self._pseudo_names, position))
@@ -304,17 +750,16 @@ class PseudoPositioner(Positioner):
                 timeout -= elapsed
 
         else:
-            del self._real_waiting[:]
-            self._real_waiting.extend(self._real)
-
-            for real, value in zip(self._real, real_pos):
-                real.move(value, wait=False, **kwargs)
+            # Validate all real targets, then start all motion back-to-back
+            self._real_group.move(real_pos, wait=False,
+                                  moved_cb=self._real_finished, **kwargs)
 
         ret = Positioner.move(self, position, moved_cb=moved_cb,
-                              wait=wait,
+                              wait=wait, timeout=timeout,
                               **kwargs)
 
         if self.sequential or (wait and not self.moving):
+            self._flush_update()
             self._done_moving()
 
         return ret
@@ -325,11 +770,21 @@ class PseudoPositioner(Positioner):
 
     def calc_forward(self, *args, **kwargs):
         ''' '''
+        if self._fwd_cache is not None:
+            key = [kwargs[name] for name in self._pseudo_names]
+            try:
+                return self._fwd_cache.get(key)
+            except KeyError:
+                pass
+
         real_pos = self._calc_forward(**kwargs)
 
         if np.size(real_pos) != np.size(self._real):
             raise ValueError('Forward calculation did not return right position count')
 
+        if self._fwd_cache is not None:
+            self._fwd_cache.put(key, real_pos)
+
         return real_pos
 
     def _calc_reverse(self, *args, **kwargs):
@@ -337,13 +792,192 @@ class PseudoPositioner(Positioner):
         return [0.0] * len(self._pseudo_pos)
 
     def calc_reverse(self, *args, **kwargs):
+        if self._rev_cache is not None:
+            key = [kwargs[real.name] for real in self._real]
+            try:
+                return self._rev_cache.get(key)
+            except KeyError:
+                pass
+
         pseudo_pos = self._calc_reverse(**kwargs)
 
         if np.size(pseudo_pos) != np.size(self._pseudo_pos):
             raise ValueError('Reverse calculation did not return right position count')
 
+        if self._rev_cache is not None:
+            self._rev_cache.put(key, pseudo_pos)
+
         return pseudo_pos
 
+    def _forward_vector(self, pseudo_pos):
+        '''Forward calculation on a pseudo position array'''
+        pos_kw = dict(zip(self._pseudo_names, pseudo_pos))
+        return np.ravel(self._calc_forward(**pos_kw))
+
+    def _numeric_reverse(self, **kwargs):
+        '''Reverse calculation by numerically inverting the forward one'''
+        real_pos = np.array([kwargs[real.name] for real in self._real],
+                            dtype=float)
+        if real_pos.ndim != 1:
+            raise ValueError('Numeric reverse calculation is not vectorized')
+
+        return list(self._solver.solve(real_pos))
+
+    @property
+    def solver_stats(self):
+        '''Numeric reverse solver statistics (None if not in use)'''
+        if self._solver is None:
+            return None
+
+        return self._solver.stats
+
+    def invalidate_cache(self):
+        '''Clear the forward and reverse calculation caches
+
+        Call this when anything other than the positions that the
+        calculations depend on has changed.
+        '''
+        for cache in (self._fwd_cache, self._rev_cache):
+            if cache is not None:
+                cache.clear()
+
+        if self._solver is not None:
+            self._solver.reset()
+
+    def update_parameters(self, **params):
+        '''Update the calculation parameters and invalidate the caches
+
+        Parameters are stored in the `parameters` dictionary, for use by
+        `_calc_forward` and `_calc_reverse`.
+        '''
+        self.parameters.update(params)
+        self.invalidate_cache()
+
+    @property
+    def cache_info(self):
+        '''Forward and reverse calculation cache statistics'''
+        if self._fwd_cache is None:
+            return None
+
+        return {'forward': self._fwd_cache.info,
+                'reverse': self._rev_cache.info,
+                }
+
+    def _calc_array(self, kind, calc, names, count, positions):
+        '''Evaluate a calculation function over an array of positions
+
+        The function is first called once with arrays (one per axis). If
+        that fails or gives a result of the wrong shape, the function is
+        marked as not vectorized and it is called once per point.
+        '''
+        positions = np.array(positions, dtype=float, ndmin=2)
+        npts = positions.shape[0]
+
+        if positions.shape[1] != len(names):
+            raise ValueError('Expected positions of shape (npts, %d), got %s' %
+                             (len(names), positions.shape))
+
+        if self._vectorized[kind] is not False:
+            try:
+                ret = calc(**dict(zip(names, positions.T)))
+                ret = np.asarray(ret, dtype=float)
+
+                if ret.shape == (count, npts):
+                    # One array per axis
+                    ret = ret.T
+                elif ret.shape in ((npts, ), (count, )):
+                    ret = ret.reshape(npts, count)
+
+                if ret.shape != (npts, count):
+                    raise ValueError('Unexpected shape %s' % (ret.shape, ))
+            except Exception as ex:
+                logger.debug('%s calculation of %s is not vectorized (%s)',
+                             kind, self.name, ex)
+                self._vectorized[kind] = False
+            else:
+                self._vectorized[kind] = True
+                return ret
+
+        ret = np.empty((npts, count))
+        for i, point in enumerate(positions):
+            value = np.ravel(calc(**dict(zip(names, point))))
+            if value.size != count:
+                raise ValueError('%s calculation did not return right position '
+                                 'count' % kind.capitalize())
+            ret[i] = value
+
+        return ret
+
+    def calc_forward_array(self, pseudo_pos):
+        '''Pseudo -> real calculation over many points
+
+        Vectorized forward functions (those accepting numpy arrays) are
+        called once; others are called once per point.
+
+        Parameters
+        ----------
+        pseudo_pos : array-like
+            Pseudo positions, of shape (npts, npseudo)
+
+        Returns
+        -------
+        real_pos : ndarray
+            Real positions, of shape (npts, nreal)
+        '''
+        return self._calc_array('forward', self._calc_forward,
+                                self._pseudo_names, len(self._real),
+                                pseudo_pos)
+
+    def calc_reverse_array(self, real_pos):
+        '''Real -> pseudo calculation over many points
+
+        See :func:`calc_forward_array`
+
+        Parameters
+        ----------
+        real_pos : array-like
+            Real positions, of shape (npts, nreal), in the order of the real
+            positioners
+
+        Returns
+        -------
+        pseudo_pos : ndarray
+            Pseudo positions, of shape (npts, npseudo)
+        '''
+        real_names = [real.name for real in self._real]
+        return self._calc_array('reverse', self._calc_reverse,
+                                real_names, len(self._pseudo_pos),
+                                real_pos)
+
+    def check_array(self, pseudo_pos):
+        '''Check that many pseudo positions are valid, in a single
+        calculation
+
+        Parameters
+        ----------
+        pseudo_pos : array-like
+            Pseudo positions, of shape (npts, npseudo)
+
+        Raises
+        ------
+        LimitError
+        '''
+        real_pos = self.calc_forward_array(pseudo_pos)
+
+        for real, values in zip(self._real, real_pos.T):
+            low, high = real.limits
+            if low >= high:
+                continue
+
+            bad = (values < low) | (values > high)
+            if bad.any():
+                idx = np.argmax(bad)
+                raise LimitError('Position {} of {} moves {} to {}, outside '
+                                 'of range: [{}, {}]'.format(idx, self.name,
+                                                             real.name,
+                                                             values[idx],
+                                                             low, high))
+
     def __getitem__(self, key):
         '''Get either a single pseudo or real positioner by name'''
         try:
@@ -351,7 +351,7 @@ class EpicsSignal(Signal):
                 raise TimeoutError('Failed to connect to %s' %
                                    self._write_pv.pvname)
 
-        use_complete = kwargs.get('use_complete', self._put_complete)
+        use_complete = kwargs.pop('use_complete', self._put_complete)
 
         self._write_pv.put(value, use_complete=use_complete,
                            **kwargs)
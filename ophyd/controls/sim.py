@@ -0,0 +1,152 @@
+# vi: ts=4 sw=4
+'''
+:mod:`ophyd.control.sim` - Simulated hardware
+=============================================
+
+.. module:: ophyd.control.sim
+   :synopsis: Positioners and detectors for testing without EPICS
+'''
+
+from __future__ import print_function
+import logging
+import threading
+import time
+
+from .signal import Signal
+from .positioner import Positioner
+from ..utils import (TimeoutError, LimitError)
+
+
+logger = logging.getLogger(__name__)
+
+
+class SimPositioner(Positioner):
+    '''A simulated positioner
+
+    Moves take the time estimated by the positioner's motion model (see
+    :func:`Positioner.estimate_move_time`). With the default motion model,
+    which has no velocity, moves complete immediately.
+
+    Parameters
+    ----------
+    position : float, optional
+        The initial position
+    limits : (low, high), optional
+        Soft limits. Unlimited if unset (or equal).
+    motion_model : MotionModel, optional
+        The motion model used to time simulated moves
+    '''
+
+    def __init__(self, position=0.0, limits=None, motion_model=None,
+                 **kwargs):
+        Positioner.__init__(self, **kwargs)
+
+        if limits is None:
+            limits = (0, 0)
+
+        self._limits = tuple(limits)
+        self._motion_model = motion_model
+        self._move_timer = None
+        self._set_position(position)
+
+    @property
+    def limits(self):
+        return self._limits
+
+    @property
+    def report(self):
+        return {self._name: self.position, 'pv': None}
+
+    @property
+    def timestamp(self):
+        '''Timestamp of the last position update'''
+        return self._sub_cache.get(self.SUB_READBACK,
+                                   ((), {}))[1].get('timestamp')
+
+    def check_value(self, pos):
+        low, high = self.limits
+        if low != high and not (low <= pos <= high):
+            raise LimitError('{}: position {} outside of limits {}'
+                             ''.format(self.name, pos, self.limits))
+
+    def _cancel_move(self):
+        timer, self._move_timer = self._move_timer, None
+        if timer is not None:
+            timer.cancel()
+
+    def _finish_move(self, position):
+        self._moving = False
+        self._set_position(position)
+        self._done_moving(timestamp=time.time(), value=position)
+
+    def move(self, position, wait=True, moved_cb=None, timeout=None):
+        self.check_value(position)
+        self._cancel_move()
+
+        status = Positioner.move(self, position, wait=False,
+                                 moved_cb=moved_cb, timeout=timeout)
+
+        move_time = self.estimate_move_time(position)
+
+        self._started_moving = True
+        self._moving = True
+        self._run_subs(sub_type=self.SUB_START, timestamp=time.time())
+
+        if move_time > 0.0:
+            self._move_timer = threading.Timer(move_time, self._finish_move,
+                                               args=(position, ))
+            self._move_timer.daemon = True
+            self._move_timer.start()
+        else:
+            self._finish_move(position)
+
+        if wait:
+            if not status.wait(status.timeout):
+                raise TimeoutError('Failed to move %s to %s in %s s' %
+                                   (self, position, status.timeout))
+        else:
+            return status
+
+    def stop(self):
+        self._cancel_move()
+        self._moving = False
+        Positioner.stop(self)
+
+
+class SimDetector(Signal):
+    '''A simulated detector
+
+    Parameters
+    ----------
+    func : callable, optional
+        Called (with no arguments) on every read to generate a new value.
+        If unset, the detector reads back its last put value.
+    '''
+
+    def __init__(self, func=None, **kwargs):
+        Signal.__init__(self, **kwargs)
+
+        self._func = func
+        self._timestamp = time.time()
+
+    pvname = None
+
+    def put(self, value, **kwargs):
+        Signal.put(self, value, **kwargs)
+        self._timestamp = time.time()
+
+    def get(self):
+        if self._func is not None:
+            self._readback = self._func()
+            self._timestamp = time.time()
+
+        return self._readback
+
+    @property
+    def report(self):
+        return {self._name: self._readback, 'pv': None}
+
+    @property
+    def timestamp(self):
+        '''Timestamp of the last generated or put value'''
+        return self._timestamp
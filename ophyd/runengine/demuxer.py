@@ -1 +1,413 @@
+'''
+:mod:`ophyd.runengine.demuxer` - Scan event fan-out
+===================================================
 
+.. module:: ophyd.runengine.demuxer
+   :synopsis: Distribute scan events to live consumers over bounded queues
+'''
+
+from __future__ import print_function
+import logging
+import threading
+import tempfile
+import time
+
+from threading import Thread
+from Queue import (Queue, Full, Empty)
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from ..utils import enum
+
+
+logger = logging.getLogger(__name__)
+
+# What to do with new items when a consumer's queue is full
+Policy = enum(BLOCK='block',
+              DROP='drop',
+              SPILL='spill',
+              )
+
+# Marks the end of a stream of items (i.e., the end of a run)
+END_OF_STREAM = None
+
+
+class _SpillFile(object):
+    '''An on-disk FIFO of pickled items'''
+
+    def __init__(self, directory=None):
+        self._file = tempfile.TemporaryFile(dir=directory)
+        self._read_pos = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def push(self, item):
+        self._file.seek(0, 2)
+        pickle.dump(item, self._file, pickle.HIGHEST_PROTOCOL)
+        self._count += 1
+
+    def pop(self):
+        self._file.seek(self._read_pos)
+        item = pickle.load(self._file)
+        self._read_pos = self._file.tell()
+        self._count -= 1
+
+        if self._count == 0:
+            # Reclaim the space once everything has been read back
+            self._file.seek(0)
+            self._file.truncate()
+            self._read_pos = 0
+
+        return item
+
+    def close(self):
+        self._file.close()
+
+
+class Consumer(object):
+    '''A Demuxer output: a bounded queue of items for one consumer
+
+    Use :func:`get` (or iterate) to receive items. Iteration stops at the
+    end of each run.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name used in the statistics
+    maxsize : int, optional
+        Maximum number of items held in memory
+    policy : {'block', 'drop', 'spill'}, optional
+        What to do when the queue is full:
+
+        * block: wait for the consumer, slowing the scan down (default)
+        * drop: discard the oldest queued item
+        * spill: write items to a temporary file until the consumer catches
+          up
+    spill_dir : str, optional
+        Directory for the spill file. Defaults to the system temporary
+        directory.
+
+    Attributes
+    ----------
+    received : int
+        Number of items delivered to this consumer (not counting the end
+        of each run)
+    consumed : int
+        Number of items taken by the consumer
+    dropped : int
+        Number of items discarded (drop policy)
+    spilled : int
+        Number of items written to disk (spill policy)
+    max_lag : int
+        Largest number of items pending at once
+    max_latency : float
+        Longest time an item spent queued, in seconds
+    '''
+
+    def __init__(self, name=None, maxsize=1000, policy=Policy.BLOCK,
+                 spill_dir=None):
+        if policy not in (Policy.BLOCK, Policy.DROP, Policy.SPILL):
+            raise ValueError('Unknown slow consumer policy: %s' % policy)
+
+        self.name = name
+        self.maxsize = int(maxsize)
+        self.policy = policy
+
+        self._queue = Queue(self.maxsize)
+        self._lock = threading.Lock()
+        self._spill_dir = spill_dir
+        self._spill = None
+
+        self.received = 0
+        self.consumed = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.max_lag = 0
+        self.max_latency = 0.0
+        self.latency = 0.0
+
+    def __repr__(self):
+        return '{0}(name={1.name!r}, maxsize={1.maxsize!r}, ' \
+               'policy={1.policy!r})'.format(self.__class__.__name__, self)
+
+    @property
+    def lag(self):
+        '''Number of items pending for this consumer'''
+        return self.received - self.consumed - self.dropped
+
+    def _spill_item(self, entry):
+        if self._spill is None:
+            self._spill = _SpillFile(self._spill_dir)
+
+        self._spill.push(entry)
+        self.spilled += 1
+
+    def _refill(self):
+        '''Move spilled items back into the queue, in order'''
+        while self._spill and not self._queue.full():
+            self._queue.put_nowait(self._spill.pop())
+
+    def _delivered(self, item):
+        '''Count an item once it is queued (call with the lock held)'''
+        if item is not END_OF_STREAM:
+            self.received += 1
+            self.max_lag = max(self.max_lag, self.lag)
+
+    def _put(self, item):
+        '''Deliver an item (called from the Demuxer thread)'''
+        entry = (time.time(), item)
+
+        with self._lock:
+            if self._spill:
+                # Keep ordering: nothing may overtake items on disk
+                self._spill_item(entry)
+                self._delivered(item)
+                return
+
+            try:
+                self._queue.put_nowait(entry)
+            except Full:
+                pass
+            else:
+                self._delivered(item)
+                return
+
+            if self.policy == Policy.SPILL:
+                self._spill_item(entry)
+                self._delivered(item)
+                return
+            elif self.policy == Policy.DROP:
+                while True:
+                    try:
+                        self._queue.get_nowait()
+                    except Empty:
+                        pass
+                    else:
+                        self.dropped += 1
+
+                    try:
+                        self._queue.put_nowait(entry)
+                    except Full:
+                        continue
+                    else:
+                        self._delivered(item)
+                        return
+
+        # Block policy: wait (outside of the lock) for the consumer
+        self._queue.put(entry)
+
+        with self._lock:
+            self._delivered(item)
+
+    def abandon(self):
+        '''Stop waiting for a stalled consumer
+
+        The consumer is switched to the drop policy, and its oldest item
+        is dropped to release a delivery blocked on it.
+        '''
+        with self._lock:
+            self.policy = Policy.DROP
+
+            try:
+                self._queue.get_nowait()
+            except Empty:
+                pass
+            else:
+                self.dropped += 1
+
+    def get(self, block=True, timeout=None):
+        '''Get the next item
+
+        Returns
+        -------
+        item
+            The item, or `END_OF_STREAM` at the end of a run
+
+        Raises
+        ------
+        Queue.Empty
+            If no item is available (see `Queue.get`)
+        '''
+        timestamp, item = self._queue.get(block=block, timeout=timeout)
+
+        with self._lock:
+            if item is not END_OF_STREAM:
+                self.consumed += 1
+
+            self.latency = time.time() - timestamp
+            self.max_latency = max(self.max_latency, self.latency)
+
+            if self._spill:
+                self._refill()
+
+        return item
+
+    def __iter__(self):
+        '''Iterate over the items of the current run'''
+        while True:
+            item = self.get()
+            if item is END_OF_STREAM:
+                return
+
+            yield item
+
+    @property
+    def stats(self):
+        '''Consumer statistics'''
+        return {'name': self.name,
+                'policy': self.policy,
+                'received': self.received,
+                'consumed': self.consumed,
+                'dropped': self.dropped,
+                'spilled': self.spilled,
+                'lag': self.lag,
+                'max_lag': self.max_lag,
+                'latency': self.latency,
+                'max_latency': self.max_latency,
+                }
+
+    def close(self):
+        '''Release the spill file, if any'''
+        with self._lock:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+
+
+class Demuxer(object):
+    '''Demultiplexer
+
+    Fans items out from a single (bounded) input queue to any number of
+    registered consumers, each with its own bounded queue and slow consumer
+    policy (see :class:`Consumer`).
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Size of the input queue. When full, :func:`enqueue` blocks.
+
+    Attributes
+    ----------
+    inpq : Queue
+    consumers : list of Consumer
+    thread : threading.Thread
+    '''
+
+    def __init__(self, maxsize=1000):
+        self.inpq = Queue(maxsize)
+        self.consumers = []
+        self.thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+
+        self.thread = Thread(target=self._demux, name='Demuxer')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        '''Deliver the end of stream marker to all consumers and stop
+
+        Items already enqueued are delivered first. If that takes longer
+        than `timeout` seconds, consumers with the block policy are
+        abandoned (see :func:`Consumer.abandon`), so that a stalled
+        consumer loses the items it has not kept up with rather than
+        stalling the end of the run.
+        '''
+        if not self.running:
+            return
+
+        t0 = time.time()
+        try:
+            self.inpq.put(END_OF_STREAM, timeout=timeout)
+        except Full:
+            self._abandon_blocking(timeout)
+            self.inpq.put(END_OF_STREAM)
+
+        if timeout is not None:
+            self.thread.join(max(timeout - (time.time() - t0), 0.0))
+            if self.thread.is_alive():
+                self._abandon_blocking(timeout)
+
+        self.thread.join()
+
+    def _abandon_blocking(self, timeout):
+        '''Abandon all consumers with the block policy'''
+        with self._lock:
+            consumers = [consumer for consumer in self.consumers
+                         if consumer.policy == Policy.BLOCK]
+
+        logger.warning('Consumers did not keep up within %s s; dropping '
+                       'their pending events: %s', timeout,
+                       ', '.join(str(consumer.name) for consumer in consumers))
+
+        for consumer in consumers:
+            consumer.abandon()
+
+    def enqueue(self, data):
+        '''Send an item to all consumers
+
+        Nothing is queued when there are no consumers registered.
+        '''
+        if data is END_OF_STREAM:
+            raise ValueError('Cannot enqueue the end of stream marker')
+
+        if self.consumers:
+            self.inpq.put(data)
+
+    def register(self, name=None, maxsize=1000, policy=Policy.BLOCK,
+                 spill_dir=None):
+        '''Register a new consumer
+
+        See :class:`Consumer` for the parameters.
+
+        Returns
+        -------
+        consumer : Consumer
+        '''
+        consumer = Consumer(name=name, maxsize=maxsize, policy=policy,
+                            spill_dir=spill_dir)
+        with self._lock:
+            self.consumers.append(consumer)
+
+        return consumer
+
+    def unregister(self, consumer):
+        '''Remove a consumer'''
+        with self._lock:
+            self.consumers.remove(consumer)
+
+        consumer.close()
+
+    @property
+    def stats(self):
+        '''Input queue depth and per-consumer statistics'''
+        return {'depth': self.inpq.qsize(),
+                'consumers': [consumer.stats for consumer in self.consumers],
+                }
+
+    def _demux(self):
+        while True:
+            # block waiting for input
+            inp = self.inpq.get(block=True)
+            logger.debug('Demuxer: %s', inp)
+
+            with self._lock:
+                consumers = list(self.consumers)
+
+            for consumer in consumers:
+                consumer._put(inp)
+
+            if inp is END_OF_STREAM:
+                return
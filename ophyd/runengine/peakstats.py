@@ -0,0 +1,208 @@
+'''
+:mod:`ophyd.runengine.peakstats` - Live peak statistics
+=======================================================
+
+.. module:: ophyd.runengine.peakstats
+   :synopsis: Peak statistics of a scan, updated as each point is taken
+'''
+
+from __future__ import print_function
+import time
+
+import numpy as np
+
+from ..controls.ophydobj import OphydObject
+from ..utils.buffers import TimestampedBuffer
+
+
+class PeakStats(OphydObject):
+    '''Peak statistics of one data key against another, updated per point
+
+    The statistics are those of :func:`ophyd.userapi.scan_api.estimate`
+    (minimum, maximum, average, CEN, FWHM and center of mass), for the
+    points in the order they were taken.
+
+    Each :func:`update` is O(1): the extremes and sums are kept running,
+    and the half maximum crossings are extended by checking only the
+    newest interval. When a new extreme moves the half maximum, the
+    crossings are instead recomputed (vectorized) the next time the
+    statistics are read.
+
+    Reading :attr:`stats` is therefore O(n) after a new extreme, and
+    reading it at every point would make the scan O(n**2) (e.g., on the
+    rising edge of a peak, where every point is a new maximum). The
+    extremes and center of mass (:attr:`ymax`, :attr:`x_at_ymax`,
+    :attr:`ymin`, :attr:`x_at_ymin` and :attr:`center_of_mass`) are O(1)
+    to read at any time.
+
+    Subscribers (see :func:`subscribe`) are called after every point with
+    the new `x` and `y` values, on the scan thread. They should limit
+    themselves to the O(1) attributes, and may stop the scan.
+
+    Parameters
+    ----------
+    x : str
+        The data key of the independent variable (e.g., a positioner)
+    y : str
+        The data key of the signal (e.g., a detector)
+    capacity : int, optional
+        Number of points to preallocate
+    '''
+
+    SUB_VALUE = 'value'
+    _default_sub = SUB_VALUE
+
+    def __init__(self, x, y, capacity=64, name=None, **kwargs):
+        if name is None:
+            name = y
+
+        OphydObject.__init__(self, name=name, **kwargs)
+
+        self.x = x
+        self.y = y
+
+        self._x = TimestampedBuffer(capacity)
+        self._y = TimestampedBuffer(capacity)
+        self.clear()
+
+    def __repr__(self):
+        return '{0}({1.x!r}, {1.y!r})'.format(self.__class__.__name__, self)
+
+    def __len__(self):
+        return len(self._y)
+
+    def clear(self):
+        '''Remove all points'''
+        self._x.clear()
+        self._y.clear()
+
+        self._ymin = self._ymax = None
+        self._x_at_ymin = self._x_at_ymax = None
+        self._sum_y = 0.0
+        self._sum_xy = 0.0
+
+        self._half = None
+        self._crossings = []
+        self._last_sign = None
+        self._stale = False
+
+    def update(self, x, y, timestamp=None):
+        '''Add a point
+
+        Parameters
+        ----------
+        x : float
+        y : float
+        timestamp : float, optional
+            Defaults to the current time
+        '''
+        if timestamp is None:
+            timestamp = time.time()
+
+        x = float(x)
+        y = float(y)
+        index = len(self._y)
+
+        self._x.append(x, timestamp)
+        self._y.append(y, timestamp)
+
+        self._sum_y += y
+        self._sum_xy += x * y
+
+        moved = False
+        if index == 0 or y < self._ymin:
+            self._ymin, self._x_at_ymin = y, x
+            moved = True
+        if index == 0 or y > self._ymax:
+            self._ymax, self._x_at_ymax = y, x
+            moved = True
+
+        if moved:
+            # The half maximum has moved, and the crossings with it
+            self._stale = True
+        elif not self._stale:
+            sign = np.sign(y - self._half)
+            if sign != self._last_sign:
+                self._crossings.append(index - 1)
+            self._last_sign = sign
+
+        self._run_subs(sub_type=self.SUB_VALUE, x=x, y=y,
+                       timestamp=timestamp)
+
+    @property
+    def ymin(self):
+        '''The lowest signal value (None if there are no points)'''
+        return self._ymin
+
+    @property
+    def ymax(self):
+        '''The highest signal value (None if there are no points)'''
+        return self._ymax
+
+    @property
+    def x_at_ymin(self):
+        '''The position of the lowest signal value'''
+        return self._x_at_ymin
+
+    @property
+    def x_at_ymax(self):
+        '''The position of the highest signal value'''
+        return self._x_at_ymax
+
+    @property
+    def center_of_mass(self):
+        '''The signal-weighted mean position
+
+        NaN if there are no points, or the signal sums to zero
+        '''
+        if self._sum_y == 0.0:
+            return np.nan
+
+        return self._sum_xy / self._sum_y
+
+    def _update_crossings(self):
+        self._half = (self._ymax + self._ymin) / 2
+        signs = np.sign(self._y.values - self._half)
+
+        self._crossings = list(np.where(np.diff(signs))[0])
+        self._last_sign = signs[-1]
+        self._stale = False
+
+    @property
+    def stats(self):
+        '''The statistics of the points so far
+
+        Returns
+        -------
+        dict
+            As returned by :func:`ophyd.userapi.scan_api.estimate` (empty
+            if there are no points)
+        '''
+        count = len(self._y)
+        if not count:
+            return {}
+
+        if self._stale:
+            self._update_crossings()
+
+        stats = {'ymin': self._ymin,
+                 'ymax': self._ymax,
+                 'avg_y': self._sum_y / count,
+                 'x_at_ymin': self._x_at_ymin,
+                 'x_at_ymax': self._x_at_ymax,
+                 }
+
+        x = self._x.values
+        y = self._y.values
+        crossings = self._crossings
+        if len(crossings) == 2:
+            left, right = crossings
+            stats['cen'] = ((x[left] + x[right]) / 2, self._half)
+            stats['width'] = x[right] - x[left]
+            stats['fwhm_left'] = (x[left], y[left])
+            stats['fwhm_right'] = (x[right], y[right])
+        elif len(crossings) == 1:
+            stats['cen'] = x[crossings[0]]
+
+        stats['center_of_mass'] = self.center_of_mass
+        return stats
@@ -1,141 +1,326 @@
 from __future__ import print_function
-# import logging
+import logging
 import sys
 import getpass
 import os
 import time
+import threading
 from threading import Thread
-from Queue import Queue
+from collections import OrderedDict
+
 import numpy as np
 from ..session import register_object
-from ..controls.signal import SignalGroup
+from ..controls.signal import (EpicsSignal, SignalGroup)
+from ..utils import (TimeoutError, enum)
+from ..utils.buffers import (ScanBuffer, RecordBuffer)
+from .demuxer import (Demuxer, Policy)
+from .writer import EventWriter
+from .sinks import MDSSink
+from .stages import (DetectorReadout, TriggerStage, timestamp_getter)
+
+logger = logging.getLogger(__name__)
+
+def _signal_info(sig):
+    '''Data key information for a signal, from its metadata'''
+    if isinstance(sig, EpicsSignal):
+        pv = sig._read_pv
+        if not pv.connected:
+            pv.wait_for_connection()
+
+        source = 'PV:{}'.format(pv.pvname)
+        count = pv.count or 1
+        if sig._string or 'string' in str(pv.type):
+            return {'source': source, 'dtype': 'string', 'shape': None}
+        elif count > 1:
+            return {'source': source, 'dtype': 'array', 'shape': [count]}
+        else:
+            return {'source': source, 'dtype': 'number', 'shape': None}
+
+    # Soft signals have no metadata to go by, so check the current value
+    shape = np.shape(sig.value)
+    source = 'PV:{}'.format(getattr(sig, 'pvname', None))
+    if shape:
+        return {'source': source, 'dtype': 'array', 'shape': list(shape)}
+    else:
+        return {'source': source, 'dtype': 'number', 'shape': None}
 
-from metadatastore import api as mds
 
-# Data formatting helper function
-def _get_info(positioners=None, detectors=None, data=None):
-    """Helper function to extract information from the positioners/detectors
-    and send it over to metadatastore so that ophyd is insulated from mds
-    spec changes
+class EventSchema(object):
+    '''The data keys of the events of a run
+
+    Computed once at the start of the run from the positioners and
+    detectors (dtype, shape and source), rather than from the data of the
+    first event. The schema is used to insert the event descriptor and to
+    format each event.
 
     Parameters
     ----------
-    positioners : list, optional
-        List of ophyd positioners
+    positioners : list
+        Positioners of the scan
     detectors : list
-        List of ophyd detectors, optional
-    data : dict
-        Dictionary of actual data
-    """
-    pv_info = {pos.name: {'source': pos.report['pv'],
-                          'dtype': 'number',
-                          'shape': None}
-               for pos in positioners}
-
-    def get_det_info(detector):
-        """Internal function to grab info from a detector
-        """
-        # grab 'value' from [value, timestamp]
-        val = np.asarray(data[detector.name][0]) 
+        Detectors (signals or signal groups) of the scan
 
-        dtype = 'number'
-        try:
-            shape = val.shape
-        except AttributeError:
-            # val is probably a float...
-            shape = None
-        source = "PV:{}".format(detector.pvname)
-
-        if shape:
-            dtype = 'array'
-        return {detector.name: {'source': source, 'dtype': dtype,
-                                'shape': shape}}
-
-    for det in detectors:
-        if isinstance(det, SignalGroup):
-            for sig in det.signals:
-                pv_info.update(get_det_info(sig))
-        else:
-            pv_info.update(get_det_info(det))
+    Attributes
+    ----------
+    data_keys : OrderedDict
+        {name: {'source': source, 'dtype': dtype, 'shape': shape}}
+    '''
 
-    return pv_info
+    def __init__(self, positioners, detectors):
+        self.data_keys = OrderedDict()
 
-class Demuxer(object):
-    '''Demultiplexer
+        for pos in positioners:
+            try:
+                source = pos.report['pv']
+            except (AttributeError, KeyError, TypeError):
+                source = None
 
-    Attributes
-    ----------
-    inpq : Queue
-    outpqs : list of Queues
-    thread : threading.Thread
-    demux : bool
+            self.data_keys[pos.name] = {'source': source,
+                                        'dtype': 'number',
+                                        'shape': None}
 
-    '''
-    def __init__(self):
-        self.inpq = Queue()
-        self.outpqs = []
-        self.thread = Thread(target=self.demux, args=(self.inpq, self.outpqs))
-        self.demux = False
+        for det in detectors:
+            if isinstance(det, SignalGroup):
+                signals = det.signals
+            else:
+                signals = [det]
 
-    def start(self):
-        self.demux = True
-        self.thread.start()
+            for sig in signals:
+                self.data_keys[sig.name] = _signal_info(sig)
 
-    def stop(self):
-        self.demux = False
-        self.thread.join()
+        self.keys = list(self.data_keys.keys())
 
-    def enqueue(self, data):
-        self.inpq.put(data)
+    def __repr__(self):
+        return '{}(keys={!r})'.format(self.__class__.__name__, self.keys)
 
-    # return an  output queue to pull data from
-    def register(self):
-        outpq = Queue()
-        self.outpqs.append(outpq)
-        return outpq
+    def format_event(self, values):
+        '''Format the values read at a point into event data
 
-    def demux(self, inpq, outpqs):
-        while self.demux:
-            # block waiting for input
-            inp = inpq.get(block=True)
+        Parameters
+        ----------
+        values : dict
+            {name: {'value': value, 'timestamp': timestamp}}
+
+        Returns
+        -------
+        dict
+            {name: [value, timestamp]}, for each key of the schema
+        '''
+        event = {}
+        for key in self.keys:
+            reading = values[key]
+            event[key] = [reading['value'], reading['timestamp']]
+
+        return event
+
+
+# Phases of each scan point, recorded as timing columns. 'settle' includes
+# the read delay, and 'overhead' is the time not spent in any other phase.
+TIMING_PHASES = ('move', 'settle', 'trigger', 'read', 'persist', 'overhead')
+
+_timing_fields = TIMING_PHASES + ('total', )
 
-            # TODO debug statement
-            print('Demuxer: %s' % inp)
 
-            for q in self.outpqs:
-                q.put(inp)
-        return
+def summarize_timings(timings):
+    '''Summarize the per-point timings of a run
+
+    Parameters
+    ----------
+    timings : RecordBuffer
+        Timing fields, one per phase plus the point total, in seconds
+
+    Returns
+    -------
+    summary : OrderedDict
+        {phase: {'mean': mean, 'p95': p95, 'total': total, 'share': share}}
+        where share is the fraction of the total scan point time spent in
+        the phase
+    '''
+    summary = OrderedDict()
+    if not len(timings):
+        return summary
+
+    total = float(np.sum(timings['total']))
+    for phase in _timing_fields:
+        column = timings[phase]
+        phase_total = float(np.sum(column))
+        summary[phase] = {'mean': float(np.mean(column)),
+                          'p95': float(np.percentile(column, 95)),
+                          'total': phase_total,
+                          'share': phase_total / total if total else 0.0,
+                          }
+
+    return summary
+
+
+# Run engine states
+RunState = enum(IDLE='idle',
+                MOVING='moving',
+                SETTLING='settling',
+                TRIGGERING='triggering',
+                READING='reading',
+                SAVING='saving',
+                PAUSED='paused',
+                )
 
 
 class RunEngine(object):
     '''The run engine
 
+    Scans are run as an explicit state machine (see `RunState`) on a scan
+    thread. Rather than polling, the scan thread blocks until it is woken
+    by move completion callbacks, a move timeout watchdog or a stop
+    request, so no time is spent between scan points beyond the requested
+    settle and read delays.
+
+    A run may be paused (by :func:`pause` or ctrl-C) and later continued
+    from its last completed point with :func:`resume`, or ended with
+    :func:`abort`.
+
+    Run documents are stored by a sink (see :mod:`ophyd.runengine.sinks`),
+    chosen per scan with the `sink` scan argument. Without one, the run
+    engine's default sink is used, which itself defaults to
+    :class:`MDSSink` (metadatastore).
+
     Parameters
     ----------
     logger : logging.Logger
+    sink : DocumentSink, optional
+        The default document sink
     '''
 
-    def __init__(self, logger):
+    # Time allowed at the end of a run for live consumers to take their
+    # pending events, after which blocking consumers are switched to drop
+    consumer_timeout = 10.0
+
+    # Delay between firing the triggers and reading the detectors, for runs
+    # which do not set read_delay: detector values may only arrive (as
+    # monitor updates) shortly after the trigger puts have completed
+    trigger_read_delay = 0.05
+
+    # Time allowed for the scan thread to pause on ctrl-C, before giving
+    # control back to the user
+    interrupt_timeout = 5.0
+
+    def __init__(self, logger, sink=None):
+        self.sink = sink
+        self._run_sink = None
         self._demuxer = Demuxer()
         self._logger = register_object(self)
-        self._scan_state = False
+        self._state = RunState.IDLE
+        self._stop_event = threading.Event()
+        self._wakeup = threading.Event()
+        self._writer = None
+        self._pause_requested = False
+        self._checkpoint = None
+        self._timings = None
+        self._timing_summary = None
 
     # start/stop/pause/resume are external api methods
     def start(self):
         pass
 
     def stop(self):
-        self._scan_state = False
+        if self._state == RunState.PAUSED:
+            self.abort()
+        elif self.running:
+            self._pause_requested = False
+            self._stop_event.set()
+            self._wakeup.set()
+
+    @property
+    def state(self):
+        '''The current state of the run engine (see `RunState`)'''
+        return self._state
+
+    def _set_state(self, state):
+        logger.debug('Run engine state %s -> %s', self._state, state)
+        self._state = state
 
     @property
     def running(self):
-        return self._scan_state
+        return self._state != RunState.IDLE
+
+    def register_consumer(self, name=None, maxsize=1000, policy=Policy.BLOCK,
+                          spill_dir=None):
+        '''Register a live consumer of scan events
+
+        Each event is delivered as a dictionary with the keys `seq_num`,
+        `time` and `data`. Iterating over the consumer yields the events of
+        a single run.
+
+        See :class:`ophyd.runengine.demuxer.Consumer` for the parameters.
+
+        Returns
+        -------
+        consumer : Consumer
+        '''
+        return self._demuxer.register(name=name, maxsize=maxsize,
+                                      policy=policy, spill_dir=spill_dir)
+
+    def unregister_consumer(self, consumer):
+        '''Remove a consumer added by :func:`register_consumer`'''
+        self._demuxer.unregister(consumer)
 
     def pause(self):
-        pass
+        '''Pause the run
+
+        The scan thread stops the positioners and the run is checkpointed
+        after the last completed point. :func:`start_run` then returns the
+        data collected so far, leaving the run open for :func:`resume` or
+        :func:`abort`.
+        '''
+        if self._state in (RunState.IDLE, RunState.PAUSED):
+            return
+
+        self._pause_requested = True
+        self._stop_event.set()
+        self._wakeup.set()
 
     def resume(self):
-        pass
+        '''Continue a paused run from its checkpoint
+
+        Points already completed are not repeated; the sequence numbers,
+        event descriptor and data continue on from where the run was
+        paused.
+
+        Returns
+        -------
+        data : ScanBuffer
+            Including the data from before the pause
+        '''
+        if self._state != RunState.PAUSED:
+            raise RuntimeError('There is no paused run to resume')
+
+        checkpoint = self._checkpoint
+        for pos, index in checkpoint['positions']:
+            pos.rewind_trajectory(index)
+
+        scan_args = checkpoint['scan_args']
+        scan_args['checkpoint'] = checkpoint
+        print('Resuming Run at point %d...' % checkpoint['seq_num'])
+        return self._run_scan(scan_args, checkpoint['end_args'])
+
+    def abort(self):
+        '''End a paused run, with the exit status "abort"'''
+        if self._state != RunState.PAUSED:
+            raise RuntimeError('There is no paused run to abort')
+
+        end_args = self._checkpoint['end_args']
+        end_args['state'] = 'abort'
+        self._finish_run(end_args)
+
+    @property
+    def checkpoint(self):
+        '''The number of completed points and the trajectory index of each
+        positioner, of the current or last run'''
+        if self._checkpoint is None:
+            return None
+
+        return {'seq_num': self._checkpoint['seq_num'],
+                'positions': dict((pos.name, index) for pos, index
+                                  in self._checkpoint['positions']),
+                }
 
     def _run_start(self, arg):
         # run any registered user functions
@@ -145,128 +330,335 @@ class RunEngine(object):
     def _end_run(self, arg):
         state = arg.get('state', 'success')
         bre = arg['run_start']
-        mds.insert_run_stop(bre, time.time(), exit_status=state)
+
+        # All events must be inserted before the run is stopped
+        try:
+            self._writer.stop()
+        except Exception as ex:
+            state = 'fail'
+            if self._scan_exc is None:
+                self._scan_exc = ex
+
+        logger.debug('Event writer: %s', self._writer.stats)
+        self._run_sink.insert_run_stop(bre, time.time(), exit_status=state)
+
+        self._timing_summary = summarize_timings(self._timings)
+        if self._timing_summary:
+            lines = ['{:10s} {:>10s} {:>10s} {:>7s}'.format('phase',
+                                                           'mean [ms]',
+                                                           'p95 [ms]',
+                                                           'share')]
+            for phase, stats in self._timing_summary.items():
+                lines.append('{:10s} {:10.3f} {:10.3f} {:6.1f}%'.format(
+                    phase, 1e3 * stats['mean'], 1e3 * stats['p95'],
+                    100. * stats['share']))
+
+            logger.info('Scan point timing (%d points):\n%s',
+                        len(self._timings), '\n'.join(lines))
+
         print('End Run...')
 
-    def _move_positioners(self, positioners=None, settle_time=None, **kwargs):
+    @property
+    def timing_summary(self):
+        '''Per-phase scan point timing of the last run (see
+        `summarize_timings`)'''
+        return self._timing_summary
+
+    @property
+    def writer_stats(self):
+        '''Statistics of the background event writer (for the current or
+        last run), including the write lag and queue depth'''
+        if self._writer is None:
+            return None
+        return self._writer.stats
+
+    def _wake(self, *args, **kwargs):
+        '''Wake the scan thread'''
+        self._wakeup.set()
+
+    def _wait_for_moves(self, positioners, status):
+        '''Block until all moves have completed
+
+        Returns
+        -------
+        completed : bool
+            False if a stop was requested before the moves completed
+
+        Raises
+        ------
+        TimeoutError
+            If any move did not complete within its timeout
+        '''
+        for st in status:
+            st.add_callback(self._wake)
+
+        watchdog = None
+        try:
+            while True:
+                self._wakeup.clear()
+                if self._stop_event.is_set():
+                    return False
+
+                pending = [st for st in status if not st.done]
+                if not pending:
+                    return True
+
+                # Each status carries a distance- and velocity-aware timeout,
+                # so a stuck positioner is caught without waiting a fixed time
+                timed_out = [st for st in pending if st.timed_out]
+                if timed_out:
+                    for pos in positioners:
+                        pos.stop()
+
+                    raise TimeoutError('Positioners failed to reach the next '
+                                       'scan point: %s' % (timed_out, ))
+
+                deadlines = [st.start_ts + st.timeout for st in pending
+                             if st.timeout is not None]
+                if deadlines and (watchdog is None or
+                                  not watchdog.is_alive()):
+                    remaining = max(min(deadlines) - time.time(), 0.0)
+                    watchdog = threading.Timer(remaining + 0.001, self._wake)
+                    watchdog.daemon = True
+                    watchdog.start()
+
+                self._wakeup.wait()
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+
+    def _move_positioners(self, positioners=None, settle_time=None,
+                          timestamps=None, timing=None, **kwargs):
+        self._set_state(RunState.MOVING)
+        t0 = time.time()
         try:
             status = [pos.move_next(wait=False)[1] for pos in positioners]
         except StopIteration:
             return None
 
         # status now holds the MoveStatus() instances
-        time.sleep(0.05)
-        # TODO: this should iterate at most N times to catch hangups
-        while not all(s.done for s in status):
-            time.sleep(0.1)
-        if settle_time is not None:
-            time.sleep(settle_time)
-
-        # use metadatastore to format the events so that ophyd is insulated from
-        # metadatastore spec changes
+        if not self._wait_for_moves(positioners, status):
+            return None
+
+        t1 = time.time()
+        timing['move'] = t1 - t0
+
+        if settle_time:
+            self._set_state(RunState.SETTLING)
+            if self._stop_event.wait(settle_time):
+                return None
+
+            timing['settle'] = time.time() - t1
+
+        # the document sink formats these into event data, so that ophyd is
+        # insulated from document spec changes
         return {
             pos.name: {
-                'timestamp': pos.timestamp[pos.pvname.index(pos.report['pv'])],
+                'timestamp': get_timestamp(),
                 'value': pos.position}
-            for pos in positioners}
+            for pos, get_timestamp in zip(positioners, timestamps)}
+
+    def _fly_loop(self, **kwargs):
+        '''A fly scan: a single continuous move, during which the positioner
+        readback and detectors are captured, followed by an event for each
+        point of the grid the captured data is reconstructed onto
+
+        A fly move which is paused is continued from where the positioner
+        stopped, adding to the same capture.
+
+        Returns
+        -------
+        completed : bool
+            False if the scan was interrupted (by stop or pause)
+        '''
+        capture = kwargs['fly']
+        schema = kwargs.get('schema')
+        data = kwargs.get('data')
+        timings = data.timings
+        peak_stats = kwargs.get('peak_stats') or []
+        pos = capture.pos
+
+        checkpoint = self._checkpoint
+        event_descriptor = checkpoint['event_descriptor']
+
+        if not checkpoint.get('flown'):
+            self._set_state(RunState.MOVING)
+            capture.start()
+            try:
+                status = pos.move(kwargs['fly_target'], wait=False)
+                if not self._wait_for_moves([pos], [status]):
+                    return False
+            finally:
+                capture.stop()
+
+            checkpoint['flown'] = True
+
+        self._set_state(RunState.SAVING)
+        grid = np.asarray(kwargs['grid'], dtype=float)
+        values = capture.reconstruct(grid, mode=kwargs.get('fly_mode',
+                                                           'interpolate'))
+        times = capture.times_at(grid)
+
+        for seq_num in range(checkpoint['seq_num'], len(grid)):
+            if self._stop_event.is_set():
+                return False
+
+            timing = dict.fromkeys(TIMING_PHASES, 0.0)
+            point_start = time.time()
+
+            detvals = schema.format_event(
+                dict((name, {'value': value[seq_num],
+                             'timestamp': times[seq_num]})
+                     for name, value in values.items()))
+
+            bundle_time = time.time()
+            self._writer.enqueue(event_descriptor=event_descriptor,
+                                 time=bundle_time, data=detvals,
+                                 seq_num=seq_num)
+
+            self._demuxer.enqueue({'seq_num': seq_num, 'time': bundle_time,
+                                   'data': detvals})
+
+            data.append(detvals)
+            for stats in peak_stats:
+                stats.update(detvals[stats.x][0], detvals[stats.y][0],
+                             bundle_time)
+
+            checkpoint['seq_num'] = seq_num + 1
+
+            timing['total'] = timing['persist'] = time.time() - point_start
+            timings.append(timing, point_start)
+
+        return True
 
     def _start_scan(self, **kwargs):
-        # print('Starting Scan...{}'.format(kwargs))
-        run_start = kwargs.get('run_start')
+        '''Scan thread target; records any exception for start_run'''
+        paused = False
+        if kwargs.get('fly') is not None:
+            loop = self._fly_loop
+        else:
+            loop = self._scan_loop
+
+        try:
+            completed = loop(**kwargs)
+            paused = (not completed) and self._pause_requested
+        except Exception as ex:
+            self._scan_exc = ex
+        finally:
+            if paused:
+                for pos in kwargs.get('positioners') or []:
+                    pos.stop()
+
+                self._set_state(RunState.PAUSED)
+            else:
+                self._set_state(RunState.IDLE)
+
+    def _scan_loop(self, **kwargs):
+        '''The scan itself
+
+        Returns
+        -------
+        completed : bool
+            False if the scan was interrupted (by stop or pause)
+        '''
+        schema = kwargs.get('schema')
         dets = kwargs.get('detectors')
         trigs = kwargs.get('triggers')
         data = kwargs.get('data')
+        timings = data.timings
+        peak_stats = kwargs.get('peak_stats') or []
+        read_delay = kwargs.get('read_delay')
+
+        positioners = kwargs.get('positioners')
+
+        # Plan the per-point triggering and readout once for the run
+        if trigs:
+            trigger = TriggerStage(trigs,
+                                   timeout=kwargs.get('trigger_timeout'),
+                                   stop_event=self._stop_event)
+            if read_delay is None:
+                read_delay = self.trigger_read_delay
+        else:
+            trigger = None
 
-        # creation of the event descriptor should be delayed until the first
-        # event comes in. Set it to None for now
-        event_descriptor = None
+        readout = DetectorReadout(dets)
+        timestamps = [timestamp_getter(pos) for pos in positioners]
 
-        seq_num = 0
-        while self._scan_state is True:
-            print('self._scan_state is True in self._start_scan')
-            posvals = self._move_positioners(**kwargs)
-            print('moved positioners')
-            # if we're done iterating over positions, get outta Dodge
+        # A resumed run continues with the checkpointed sequence number
+        checkpoint = self._checkpoint
+        event_descriptor = checkpoint['event_descriptor']
+        seq_num = checkpoint['seq_num']
+
+        while not self._stop_event.is_set():
+            timing = dict.fromkeys(TIMING_PHASES, 0.0)
+            point_start = time.time()
+
+            posvals = self._move_positioners(timestamps=timestamps,
+                                             timing=timing, **kwargs)
             if posvals is None:
-                break
-            # execute user code
-            # print('execute user code')
-            # detvals = {d.name: d.value for d in dets}
-            # TODO: handle triggers here (pvs that cause detectors to fire)
-            if trigs is not None:
-                for t in trigs:
-                    t.put(1, wait=True)
-            # TODO: again, WTF is with the delays required? CA is too fast,
-            # and python is too slow (or vice versa!)
-            time.sleep(0.05)
-            detvals = {}
-            for det in dets:
-                if isinstance(det, SignalGroup):
-                    # If we have a signal group, loop over all names
-                    # and signals
-                    # print('vars(det) in ophyd _start_scan', vars(det))
-                    for sig in det.signals:
-                        detvals.update({sig.name: {
-                            'timestamp': sig.timestamp[sig.pvname.index(sig.report['pv'])],
-                            'value': sig.value}})
-                else:
-                    detvals.update({
-                        det.name: {'timestamp': det.timestamp,
-                                   'value': det.value}})
+                if self._stop_event.is_set():
+                    break
+
+                # if we're done iterating over positions, get outta Dodge
+                return True
+
+            if trigger is not None:
+                self._set_state(RunState.TRIGGERING)
+                t0 = time.time()
+                if not trigger.fire():
+                    break
+                timing['trigger'] = time.time() - t0
+
+            # Detectors which update their values asynchronously after
+            # triggering may need a delay before reading
+            if read_delay:
+                t0 = time.time()
+                if self._stop_event.wait(read_delay):
+                    break
+                timing['settle'] += time.time() - t0
+
+            self._set_state(RunState.READING)
+            t0 = time.time()
+            detvals = readout.read()
             detvals.update(posvals)
-            detvals = mds.format_events(detvals)
-            # TODO: timestamp this datapoint?
-            # data.update({'timestamp': time.time()})
-            # pass data onto Demuxer for distribution
-            print('datapoint[{}]: {}'.format(seq_num, detvals))
+            detvals = schema.format_event(detvals)
+            timing['read'] = time.time() - t0
+            logger.debug('datapoint[%d]: %s', seq_num, detvals)
+
+            self._set_state(RunState.SAVING)
+            t0 = time.time()
             # grab the current time as a timestamp that describes when the
             # event data was bundled together
             bundle_time = time.time()
-            # actually insert the event into metadataStore
-            try:
-                print('\n\ninserting event {}\n------------------'.format(seq_num))
-                event = mds.insert_event(event_descriptor=event_descriptor,
-                                         time=bundle_time, data=detvals,
-                                         seq_num=seq_num)
-            except mds.EventDescriptorIsNoneError:
-                # the time when the event descriptor was created
-                print('event_descriptor has not been created. creating it now...')
-                evdesc_creation_time = time.time()
-                data_key_info = _get_info(positioners=kwargs.get('positioners'),
-                                          detectors=dets, data=detvals)
-
-                event_descriptor = mds.insert_event_descriptor(
-                    run_start=run_start, time=evdesc_creation_time,
-                    data_keys=mds.format_data_keys(data_key_info))
-                print('\n\nevent_descriptor: {}\n'.format(vars(event_descriptor)))
-                # insert the event again. this time it better damn well work
-                print('\n\ninserting event {}\n------------------'.format(seq_num))
-                event = mds.insert_event(event_descriptor=event_descriptor,
-                                         time=bundle_time, data=detvals,
-                                         seq_num=seq_num)
-            print('\n\nevent {}\n--------\n{}'.format(seq_num, vars(event)))
+            # queue the event for insertion by the background writer
+            self._writer.enqueue(event_descriptor=event_descriptor,
+                                 time=bundle_time, data=detvals,
+                                 seq_num=seq_num)
+
+            self._demuxer.enqueue({'seq_num': seq_num, 'time': bundle_time,
+                                   'data': detvals})
 
             seq_num += 1
-            # update the 'data' object from detvals dict
-            for k, v in detvals.items():
-                data[k].append(v)
-
-            if kwargs.get('positioners') is None:
-                break
-            if len(kwargs.get('positioners')) == 0:
-                break
-        self._scan_state = False
-        return
-
-    def _get_data_keys(self, **kwargs):
-        # ATM, these are both lists
-        names = [o.name for o in kwargs.get('positioners')]
-        for det in kwargs.get('detectors'):
-            if isinstance(det, SignalGroup):
-                names += [o.name for o in det.signals]
-            else:
-                names.append(det.name)
-        return names
+            data.append(detvals)
+            timing['persist'] = time.time() - t0
+
+            for stats in peak_stats:
+                stats.update(detvals[stats.x][0], detvals[stats.y][0],
+                             bundle_time)
+
+            checkpoint.update(seq_num=seq_num,
+                              positions=[(pos, pos.trajectory_index)
+                                         for pos in positioners])
+
+            timing['total'] = total = time.time() - point_start
+            timing['overhead'] = total - sum(timing[phase] for phase
+                                             in TIMING_PHASES[:-1])
+            timings.append(timing, point_start)
+
+            if not positioners:
+                return True
+
+        return False
 
     def start_run(self, runid, start_args=None, end_args=None, scan_args=None):
         """
@@ -277,11 +669,41 @@ class RunEngine(object):
         start_args
         end_args
         scan_args
+            May include `settle_time` (after each move) and `read_delay`
+            (after triggering, before reading detectors; runs with triggers
+            default to `trigger_read_delay`), in seconds, and
+            `write_batch_size`, the maximum number of events per insert.
+            `schema` is the :class:`EventSchema` of the run, if already
+            computed (e.g., while a previous run was in progress).
+            `sink` selects the document sink for this run, and
+            `num_points` is the expected number of points (used to size
+            the initial data buffer).
+
+            `peak_stats` is a list of :class:`PeakStats`, which are cleared
+            and then updated at every point; statistics of data keys which
+            are not scalar are skipped.
+
+            The time spent in each phase of every point (see
+            `TIMING_PHASES`) is recorded in the `timings` records of the
+            returned data, and summarized at the end of the run (see
+            `timing_summary`).
+
+            `triggers` are fired together at each point, waiting for all
+            puts to complete; nested lists of triggers are fired as
+            separate groups, one after another. `trigger_timeout` is the
+            timeout for all triggers, or a dictionary of per-trigger
+            timeouts (see :class:`TriggerStage` for the default).
+
+            A fly scan is run if `fly` is given: a :class:`FlyCapture` of
+            the (single) positioner and the detectors. The positioner is
+            moved to `fly_target`, and the captured data is reconstructed
+            onto `grid` (with `fly_mode`, see
+            :func:`FlyCapture.reconstruct`), one event per grid point.
 
         Returns
         -------
-        data : dict
-            {data_name: []}
+        data : ScanBuffer
+            Columns of values and timestamps for each data key
         """
         if start_args is None:
             start_args = {}
@@ -301,9 +723,41 @@ class RunEngine(object):
             owner = getpass.getuser()
         runid = str(runid)
 
-        blc = mds.insert_beamline_config(beamline_config, time=time.time())
-        # insert the run_start into metadatastore
-        run_start = mds.insert_run_start(
+        sink = scan_args.get('sink')
+        if sink is None:
+            if self.sink is None:
+                self.sink = MDSSink()
+            sink = self.sink
+
+        self._run_sink = sink
+        scan_args['sink'] = sink
+
+        # The event descriptor is known before the first point is taken
+        schema = scan_args.get('schema')
+        if schema is None:
+            schema = EventSchema(scan_args['positioners'],
+                                 scan_args['detectors'])
+
+        peak_stats = []
+        for stats in scan_args.get('peak_stats') or []:
+            try:
+                dtypes = [schema.data_keys[key]['dtype']
+                          for key in (stats.x, stats.y)]
+            except KeyError as ex:
+                raise ValueError('Peak statistics of unknown data key: %s'
+                                 % ex)
+
+            if dtypes == ['number', 'number']:
+                stats.clear()
+                peak_stats.append(stats)
+            else:
+                logger.debug('Skipping non-scalar peak statistics %s', stats)
+
+        scan_args['peak_stats'] = peak_stats
+
+        blc = sink.insert_beamline_config(beamline_config, time=time.time())
+        # insert the run_start
+        run_start = sink.insert_run_start(
             time=time.time(), beamline_id=beamline_id, owner=owner,
             beamline_config=blc, scan_id=runid, custom=custom)
 
@@ -311,26 +765,90 @@ class RunEngine(object):
         scan_args['run_start'] = run_start
         end_args['run_start'] = run_start
 
-        keys = self._get_data_keys(**scan_args)
-        data = {k: [] for k in keys}
+        event_descriptor = sink.insert_event_descriptor(
+            run_start=run_start, time=time.time(),
+            data_keys=sink.format_data_keys(schema.data_keys))
+        logger.debug('Created event descriptor: %s', event_descriptor)
+
+        scan_args['schema'] = schema
+        data = ScanBuffer(schema.data_keys,
+                          capacity=scan_args.get('num_points'))
+        data.timings = RecordBuffer(_timing_fields)
 
         scan_args['data'] = data
+        self._timings = data.timings
+        self._timing_summary = None
 
         self._run_start(start_args)
+        self._checkpoint = {'scan_args': scan_args,
+                            'end_args': end_args,
+                            'seq_num': 0,
+                            'event_descriptor': event_descriptor,
+                            'positions': [],
+                            }
+        if scan_args.get('fly') is None:
+            self._checkpoint['positions'] = [(pos, pos.trajectory_index) for
+                                             pos in scan_args['positioners']]
+
+        self._writer = EventWriter(
+            sink.insert_event, insert_events=sink.insert_events,
+            batch_size=scan_args.get('write_batch_size', 100))
+        self._writer.start()
+        self._demuxer.start()
+        return self._run_scan(scan_args, end_args)
+
+    def _run_scan(self, scan_args, end_args):
+        '''Run the scan thread, until the run completes or is paused'''
+        self._scan_exc = None
+        self._pause_requested = False
+        self._stop_event.clear()
         self._scan_thread = Thread(target=self._start_scan,
                                    name='Scanner',
                                    kwargs=scan_args)
         self._scan_thread.daemon = True
-        self._scan_state = True
+        self._set_state(RunState.MOVING)
         self._scan_thread.start()
         try:
-            while self._scan_state is True:
-                time.sleep(0.10)
+            # Join with a timeout so that KeyboardInterrupt is still
+            # delivered to the main thread
+            while self._scan_thread.is_alive():
+                self._scan_thread.join(0.1)
         except KeyboardInterrupt:
-            self._scan_state = False
-            self._scan_thread.join()
+            # ctrl-C pauses the run
+            self.pause()
+            self._scan_thread.join(self.interrupt_timeout)
+            if self._scan_thread.is_alive():
+                logger.error('Scan thread did not pause within %s s',
+                             self.interrupt_timeout)
+                raise
+
+        if self._state == RunState.PAUSED and self._scan_exc is None:
+            try:
+                # Everything up to the checkpoint is stored while paused
+                self._writer.flush()
+            except Exception as ex:
+                self._scan_exc = ex
+            else:
+                print('Run paused after %d points. Call resume() to continue '
+                      'or abort() to end the run.' %
+                      self._checkpoint['seq_num'])
+                return scan_args['data']
+
+        if self._scan_exc is not None:
+            end_args['state'] = 'fail'
+        elif self._stop_event.is_set():
             end_args['state'] = 'abort'
-        finally:
-            self._end_run(end_args)
 
-        return data
+        self._finish_run(end_args)
+
+        if self._scan_exc is not None:
+            raise self._scan_exc
+
+        return scan_args['data']
+
+    def _finish_run(self, end_args):
+        try:
+            self._demuxer.stop(timeout=self.consumer_timeout)
+            self._end_run(end_args)
+        finally:
+            self._set_state(RunState.IDLE)
@@ -0,0 +1,359 @@
+'''
+:mod:`ophyd.runengine.sinks` - Run document sinks
+=================================================
+
+.. module:: ophyd.runengine.sinks
+   :synopsis: Destinations for run start, descriptor, event and run stop
+              documents
+'''
+
+from __future__ import print_function
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentSink(object):
+    '''Base class for run document sinks
+
+    A sink stores the documents generated by the :class:`RunEngine`. The
+    insert methods mirror the metadatastore API, so that the run engine
+    itself is independent of where the documents end up. Each insert
+    method returns the document (or a handle to it) which is then passed
+    back in to later inserts.
+
+    Subclasses must implement :func:`_store`, or override the insert
+    methods.
+    '''
+
+    def __repr__(self):
+        return '{}()'.format(self.__class__.__name__)
+
+    def _new_uid(self):
+        return str(uuid.uuid4())
+
+    def _store(self, name, doc):
+        '''Store a single document
+
+        Parameters
+        ----------
+        name : {'run_start', 'descriptor', 'event', 'run_stop'}
+            The document type
+        doc : dict
+            The document
+        '''
+        raise NotImplementedError()
+
+    def _store_many(self, name, docs):
+        '''Store several documents of the same type'''
+        for doc in docs:
+            self._store(name, doc)
+
+    def format_data_keys(self, data_keys):
+        '''Format the data keys of an event descriptor'''
+        return data_keys
+
+    def insert_beamline_config(self, config, time):
+        if config is None:
+            config = {}
+        return config
+
+    def insert_run_start(self, time, beamline_id, owner=None,
+                         beamline_config=None, scan_id=None, custom=None):
+        doc = {'uid': self._new_uid(),
+               'time': time,
+               'beamline_id': beamline_id,
+               'owner': owner,
+               'beamline_config': beamline_config,
+               'scan_id': scan_id,
+               'custom': custom,
+               }
+        self._store('run_start', doc)
+        return doc
+
+    def insert_event_descriptor(self, run_start, time, data_keys):
+        doc = {'uid': self._new_uid(),
+               'run_start': run_start['uid'],
+               'time': time,
+               'data_keys': data_keys,
+               }
+        self._store('descriptor', doc)
+        return doc
+
+    def _event_doc(self, event_descriptor, time, data, seq_num):
+        return {'uid': self._new_uid(),
+                'descriptor': event_descriptor['uid'],
+                'time': time,
+                'data': data,
+                'seq_num': seq_num,
+                }
+
+    def insert_event(self, event_descriptor, time, data, seq_num):
+        doc = self._event_doc(event_descriptor, time, data, seq_num)
+        self._store('event', doc)
+        return doc
+
+    def insert_events(self, event_descriptor, events):
+        '''Insert several events sharing a descriptor
+
+        Parameters
+        ----------
+        event_descriptor
+            The descriptor, as returned by :func:`insert_event_descriptor`
+        events : list of dict
+            Events, each with the keys `time`, `data` and `seq_num`
+        '''
+        docs = [self._event_doc(event_descriptor, **event)
+                for event in events]
+        self._store_many('event', docs)
+        return docs
+
+    def insert_run_stop(self, run_start, time, exit_status='success'):
+        doc = {'uid': self._new_uid(),
+               'run_start': run_start['uid'],
+               'time': time,
+               'exit_status': exit_status,
+               }
+        self._store('run_stop', doc)
+        return doc
+
+    def close(self):
+        '''Release any resources held by the sink'''
+        pass
+
+
+class MDSSink(DocumentSink):
+    '''Documents are inserted into metadatastore
+
+    metadatastore is imported on creation of the first MDSSink, so that
+    scans using other sinks do not require it.
+    '''
+
+    def __init__(self):
+        from metadatastore import api as mds
+        self._mds = mds
+
+        # Bulk inserts are not available in all versions
+        if not hasattr(mds, 'bulk_insert_events'):
+            self.insert_events = None
+
+    def format_data_keys(self, data_keys):
+        return self._mds.format_data_keys(data_keys)
+
+    def insert_beamline_config(self, config, time):
+        return self._mds.insert_beamline_config(config, time=time)
+
+    def insert_run_start(self, time, beamline_id, owner=None,
+                         beamline_config=None, scan_id=None, custom=None):
+        return self._mds.insert_run_start(time=time, beamline_id=beamline_id,
+                                          owner=owner,
+                                          beamline_config=beamline_config,
+                                          scan_id=scan_id, custom=custom)
+
+    def insert_event_descriptor(self, run_start, time, data_keys):
+        return self._mds.insert_event_descriptor(run_start=run_start,
+                                                 time=time,
+                                                 data_keys=data_keys)
+
+    def insert_event(self, event_descriptor, time, data, seq_num):
+        return self._mds.insert_event(event_descriptor=event_descriptor,
+                                      time=time, data=data, seq_num=seq_num)
+
+    def insert_events(self, event_descriptor, events):
+        return self._mds.bulk_insert_events(event_descriptor, events)
+
+    def insert_run_stop(self, run_start, time, exit_status='success'):
+        return self._mds.insert_run_stop(run_start, time,
+                                         exit_status=exit_status)
+
+
+class MemorySink(DocumentSink):
+    '''Documents are kept in memory
+
+    Attributes
+    ----------
+    documents : dict
+        Lists of documents, keyed on the document type ('run_start',
+        'descriptor', 'event', 'run_stop')
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.documents = {'run_start': [],
+                          'descriptor': [],
+                          'event': [],
+                          'run_stop': [],
+                          }
+
+    def _store(self, name, doc):
+        with self._lock:
+            self.documents[name].append(doc)
+
+    def _store_many(self, name, docs):
+        with self._lock:
+            self.documents[name].extend(docs)
+
+    @property
+    def events(self):
+        return self.documents['event']
+
+    def clear(self):
+        '''Remove all stored documents'''
+        with self._lock:
+            for docs in self.documents.values():
+                del docs[:]
+
+
+def _to_builtin(obj):
+    '''Convert numpy values for serialization'''
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError('Cannot serialize {!r}'.format(obj))
+
+
+class FileSink(DocumentSink):
+    '''Documents are appended to a file
+
+    Each record is a `[name, document]` pair, where name is the document
+    type.
+
+    Parameters
+    ----------
+    path : str
+        The file to append to
+    format : {'jsonl', 'msgpack'}, optional
+        One JSON record per line, or a stream of msgpack records (requires
+        the msgpack package)
+    '''
+
+    def __init__(self, path, format='jsonl'):
+        if format == 'jsonl':
+            self._file = open(path, 'a')
+            self._encode = self._encode_json
+        elif format == 'msgpack':
+            if msgpack is None:
+                raise ImportError('The msgpack package is required for the '
+                                  'msgpack format')
+            self._file = open(path, 'ab')
+            self._packer = msgpack.Packer(default=_to_builtin)
+            self._encode = self._packer.pack
+        else:
+            raise ValueError('Unknown format: %s' % format)
+
+        self.path = path
+        self.format = format
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '{0}({1.path!r}, format={1.format!r})' \
+               ''.format(self.__class__.__name__, self)
+
+    def _encode_json(self, record):
+        return json.dumps(record, default=_to_builtin) + '\n'
+
+    def _store(self, name, doc):
+        record = self._encode([name, doc])
+        with self._lock:
+            self._file.write(record)
+            if name == 'run_stop':
+                self._file.flush()
+
+    def _store_many(self, name, docs):
+        records = [self._encode([name, doc]) for doc in docs]
+        with self._lock:
+            self._file.writelines(records)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class SQLiteSink(DocumentSink):
+    '''Documents are stored in an SQLite database
+
+    Batches of events are inserted in a single transaction. Event data is
+    stored as JSON.
+
+    Parameters
+    ----------
+    path : str
+        The database file (or ':memory:')
+    '''
+
+    _schema = ['''CREATE TABLE IF NOT EXISTS run_starts
+                  (uid TEXT PRIMARY KEY, time REAL, scan_id TEXT,
+                   doc TEXT)''',
+               '''CREATE TABLE IF NOT EXISTS descriptors
+                  (uid TEXT PRIMARY KEY, run_start TEXT, time REAL,
+                   doc TEXT)''',
+               '''CREATE TABLE IF NOT EXISTS events
+                  (uid TEXT PRIMARY KEY, descriptor TEXT, seq_num INTEGER,
+                   time REAL, data TEXT)''',
+               '''CREATE TABLE IF NOT EXISTS run_stops
+                  (uid TEXT PRIMARY KEY, run_start TEXT, time REAL,
+                   exit_status TEXT)''',
+               ]
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # Events are inserted from the writer thread
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+
+        with self._conn:
+            for statement in self._schema:
+                self._conn.execute(statement)
+
+    def __repr__(self):
+        return '{0}({1.path!r})'.format(self.__class__.__name__, self)
+
+    def _dumps(self, obj):
+        return json.dumps(obj, default=_to_builtin)
+
+    def _row(self, name, doc):
+        if name == 'run_start':
+            return (doc['uid'], doc['time'], doc['scan_id'], self._dumps(doc))
+        elif name == 'descriptor':
+            return (doc['uid'], doc['run_start'], doc['time'],
+                    self._dumps(doc))
+        elif name == 'event':
+            return (doc['uid'], doc['descriptor'], doc['seq_num'],
+                    doc['time'], self._dumps(doc['data']))
+        elif name == 'run_stop':
+            return (doc['uid'], doc['run_start'], doc['time'],
+                    doc['exit_status'])
+
+    _tables = {'run_start': ('run_starts', 4),
+               'descriptor': ('descriptors', 4),
+               'event': ('events', 5),
+               'run_stop': ('run_stops', 4),
+               }
+
+    def _store_many(self, name, docs):
+        table, columns = self._tables[name]
+        statement = 'INSERT INTO {} VALUES ({})'.format(
+            table, ', '.join('?' * columns))
+
+        rows = [self._row(name, doc) for doc in docs]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(statement, rows)
+
+    def _store(self, name, doc):
+        self._store_many(name, [doc])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,271 @@
+'''
+:mod:`ophyd.runengine.stages` - Scan point stages
+=================================================
+
+.. module:: ophyd.runengine.stages
+   :synopsis: Triggering and detector readout for each point of a scan
+'''
+
+from __future__ import print_function
+import functools
+import logging
+import threading
+import time
+
+from epics import ca
+
+from ..controls.signal import (EpicsSignal, SignalGroup)
+from ..utils import TimeoutError
+
+
+logger = logging.getLogger(__name__)
+
+
+def _now_getter():
+    return time.time()
+
+
+def timestamp_getter(obj):
+    '''A function returning the readback timestamp of a signal or positioner
+
+    Lookups which are constant over a run (e.g., the index of the readback
+    PV in a :class:`SignalGroup`) are done once, up front. If no timestamp
+    is available, the current time is used.
+    '''
+    try:
+        timestamp = obj.timestamp
+    except AttributeError:
+        return _now_getter
+
+    if isinstance(timestamp, list):
+        try:
+            index = obj.pvname.index(obj.report['pv'])
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return _now_getter
+
+        def get_timestamp():
+            ts = obj.timestamp[index]
+            return ts if ts is not None else time.time()
+    else:
+        def get_timestamp():
+            ts = obj.timestamp
+            return ts if ts is not None else time.time()
+
+    return get_timestamp
+
+
+class DetectorReadout(object):
+    '''Reads all detectors at a scan point
+
+    The read plan is built once, on creation: :class:`SignalGroup`
+    detectors are expanded into their signals, and EPICS signals are
+    separated from the rest. At each point:
+
+    * monitored EPICS signals are read from their monitor cache (no channel
+      access traffic)
+    * for unmonitored EPICS signals, gets for all of the PVs are issued at
+      once and then collected, so the round trips overlap rather than
+      adding up. The gets request the time type of each PV, so that the
+      timestamp is that of the value on the IOC.
+    * other signals are read through their `value` and `timestamp`
+
+    Parameters
+    ----------
+    detectors : list of Signal or SignalGroup
+    timeout : float, optional
+        Timeout for each channel access get
+    '''
+
+    def __init__(self, detectors, timeout=None):
+        self.timeout = timeout
+
+        self._epics = []
+        self._other = []
+
+        for det in detectors:
+            if isinstance(det, SignalGroup):
+                signals = det.signals
+            else:
+                signals = [det]
+
+            for sig in signals:
+                if isinstance(sig, EpicsSignal) and not sig._string:
+                    self._epics.append((sig.name, sig, sig._read_pv))
+                else:
+                    self._other.append((sig.name, sig, timestamp_getter(sig)))
+
+    def __repr__(self):
+        return '{}(names={!r})'.format(self.__class__.__name__, self.names)
+
+    @property
+    def names(self):
+        '''Data key names, in read order'''
+        return ([name for name, sig, pv in self._epics] +
+                [name for name, sig, get_ts in self._other])
+
+    def read(self):
+        '''Read all of the detectors
+
+        Returns
+        -------
+        dict
+            {name: {'value': value, 'timestamp': timestamp}}
+        '''
+        values = {}
+
+        fetch = []
+        for name, sig, pv in self._epics:
+            if not pv.connected:
+                # Blocks for the connection
+                values[name] = {'value': sig.get(),
+                                'timestamp': timestamp_getter(sig)()}
+            elif pv.auto_monitor and pv.value is not None:
+                values[name] = {'value': pv.value,
+                                'timestamp': pv.timestamp}
+            else:
+                ftype = ca.promote_type(pv.chid, use_time=True)
+                ca.get(pv.chid, ftype=ftype, wait=False)
+                fetch.append((name, pv, ftype))
+
+        if fetch:
+            ca.flush_io()
+
+        for name, sig, get_timestamp in self._other:
+            values[name] = {'value': sig.value,
+                            'timestamp': get_timestamp()}
+
+        for name, pv, ftype in fetch:
+            reading = ca.get_complete_with_metadata(pv.chid, ftype=ftype,
+                                                    timeout=self.timeout)
+            if reading is None:
+                # Timed out
+                values[name] = {'value': None,
+                                'timestamp': time.time()}
+            else:
+                values[name] = {'value': reading['value'],
+                                'timestamp': reading['timestamp']}
+
+        return values
+
+
+class TriggerStage(object):
+    '''Fires the triggers at a scan point
+
+    Triggers are fired in groups. All of the triggers in a group are put at
+    once, and the group is complete when every put has completed, so the
+    detectors expose simultaneously. Groups are fired one after another.
+
+    EPICS triggers use put completion callbacks; other triggers are
+    complete as soon as their put returns.
+
+    Parameters
+    ----------
+    triggers : list
+        Triggers, or lists of triggers (groups). Single triggers at the
+        top level are fired together as one group.
+    value : optional
+        The value to put to each trigger
+    timeout : float or dict, optional
+        Timeout for the triggers, in seconds: either one value for all
+        triggers, or a dictionary of trigger (or trigger name) to timeout.
+        Triggers without a timeout use `default_timeout`.
+    stop_event : threading.Event, optional
+        Stop waiting for the triggers when set
+    '''
+
+    # As the timeout of a blocking put
+    default_timeout = 30.0
+
+    # Interval at which the stop event is checked while waiting
+    poll_interval = 0.1
+
+    def __init__(self, triggers, value=1, timeout=None, stop_event=None):
+        self.value = value
+        self.stop_event = stop_event
+
+        single = [trig for trig in triggers
+                  if not isinstance(trig, (list, tuple))]
+        self.groups = [list(group) for group in triggers
+                       if isinstance(group, (list, tuple))]
+        if single:
+            self.groups.insert(0, single)
+
+        self._timeouts = [[self._get_timeout(timeout, trig) for trig in group]
+                          for group in self.groups]
+
+    def __repr__(self):
+        groups = [[trig.name for trig in group] for group in self.groups]
+        return '{}(groups={!r})'.format(self.__class__.__name__, groups)
+
+    def _get_timeout(self, timeout, trig):
+        if isinstance(timeout, dict):
+            try:
+                timeout = timeout[trig]
+            except (KeyError, TypeError):
+                timeout = timeout.get(trig.name)
+
+        if timeout is None:
+            return self.default_timeout
+
+        return timeout
+
+    def fire(self):
+        '''Fire all groups of triggers, waiting for each to complete
+
+        Returns
+        -------
+        completed : bool
+            False if the stop event was set before the triggers completed
+
+        Raises
+        ------
+        TimeoutError
+            If any trigger does not complete within its timeout
+        '''
+        for group, timeouts in zip(self.groups, self._timeouts):
+            if not self._fire_group(group, timeouts):
+                return False
+
+        return True
+
+    def _fire_group(self, group, timeouts):
+        lock = threading.Lock()
+        done = threading.Event()
+        pending = set(range(len(group)))
+
+        def finished(index, **kwargs):
+            with lock:
+                pending.discard(index)
+                if not pending:
+                    done.set()
+
+        if not pending:
+            return True
+
+        t0 = time.time()
+        for index, trig in enumerate(group):
+            if isinstance(trig, EpicsSignal):
+                trig.put(self.value, use_complete=True,
+                         callback=functools.partial(finished, index))
+            else:
+                trig.put(self.value)
+                finished(index)
+
+        while not done.is_set():
+            if self.stop_event is not None and self.stop_event.is_set():
+                return False
+
+            now = time.time()
+            with lock:
+                late = [group[index].name for index in sorted(pending)
+                        if t0 + timeouts[index] <= now]
+                deadlines = [t0 + timeouts[index] for index in pending]
+
+            if late:
+                raise TimeoutError('Triggers did not complete: %s' %
+                                   ', '.join(late))
+
+            if deadlines:
+                done.wait(min(min(deadlines) - now, self.poll_interval))
+
+        return True
@@ -0,0 +1,213 @@
+'''
+:mod:`ophyd.runengine.writer` - Background event writer
+=======================================================
+
+.. module:: ophyd.runengine.writer
+   :synopsis: Batched, ordered event inserts off of the scan thread
+'''
+
+from __future__ import print_function
+import logging
+from threading import Thread
+from time import time as _now
+from Queue import (Queue, Empty)
+
+
+logger = logging.getLogger(__name__)
+
+# Stops the writer thread
+_STOP = object()
+
+
+class EventWriter(object):
+    '''Inserts events on a background thread, in batches
+
+    Events are inserted in the order they were enqueued, so `seq_num`
+    ordering is preserved. Pending events are collected into batches of up
+    to `batch_size`, which are inserted with `insert_events` where
+    available, or one at a time with `insert_event` otherwise.
+
+    Parameters
+    ----------
+    insert_event : callable
+        Insert a single event: `insert_event(**event)`
+    insert_events : callable, optional
+        Bulk insert: `insert_events(event_descriptor, events)`, where
+        `events` is a list of dictionaries (`time`, `data`, `seq_num`) all
+        sharing the descriptor
+    batch_size : int, optional
+        Maximum number of events per batch
+    maxsize : int, optional
+        Maximum number of pending events. When full, :func:`enqueue`
+        blocks.
+
+    Attributes
+    ----------
+    written : int
+        Number of events inserted
+    batches : int
+        Number of inserts performed
+    lag : float
+        Time between enqueuing and inserting of the last event, in seconds
+    max_lag : float
+        Longest such time
+    max_depth : int
+        Largest number of events pending at once
+    '''
+
+    def __init__(self, insert_event, insert_events=None, batch_size=100,
+                 maxsize=10000):
+        self._insert_event = insert_event
+        self._insert_events = insert_events
+        self.batch_size = int(batch_size)
+
+        self._queue = Queue(maxsize)
+        self._thread = None
+        self._error = None
+
+        self.written = 0
+        self.batches = 0
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.max_depth = 0
+
+    def __repr__(self):
+        return '{0}(batch_size={1.batch_size!r})' \
+               ''.format(self.__class__.__name__, self)
+
+    @property
+    def depth(self):
+        '''Number of events waiting to be inserted'''
+        return self._queue.qsize()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+
+        self._thread = Thread(target=self._run, name='EventWriter')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _check_error(self):
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def enqueue(self, event_descriptor, time, data, seq_num):
+        '''Queue an event for insertion
+
+        Raises
+        ------
+        Exception
+            Re-raises the exception of a previously failed insert
+        '''
+        self._check_error()
+
+        event = {'event_descriptor': event_descriptor,
+                 'time': time,
+                 'data': data,
+                 'seq_num': seq_num,
+                 }
+
+        self._queue.put((_now(), event))
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def flush(self):
+        '''Block until all queued events have been inserted
+
+        Raises
+        ------
+        Exception
+            Re-raises the exception of a failed insert
+        '''
+        if self.running:
+            self._queue.join()
+
+        self._check_error()
+
+    def stop(self):
+        '''Insert all queued events, then stop the writer thread'''
+        if self.running:
+            self._queue.put(_STOP)
+            self._thread.join()
+
+        self._check_error()
+
+    @property
+    def stats(self):
+        '''Writer statistics'''
+        return {'written': self.written,
+                'batches': self.batches,
+                'depth': self.depth,
+                'max_depth': self.max_depth,
+                'lag': self.lag,
+                'max_lag': self.max_lag,
+                }
+
+    def _get_batch(self):
+        '''Block for the next event, then take any others already pending'''
+        batch = [self._queue.get()]
+        while batch[-1] is not _STOP and len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except Empty:
+                break
+
+        return batch
+
+    def _write(self, batch):
+        if self._insert_events is None:
+            for enqueued, event in batch:
+                self._insert_event(**event)
+            self.batches += len(batch)
+            return
+
+        # Bulk inserts take events sharing a single descriptor
+        start = 0
+        while start < len(batch):
+            desc = batch[start][1]['event_descriptor']
+            end = start + 1
+            while (end < len(batch) and
+                   batch[end][1]['event_descriptor'] is desc):
+                end += 1
+
+            events = [dict((key, value) for key, value in event.items()
+                           if key != 'event_descriptor')
+                      for enqueued, event in batch[start:end]]
+            self._insert_events(desc, events)
+            self.batches += 1
+            start = end
+
+    def _run(self):
+        while True:
+            batch = self._get_batch()
+            count = len(batch)
+
+            stop = batch[-1] is _STOP
+            if stop:
+                batch.pop()
+
+            if self._error is not None:
+                # Events after a failed insert are discarded
+                batch = []
+
+            try:
+                if batch:
+                    self._write(batch)
+                    self.written += len(batch)
+                    self.lag = _now() - batch[-1][0]
+                    self.max_lag = max(self.max_lag, self.lag)
+            except Exception as ex:
+                # Reported on the next enqueue/flush
+                logger.error('Event insert failed', exc_info=ex)
+                self._error = ex
+            finally:
+                for i in range(count):
+                    self._queue.task_done()
+
+            if stop:
+                return
@@ -2,6 +2,7 @@ from __future__ import print_function
 import signal
 import atexit
 import warnings
+import weakref
 
 import epics
 
@@ -9,6 +10,7 @@ from ..controls.positioner import Positioner
 from ..controls.signal import (OphydObject, Signal, SignalGroup)
 from ..utils.epics_pvs import MonitorDispatcher
 from ..runengine import RunEngine
+from ..runengine.runengine import RunState
 
 try:
     from ..controls.cas import caServer
@@ -55,7 +57,8 @@ class SessionManager(object):
         self._ipy.push(dict(session_mgr=self))
 
         self._logger = logger
-        self._run_engine = None
+        # Every scan has its own run engine
+        self._run_engines = weakref.WeakSet()
         self._registry = {'positioners': {}, 'signals': {},
                           'beamline_config': {}}
 
@@ -89,11 +92,34 @@ class SessionManager(object):
         self._ipy.push(dict(sigint_hdlr=self.sigint_hdlr))
 
     def sigint_hdlr(self, sig, frame):
-        '''Default ophyd signal interrupt (ctrl-c) handler'''
+        '''Default ophyd signal interrupt (ctrl-c) handler
+
+        A scan in progress is paused (and may be resumed); otherwise, all
+        motion is stopped.
+        '''
         self._logger.debug('Calling SessionManager SIGINT handler...')
-        self.stop_all()
+        run = self.active_run_engine
+        if run is not None:
+            run.pause()
+        else:
+            self.stop_all()
         self._orig_sigint_hdlr(sig, frame)
 
+    @property
+    def run_engines(self):
+        '''The registered run engines with a run in progress (or paused)'''
+        return [run for run in list(self._run_engines) if run.running]
+
+    @property
+    def active_run_engine(self):
+        '''The run engine with a run in progress which is not paused, if
+        any'''
+        for run in self.run_engines:
+            if run.state != RunState.PAUSED:
+                return run
+
+        return None
+
     @property
     def persisting(self):
         return self['_persisting']
@@ -122,7 +148,10 @@ class SessionManager(object):
 
     def persist_var(self, name, value=0, desc=None):
         if not self.in_ipython:
-            return value
+            # Nothing to persist to, but keep the variable for this session
+            if name not in self:
+                self[name] = value
+            return self[name]
 
         config = self.ipy_config
         if not self.autorestore:
@@ -181,10 +210,8 @@ class SessionManager(object):
         '''
 
 
-        run = self._run_engine
-        if run is not None and run.running:
+        if self.run_engines:
             self.stop_all()
-            run.stop()
         else:
             self._ipy_exit()
 
@@ -204,9 +231,8 @@ class SessionManager(object):
         elif isinstance(obj, (Signal, SignalGroup)):
             self._update_registry(obj, 'signals')
         elif isinstance(obj, RunEngine):
-            if self._run_engine is None:
-                self._logger.debug('Registering RunEngine.')
-                self._run_engine = obj
+            self._logger.debug('Registering RunEngine.')
+            self._run_engines.add(obj)
         elif isinstance(obj, OphydObject):
             # TODO
             pass
@@ -219,9 +245,8 @@ class SessionManager(object):
         self._logger.debug('connection notification: %s' % msg)
 
     def stop_all(self):
-        #TODO: fixme - add RunEngines to registry
-        if self._run_engine is not None:
-            self._run_engine.stop()
+        for run in self.run_engines:
+            run.stop()
 
         for pos in self._registry['positioners'].itervalues():
             if pos.moving is True:
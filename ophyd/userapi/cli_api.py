@@ -12,7 +12,8 @@ from IPython.utils.coloransi import TermColors as tc
 
 from epics import caget, caput
 
-from ..controls.positioner import EpicsMotor, Positioner, PVPositioner
+from ..controls.positioner import (EpicsMotor, Positioner, PVPositioner,
+                                   PositionerGroup)
 from ..session import get_session_manager
 
 session_mgr = get_session_manager()
@@ -105,15 +106,16 @@ def mov(positioner, position):
             pos_prec.append(FMT_PREC)
 
     with catch_keyboard_interrupt(positioner):
-        stat = [p.move(v, wait=False) for p, v in
-                zip(positioner, position)]
+        # Validate all targets, then start all motion back-to-back
+        group = PositionerGroup(positioner)
+        stat = group.move(position, wait=False)
 
         # The loop below ensures that at least a couple prints
         # will happen
         flag = 0
         done = False
 
-        while not all(s.done for s in stat) or (flag < 2):
+        while not stat.done or (flag < 2):
             print(tc.LightGreen, end='')
             print('   ', end='')
             for p, prec in zip(positioner, pos_prec):
@@ -121,7 +123,7 @@ def mov(positioner, position):
             print('\n')
             print('\033[2A', end='')
             time.sleep(0.01)
-            done = all(s.done for s in stat)
+            done = stat.done
             if done:
                 flag += 1
 
@@ -1,23 +1,34 @@
 from __future__ import print_function
 import numpy as np
 from time import sleep
+from time import time as _now
 import six
 import sys
 import collections
-import itertools
+import copy
 import string
 import traceback
 
 from IPython.utils.coloransi import TermColors as tc
+from epics.ca import CAThread
 
 from ..runengine import RunEngine
+from ..runengine.runengine import (RunState, EventSchema)
+from ..runengine.peakstats import PeakStats
+from ..runengine.sinks import MemorySink
 from ..session import get_session_manager
+from ..controls.signal import (SignalGroup, EpicsSignal)
+from ..controls.positioner import FlyCapture
+from ..controls.pseudopos import (PseudoSingle, PseudoPositioner)
+from ..controls.sim import (SimPositioner, SimDetector)
 from ..utils import LimitError
+from ..utils.buffers import ScanBuffer
 
 session_manager = get_session_manager()
 logger = session_manager._logger
 
-__all__ = ['AScan', 'DScan', 'Scan', 'Data', 'Count']
+__all__ = ['AScan', 'DScan', 'AdaptiveScan', 'Scan', 'Data', 'Count',
+           'FlyScan', 'ScanQueue']
 
 
 def estimate(x, y):
@@ -48,6 +59,303 @@ def estimate(x, y):
     return stats
 
 
+def refine_points(x, y, resolution, gradient_threshold=0.1):
+    """Return the points to add to a 1-D scan to resolve its peak
+
+    Intervals are bisected if they bracket a half maximum crossing (which
+    set the CEN and FWHM found by :py:func:`estimate`), are next to the
+    maximum, or the signal changes steeply across them, and are wider than
+    the resolution.
+
+    Parameters
+    ----------
+    x : array
+        Positions, in increasing order
+    y : array
+        Signal at each position
+    resolution : float
+        The required resolution of the CEN/FWHM estimate
+    gradient_threshold : float, optional
+        Intervals across which the signal changes by more than this
+        fraction of its range are refined
+
+    Returns
+    -------
+    array
+        The new positions, in increasing order (empty when the resolution
+        has been reached)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if x.size < 2:
+        return np.array([])
+
+    widths = np.diff(x)
+    dy = np.abs(np.diff(y))
+    refine = np.zeros(widths.shape, dtype=bool)
+
+    half_max = (y.max() + y.min()) / 2
+    refine[np.where(np.diff(np.sign(y - half_max)))[0]] = True
+
+    peak = y.argmax()
+    refine[max(peak - 1, 0):peak + 1] = True
+
+    refine |= dy > gradient_threshold * (y.max() - y.min())
+
+    refine &= widths > resolution
+    idx = np.where(refine)[0]
+    return x[idx] + widths[idx] / 2
+
+
+class GridPath(object):
+    """The path of one positioner through an N-dimensional mesh
+
+    Positions are computed from the point index when required, rather than
+    stored, so a mesh takes no memory until it is scanned. The points are
+    in the order of :py:func:`itertools.product`, with the last dimension
+    varying fastest, and the positions along the dimension of the
+    positioner are those of `np.linspace(begin, end, shape[dim])`.
+
+    Indexing with an integer gives a position; slices (and iteration, in
+    chunks) give arrays. The extremes are known without evaluating the
+    path.
+
+    Parameters
+    ----------
+    begin : float
+        Position at the start of the dimension
+    end : float
+        Position at the end of the dimension
+    shape : sequence of int
+        The number of points in each dimension of the mesh
+    dim : int
+        The dimension the positioner moves in
+    offset : float, optional
+        Added to every position
+    """
+
+    chunk_size = 65536
+
+    def __init__(self, begin, end, shape, dim, offset=0.0):
+        self.begin = begin
+        self.end = end
+        self.shape = tuple(int(n) for n in shape)
+        self.dim = int(dim)
+        self.offset = offset
+
+        self._count = self.shape[self.dim]
+        self._stride = int(np.prod(self.shape[self.dim + 1:]))
+        self._size = int(np.prod(self.shape))
+
+    def __repr__(self):
+        return ('{0}({1.begin!r}, {1.end!r}, shape={1.shape!r}, '
+                'dim={1.dim!r}, offset={1.offset!r})'
+                ''.format(self.__class__.__name__, self))
+
+    def __len__(self):
+        return self._size
+
+    def _positions(self, index):
+        """Positions at an array of point indices"""
+        step = (index // self._stride) % self._count
+        if self._count > 1:
+            # As np.linspace(0, 1, count), which ends on exactly 1
+            frac = step * (1.0 / (self._count - 1))
+            frac[step == self._count - 1] = 1.0
+        else:
+            frac = np.zeros(step.shape)
+
+        return self.begin + ((self.end - self.begin) * frac) + self.offset
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._positions(np.arange(*index.indices(self._size)))
+
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('Point index out of range')
+
+        return self._positions(np.array([index]))[0]
+
+    def __iter__(self):
+        for start in range(0, self._size, self.chunk_size):
+            for position in self[start:start + self.chunk_size]:
+                yield position
+
+    def __array__(self, dtype=None):
+        return np.asarray(self[:], dtype=dtype)
+
+    def __add__(self, offset):
+        return GridPath(self.begin, self.end, self.shape, self.dim,
+                        offset=self.offset + offset)
+
+    __radd__ = __add__
+
+    def __sub__(self, offset):
+        return self + (-offset)
+
+    def min(self, axis=None, out=None):
+        """The lowest position"""
+        if not self._size:
+            raise ValueError('Empty path')
+        if self._count == 1:
+            return self.begin + self.offset
+        return min(self.begin, self.end) + self.offset
+
+    def max(self, axis=None, out=None):
+        """The highest position"""
+        if not self._size:
+            raise ValueError('Empty path')
+        if self._count == 1:
+            return self.begin + self.offset
+        return max(self.begin, self.end) + self.offset
+
+
+def point_move_times(positioners, paths, start=0, stop=None):
+    """Estimate the move time of each point of a scan
+
+    Positioners are moved concurrently at each point, so the move time of a
+    point is that of the slowest positioner (see
+    :py:meth:`Positioner.estimate_move_time`). The first move starts from
+    the current position.
+
+    Parameters
+    ----------
+    positioners : list of Positioner
+    paths : list
+        The path of each positioner
+    start : int, optional
+        The first point
+    stop : int, optional
+        The point to stop at (defaults to the end of the scan)
+
+    Returns
+    -------
+    array
+        The move time of each point from `start` to `stop`, in seconds
+    """
+    if stop is None:
+        stop = len(paths[0]) if paths else 1
+
+    point_times = np.zeros(max(stop - start, 0))
+    for pos, path in zip(positioners, paths):
+        targets = np.asarray(path[start:stop], dtype=float)
+        if targets.size == 0:
+            continue
+
+        begin = np.empty_like(targets)
+        if start > 0:
+            begin[0] = path[start - 1]
+        elif pos.position is None:
+            begin[0] = targets[0]
+        else:
+            begin[0] = pos.position
+        begin[1:] = targets[:-1]
+
+        point_times = np.maximum(point_times,
+                                 pos.estimate_move_time(targets, begin))
+
+    return point_times
+
+
+def _mesh_move_time(positioners, paths):
+    """Estimate the total move time of a mesh of :py:class:`GridPath`
+
+    At each point after the first, the slowest dimension which moves takes
+    a step while all faster dimensions return to their start. Each step of
+    dimension `k` is taken once for every point of the slower dimensions,
+    so only the steps along each dimension need to be evaluated.
+    """
+    shape = paths[0].shape
+    steps = [np.zeros(max(n - 1, 0)) for n in shape]
+    flyback = np.zeros(len(shape))
+    first = 0.0
+
+    for pos, path in zip(positioners, paths):
+        dim = path.dim
+        line = path[0:shape[dim] * path._stride:path._stride]
+
+        if pos.position is not None:
+            first = max(first, float(pos.estimate_move_time(line[0],
+                                                            pos.position)))
+
+        if len(line) > 1:
+            steps[dim] = np.maximum(steps[dim],
+                                    pos.estimate_move_time(line[1:],
+                                                           line[:-1]))
+            flyback[dim] = max(flyback[dim],
+                               float(pos.estimate_move_time(line[0],
+                                                            line[-1])))
+
+    total = first
+    for dim, step_times in enumerate(steps):
+        faster = flyback[dim + 1:].max() if dim + 1 < len(shape) else 0.0
+        total += (int(np.prod(shape[:dim])) *
+                  float(np.sum(np.maximum(step_times, faster))))
+
+    return total
+
+
+def total_move_time(positioners, paths, points=None):
+    """Estimate the total move time of a scan (or of its first `points`)
+
+    The move time of a whole mesh of :py:class:`GridPath` is computed from
+    the steps of each dimension. Otherwise, the move times are computed in
+    chunks of points, so that long paths are not evaluated all at once.
+    """
+    if points is None:
+        points = len(paths[0]) if paths else 1
+
+    if (paths and points == len(paths[0]) and
+            all(isinstance(path, GridPath) and path.shape == paths[0].shape
+                for path in paths)):
+        return _mesh_move_time(positioners, paths)
+
+    total = 0.0
+    for start in range(0, points, GridPath.chunk_size):
+        stop = min(start + GridPath.chunk_size, points)
+        total += float(np.sum(point_move_times(positioners, paths,
+                                               start, stop)))
+
+    return total
+
+
+def _simulate_signal(sig):
+    """Return a simulated stand-in for a detector signal
+
+    The value has the shape of the signal, as far as it is known without
+    channel access traffic.
+
+    Returns
+    -------
+    sim : SimDetector
+    nbytes : int
+        Size of the value and timestamp of a single reading
+    """
+    count = 1
+    nbytes = 8
+    if isinstance(sig, EpicsSignal) and sig._read_pv.connected:
+        pv = sig._read_pv
+        if sig._string or 'string' in str(pv.type):
+            # MAX_STRING_SIZE
+            nbytes = 40
+        else:
+            count = pv.count or 1
+            nbytes = 8 * count
+
+    value = np.zeros(count) if count > 1 else 0.0
+    sim = SimDetector(name=sig.name, value=value, register=False)
+    return sim, nbytes + 8
+
+
+def _clean_key(key):
+    """Make a data key usable as an attribute name"""
+    return ''.join([ch if ch in (string.ascii_letters + string.digits)
+                    else '_'
+                    for ch in key])
+
+
 class OphydList(list):
     """Subclass of List for Ophyd Objects to allow easy removal"""
     def pop(self, obj):
@@ -64,21 +372,34 @@ class Data(object):
 
     Parameters
     ----------
-    data : dict
-        Dictionary of data from scan
+    data : dict or ScanBuffer
+        Dictionary of data from scan. Arrays (including the columns of a
+        :py:class:`ScanBuffer`) are used without copying.
+    peak_stats : list of PeakStats, optional
+        Peak statistics collected during the scan, used by
+        :py:meth:`estimate` in place of recomputing them
     """
 
-    def __init__(self, data=None):
+    def __init__(self, data=None, peak_stats=None):
         """Initialize class with data
 
         """
+        self.timestamps = {}
+        self.timings = {}
+        self.peak_stats = {}
         if data is not None:
             self.data_dict = data
+        if peak_stats is not None:
+            self.peak_stats = {(_clean_key(stats.x), _clean_key(stats.y)):
+                               stats.stats for stats in peak_stats}
 
     def _estimate(self, xname, yname):
         """Estimate peak parameters"""
-        self._estimate_dict = estimate(self.data_dict[xname],
-                                       self.data_dict[yname])
+        try:
+            self._estimate_dict = self.peak_stats[(xname, yname)]
+        except KeyError:
+            self._estimate_dict = estimate(self.data_dict[xname],
+                                           self.data_dict[yname])
 
     def estimate(self, xname, yname):
         self._estimate(xname, yname)
@@ -97,11 +418,13 @@ class Data(object):
     @data_dict.setter
     def data_dict(self, data):
         """Set the data dictionary"""
+        if isinstance(data, ScanBuffer):
+            self.timestamps = {key: data.timestamps(key) for key in data}
+            if data.timings is not None:
+                self.timings = dict(data.timings.items())
         keys = data.keys()
-        values = [np.array(a) for a in data.values()]
-        keys = [''.join([ch if ch in (string.ascii_letters + string.digits)
-                        else '_'
-                        for ch in key]) for key in keys]
+        values = [np.asarray(a) for a in data.values()]
+        keys = [_clean_key(key) for key in keys]
         self._data_dict = {key: value for key, value in zip(keys, values)}
         for key, value in zip(keys, values):
             setattr(self, key, value)
@@ -142,6 +465,9 @@ class Scan(object):
                       'user_triggers': [],
                       'scan_data': None, }
 
+    # Keyword arguments which are for run, rather than setup_scan
+    _run_kwargs = ('dry_run', 'dwell_time')
+
     def __init__(self, *args, **kwargs):
         super(Scan, self).__init__(*args, **kwargs)
 
@@ -152,6 +478,15 @@ class Scan(object):
         self._data_buffer = self._shared_config['scan_data']
 
         self.settle_time = None
+        # Document sink for the run (None uses the run engine default)
+        self.sink = None
+        # Peak statistics of each detector against the first positioner,
+        # updated live during the scan (keyed on detector name)
+        self.live_stats = True
+        self.peak_stats = dict()
+        self._run_peak_stats = []
+        # Run arguments, from prepare()
+        self._scan_args = None
 
         self.paths = list()
         self.positioners = list()
@@ -172,7 +507,21 @@ class Scan(object):
 
         >>>scan.run(*args, **kwargs)
         """
-        self.run(*args, **kwargs)
+        return self.run(*args, **kwargs)
+
+    def _split_kwargs(self, kwargs):
+        """Split keyword arguments into those of setup_scan and of run
+
+        Returns
+        -------
+        setup_kwargs : dict
+        run_kwargs : dict
+        """
+        setup_kwargs = dict(kwargs)
+        run_kwargs = dict((key, setup_kwargs.pop(key))
+                          for key in self._run_kwargs
+                          if key in setup_kwargs)
+        return setup_kwargs, run_kwargs
 
     def check_paths(self):
         """Check the positioner paths
@@ -186,14 +535,49 @@ class Scan(object):
             Raised in the case that a positioner will be moved outside its
             limits.
         """
+        violations = self.limit_violations()
+        if violations:
+            raise ValueError(violations[0])
+
+    def limit_violations(self):
+        """Check the positioner paths, without raising
+
+        The limits of a positioner are a range, so only the extremes of its
+        path are checked. The limits of a pseudo positioner are those of its
+        real positioners, which may be reached anywhere along the path, so
+        every position is checked.
+
+        Returns
+        -------
+        list of str
+            A message for each positioner moved outside of its limits
+        """
+        violations = []
         for pos, path in zip(self.positioners, self.paths):
-            for p in path:
+            if not len(path):
+                continue
+
+            if isinstance(pos, (PseudoSingle, PseudoPositioner)):
+                positions = path
+            else:
+                positions = (np.min(path), np.max(path))
+
+            checked = set()
+            for p in positions:
+                if p in checked:
+                    continue
+
+                checked.add(p)
                 try:
                     pos.check_value(p)
                 except LimitError:
-                    raise ValueError('Scan moves positioner {} \
-                                     out of limits {},{}'.format(
-                                     pos.name, pos.low_limit, pos.high_limit))
+                    violations.append('Scan moves positioner {} out of '
+                                      'limits {},{}'.format(pos.name,
+                                                            pos.low_limit,
+                                                            pos.high_limit))
+                    break
+
+        return violations
 
     def __enter__(self):
         """Entry point for context manager"""
@@ -203,7 +587,9 @@ class Scan(object):
         """Exit point for context manager"""
         logger.debug("Scan context manager exited with %s", str(exec_value))
         traceback.print_tb(tb)
-        self.post_scan()
+        # A paused scan is finished off by resume() or abort()
+        if not self.paused:
+            self.post_scan()
 
     def pre_scan(self):
         """Routine run before scan starts"""
@@ -233,6 +619,11 @@ class Scan(object):
         """
         pass
 
+    def set_trajectory(self):
+        """Load the paths of the scan into the positioners"""
+        for pos, path in zip(self.positioners, self.paths):
+            pos.set_trajectory(path)
+
     def format_plot(self):
         """Guess the positioners and detectors that the user cares about
 
@@ -270,44 +661,249 @@ class Scan(object):
                     ploty.append(name)
         return plotx, ploty
 
-    def run(self, **kwargs):
+    def run(self, dry_run=False, **kwargs):
         """Run the scan
 
         The main loop of the scan. This routine runs the scan and calls the
         ophyd runengine.
+
+        Parameters
+        ----------
+        dry_run : bool, optional
+            Run against simulated hardware instead (see :py:meth:`dry_run`)
         """
+        if dry_run:
+            return self.dry_run(**kwargs)
+
         self.scan_id = session_manager.get_next_scan_id()
 
         # Run this in a context manager to capture
         # the KeyboardInterrupt
 
         with self:
-            self.check_paths()
-            self.setup_detectors(self.detectors)
-            self.setup_triggers(self.triggers)
+            # Unless already done (e.g., by a ScanQueue)
+            if self._scan_args is None:
+                self.prepare()
 
-            for pos, path in zip(self.positioners, self.paths):
-                pos.set_trajectory(path)
+            scan_args, self._scan_args = self._scan_args, None
 
-            # Create the dict to pass to the run-engine
+            self.setup_detectors(self.detectors)
+            self.setup_triggers(self.triggers)
+            self.set_trajectory()
 
-            scan_args = dict()
-            scan_args['detectors'] = self.detectors
-            scan_args['triggers'] = self.triggers
-            scan_args['positioners'] = self.positioners
-            scan_args['settle_time'] = self.settle_time
-            scan_args['custom'] = {}
-            plotx, ploty = self.format_plot()
-            if plotx:
-                scan_args['custom']['plotx'] = plotx
-            if ploty:
-                scan_args['custom']['ploty'] = ploty
+            self._run_peak_stats = self._setup_peak_stats()
+            scan_args['peak_stats'] = self._run_peak_stats
 
             # Run the scan!
             data = self._run_eng.start_run(self.scan_id,
                                            scan_args=scan_args)
 
-            self._data_buffer.append(Data(data))
+            if not self.paused:
+                self._data_buffer.append(Data(data, self._run_peak_stats))
+
+    def dry_run(self, dwell_time=None, **kwargs):
+        """Run the scan against simulated hardware
+
+        The full scan pipeline is run, with simulated positioners,
+        detectors and triggers standing in for the real ones (under the
+        same names) and the documents kept in memory, so that there is no
+        channel access traffic and nothing is recorded. Neither
+        :py:meth:`pre_scan` nor :py:meth:`post_scan` are run.
+
+        The simulated moves complete immediately. The duration of the scan
+        is predicted from the motion models of the real positioners, the
+        settle time and the dwell times, plus the time the pipeline itself
+        took for each point.
+
+        Parameters
+        ----------
+        dwell_time : float or dict, optional
+            The count time at each point, in seconds: either one value, or
+            a dictionary of trigger or detector name to count time (they
+            count concurrently, so the longest is used)
+
+        Returns
+        -------
+        dict
+            The report: the number of `points`, the predicted `duration`
+            (and its `move_time`, `settle_time`, `dwell_time` and
+            `overhead` parts), in seconds, the expected `data_bytes`, the
+            `limit_violations` and the `elapsed` time of the dry run.
+            Nothing is simulated when there are limit violations: the report
+            then only has the `points`, `limit_violations` and `elapsed`.
+        """
+        t0 = _now()
+        violations = self.limit_violations()
+        title = 'Dry Run         : {}'.format(getattr(self, 'scan_command',
+                                                      None) or
+                                              self.__class__.__name__)
+
+        if violations:
+            points = len(self.paths[0]) if self.paths else 0
+            msg = [title, 'Datapoints      : {}'.format(points)]
+            msg.extend(tc.Red + violation + tc.Normal
+                       for violation in violations)
+            print('\n'.join(msg))
+            return {'points': points,
+                    'limit_violations': violations,
+                    'elapsed': _now() - t0,
+                    }
+
+        positioners = []
+        for pos, path in zip(self.positioners, self.paths):
+            position = pos.position
+            if position is None and len(path):
+                position = path[0]
+
+            sim = SimPositioner(name=pos.name, position=position,
+                                register=False)
+            sim.set_trajectory(path)
+            positioners.append(sim)
+
+        detectors = []
+        nbytes = 16 * len(positioners)
+        for det in self.detectors:
+            if isinstance(det, SignalGroup):
+                signals = det.signals
+            else:
+                signals = [det]
+
+            for sig in signals:
+                sim, size = _simulate_signal(sig)
+                detectors.append(sim)
+                nbytes += size
+
+        triggers = [SimDetector(name=trig.name, register=False)
+                    for trig in self.triggers]
+
+        scan_args = dict()
+        scan_args['detectors'] = detectors
+        scan_args['triggers'] = triggers
+        scan_args['positioners'] = positioners
+        scan_args['sink'] = MemorySink()
+        if self.paths:
+            scan_args['num_points'] = len(self.paths[0])
+        scan_args['custom'] = {'dry_run': True}
+
+        data = self._run_eng.start_run('dry_run', scan_args=scan_args)
+        points = len(data)
+
+        if dwell_time is None:
+            dwell = 0.0
+        elif isinstance(dwell_time, dict):
+            names = set(sig.name for sig in triggers + detectors)
+            dwell = max([t for name, t in dwell_time.items()
+                         if getattr(name, 'name', name) in names] or [0.0])
+        else:
+            dwell = float(dwell_time)
+
+        move_time = total_move_time(self.positioners, self.paths, points)
+        settle_time = points * (self.settle_time or 0.0)
+        overhead = float(np.sum(data.timings['total']))
+
+        report = {'points': points,
+                  'duration': move_time + settle_time + points * dwell +
+                  overhead,
+                  'move_time': move_time,
+                  'settle_time': settle_time,
+                  'dwell_time': points * dwell,
+                  'overhead': overhead,
+                  'data_bytes': points * nbytes,
+                  'limit_violations': violations,
+                  'elapsed': _now() - t0,
+                  }
+
+        msg = [title, 'Datapoints      : {}'.format(points)]
+        msg.append('Predicted Time  : {duration:.1f} s (move {move_time:.1f} '
+                   's, settle {settle_time:.1f} s, dwell {dwell_time:.1f} s, '
+                   'overhead {overhead:.1f} s)'.format(**report))
+        msg.append('Data Volume     : {:.1f} kB'.format(report['data_bytes'] /
+                                                        1024.))
+        print('\n'.join(msg))
+        return report
+
+    def prepare(self):
+        """Prepare the scan to be run
+
+        The paths are checked against the positioner limits, and the
+        arguments of the run are created, including the event schema (for
+        which the detectors are connected). This is done by :py:meth:`run`,
+        unless the scan has already been prepared.
+        """
+        self.check_paths()
+
+        # Create the dict to pass to the run-engine
+
+        scan_args = dict()
+        scan_args['detectors'] = self.detectors
+        scan_args['triggers'] = self.triggers
+        scan_args['positioners'] = self.positioners
+        scan_args['settle_time'] = self.settle_time
+        scan_args['sink'] = self.sink
+        if self.paths:
+            scan_args['num_points'] = len(self.paths[0])
+        scan_args['schema'] = EventSchema(self.positioners, self.detectors)
+        scan_args['custom'] = {}
+        plotx, ploty = self.format_plot()
+        if plotx:
+            scan_args['custom']['plotx'] = plotx
+        if ploty:
+            scan_args['custom']['ploty'] = ploty
+
+        self._scan_args = scan_args
+
+    def _setup_peak_stats(self):
+        """Return the peak statistics to update during the scan
+
+        Statistics are kept for each scalar detector signal against the
+        first positioner. Existing :py:attr:`peak_stats` (and their
+        subscriptions) are reused.
+        """
+        if not (self.live_stats and self.positioners):
+            return []
+
+        xname = self.positioners[0].name
+        peak_stats = []
+        for det in self.detectors:
+            if isinstance(det, SignalGroup):
+                signals = det.signals
+            else:
+                signals = [det]
+
+            for sig in signals:
+                stats = self.peak_stats.get(sig.name)
+                if stats is None:
+                    stats = PeakStats(xname, sig.name)
+                    self.peak_stats[sig.name] = stats
+
+                stats.x = xname
+                peak_stats.append(stats)
+
+        return peak_stats
+
+    @property
+    def paused(self):
+        """Whether the scan has been paused (e.g., by ctrl-C)"""
+        return self._run_eng.state == RunState.PAUSED
+
+    def resume(self):
+        """Resume a paused scan
+
+        The scan continues from the last completed point, as part of the
+        same run.
+        """
+        try:
+            data = self._run_eng.resume()
+            if not self.paused:
+                self._data_buffer.append(Data(data, self._run_peak_stats))
+        finally:
+            if not self.paused:
+                self.post_scan()
+
+    def abort(self):
+        """End a paused scan"""
+        self._run_eng.abort()
+        self.post_scan()
 
     @property
     def data(self):
@@ -451,6 +1047,7 @@ class AScan(Scan):
         super(AScan, self).__init__()
         self.dimension = None
         self.scan_command = None
+        self.estimated_duration = None
 
     def pre_scan(self, *args, **kwargs):
         super(AScan, self).pre_scan(*args, **kwargs)
@@ -466,6 +1063,7 @@ class AScan(Scan):
         msg.append('Scan Dimension  : {}'.format(self.dimension))
         msg.append('Scan Datapoints : {} ({})'.format(self.datapoints,
                                                       np.prod(self.datapoints)))
+        msg.append('Estimated Time  : {:.1f} s'.format(self.estimated_duration))
 
         # Print positioners and start and stop values
 
@@ -475,8 +1073,8 @@ class AScan(Scan):
 
         for pos, path in zip(self.positioners, self.paths):
             msg.append('{:<30} {:<20.8f} {:<20.8f}'.format(pos.name,
-                                                           min(path),
-                                                           max(path)))
+                                                           np.min(path),
+                                                           np.max(path)))
         msg.append('')
         msg.append('Triggers:')
         for trig in self.triggers:
@@ -533,8 +1131,9 @@ class AScan(Scan):
         npts : int or list of int
             The number of intervals in the scan
         """
+        kwargs, run_kwargs = self._split_kwargs(kwargs)
         self.setup_scan(positioners, start, stop, npts, **kwargs)
-        self.run(**kwargs)
+        return self.run(**run_kwargs)
 
     def setup_scan(self, positioners, start, stop, npts, **kwargs):
         """Setup scan along a regular path.
@@ -574,12 +1173,8 @@ class AScan(Scan):
 
         npts = np.array(npts) + 1
 
-        # Make the array to populate the ranges with
-        edges = [np.linspace(0, 1, n) for n in npts]
-        grid = [np.array(a) for a in zip(*itertools.product(*edges))]
-
-        # This grid goes from 0 to 1 in all dimensions.
-        # and can be used to scale start and stop points
+        # The mesh is not materialized: each path computes its positions
+        # from the point index (see GridPath)
 
         pos = []
         paths = []
@@ -592,14 +1187,39 @@ class AScan(Scan):
 
             for p, b, e in zip(iter_pos, begin, end):
                 pos.append(p)
-                path = b + ((e-b) * grid[d])
-                paths.append(path)
+                paths.append(GridPath(b, e, npts, d))
 
         self.positioners = pos
         self.paths = paths
         self.datapoints = npts
         self.dimension = dimension
 
+        self.estimate_duration()
+
+    def estimate_duration(self):
+        """Estimate the scan duration from the positioner motion models
+
+        Positioners are moved concurrently at each point, so the move time
+        of a point is that of the slowest positioner. The settle time, if
+        set, is added to every point.
+
+        Returns
+        -------
+        float
+            The estimated total move time, in seconds
+        """
+        points = int(np.prod(self.datapoints))
+        duration = total_move_time(self.positioners, self.paths, points)
+
+        if self.settle_time is not None:
+            duration += points * self.settle_time
+
+        self.estimated_duration = duration
+
+        logger.info('Estimated scan duration: %.1f s (%d points)',
+                    self.estimated_duration, points)
+        return self.estimated_duration
+
 
 class DScan(AScan):
     def setup_scan(self, *args, **kwargs):
@@ -611,8 +1231,28 @@ class DScan(AScan):
         """
         super(DScan, self).setup_scan(*args, **kwargs)
         self._start_positions = [p.position for p in self.positioners]
-        self.paths = [np.array(path) + start
+        self.paths = [path + start
                       for path, start in zip(self.paths, self._start_positions)]
+        self.estimate_duration()
+
+    def pre_scan(self, *args, **kwargs):
+        """Re-base the paths on the current positions
+
+        The positioners may have moved since :py:meth:`setup_scan` (e.g.,
+        when the scan was prepared in a :py:class:`ScanQueue` while another
+        scan was running).
+        """
+        positions = [p.position for p in self.positioners]
+        if positions != self._start_positions:
+            self.paths = [path - old + new
+                          for path, old, new in zip(self.paths,
+                                                    self._start_positions,
+                                                    positions)]
+            self._start_positions = positions
+            self.check_paths()
+            self.estimate_duration()
+
+        super(DScan, self).pre_scan(*args, **kwargs)
 
     def post_scan(self):
         """Post Scan Move to start positions
@@ -636,6 +1276,369 @@ class DScan(AScan):
         print(tc.Green + " Done.")
 
 
+class AdaptiveScan(AScan):
+    """Class for running a 1-D scan which refines around a peak
+
+    A coarse pass is made first, as in :py:class:`AScan`. Points are then
+    added, in further passes, where the signal of the detector changes
+    fastest and around its maximum (see :py:func:`refine_points`), until the
+    points bracketing the peak are closer than the requested resolution.
+    All of the points are taken in a single run.
+
+    The positions of each pass are decided from the data of the previous
+    passes, which is received from the run engine as it is collected.
+    The data of the run is in the order it was taken; the final
+    :py:func:`estimate` of the peak is stored in :py:attr:`stats`.
+
+    Examples
+    --------
+    Scan motor m1 from -10 to 10 with 20 intervals, then refine until the
+    CEN and FWHM of detector d1 are known to 0.01::
+
+    >>>adaptive_scan(m1, -10, 10, 20, d1, 0.01)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(AdaptiveScan, self).__init__()
+        self.detector = None
+        self.resolution = None
+        self.max_points = None
+        self.gradient_threshold = 0.1
+        self.stats = None
+        # Points are not taken in order, which the live statistics require
+        self.live_stats = False
+        self._consumer = None
+
+    def __call__(self, positioner, start, stop, npts, detector, resolution,
+                 max_points=None, **kwargs):
+        """Scan a positioner, refining around the peak of a detector
+
+        Parameters
+        ----------
+        positioner : Positioner
+            The positioner object to use in the scan
+        start : float
+            The start position of the positioner
+        stop : float
+            The stop position of the positioner
+        npts : int
+            The number of intervals in the coarse pass
+        detector : Signal or str
+            The detector (or its name) to refine on. It must be one of the
+            scan detectors.
+        resolution : float
+            The required resolution of the CEN/FWHM estimate
+        max_points : int, optional
+            The maximum number of points in total. Defaults to the number
+            of points of a uniform scan at the requested resolution.
+        """
+        kwargs, run_kwargs = self._split_kwargs(kwargs)
+        self.setup_scan(positioner, start, stop, npts, detector, resolution,
+                        max_points=max_points, **kwargs)
+        return self.run(**run_kwargs)
+
+    def setup_scan(self, positioner, start, stop, npts, detector, resolution,
+                   max_points=None, **kwargs):
+        """Setup the adaptive scan only. The scan can be executed using
+        :py:meth:`run` method.
+
+        See :py:meth:`__call__` for the parameters.
+        """
+        super(AdaptiveScan, self).setup_scan(positioner, start, stop, npts,
+                                             **kwargs)
+
+        if resolution <= 0:
+            raise ValueError('The resolution must be positive')
+
+        if max_points is None:
+            max_points = int(np.ceil(abs(stop - start) / resolution)) + 1
+
+        self.detector = getattr(detector, 'name', detector)
+        self.resolution = resolution
+        self.max_points = max(int(max_points), len(self.paths[0]))
+
+    def pre_scan(self, *args, **kwargs):
+        super(AdaptiveScan, self).pre_scan(*args, **kwargs)
+        self.stats = None
+        self._consumer = self._run_eng.register_consumer(name='AdaptiveScan')
+
+    def post_scan(self):
+        """Stop receiving data from the run engine"""
+        super(AdaptiveScan, self).post_scan()
+        if self._consumer is not None:
+            self._run_eng.unregister_consumer(self._consumer)
+            self._consumer = None
+
+    def set_trajectory(self):
+        """Load the adaptive trajectory into the positioner"""
+        pos = self.positioners[0]
+        pos.set_trajectory(self._adaptive_path(pos.name, self.detector))
+
+    def _adaptive_path(self, xname, yname):
+        """Generate the positions of the scan
+
+        Each position is generated once the data of the previous one has
+        been collected, so that each pass can be based on all of the data
+        taken so far.
+        """
+        x = []
+        y = []
+        points = self.paths[0]
+        while len(points) and len(x) < self.max_points:
+            for point in points[:self.max_points - len(x)]:
+                yield point
+
+                # The event of the point just taken
+                data = self._consumer.get()['data']
+                if yname not in data:
+                    raise ValueError('{} is not a detector of the scan'
+                                     ''.format(yname))
+
+                x.append(data[xname][0])
+                y.append(data[yname][0])
+
+            order = np.argsort(x, kind='mergesort')
+            points = refine_points(np.asarray(x)[order], np.asarray(y)[order],
+                                   self.resolution, self.gradient_threshold)
+
+        order = np.argsort(x, kind='mergesort')
+        self.stats = estimate(np.asarray(x)[order], np.asarray(y)[order])
+        logger.info('Adaptive scan took %d points: %s', len(x), self.stats)
+
+
+class FlyScan(AScan):
+    """Class for running a continuous (fly) scan of a single positioner
+
+    Rather than stepping, the positioner is moved once from start to stop
+    while its readback and the detector monitors are captured into
+    timestamped buffers. After the move the detector data is binned or
+    interpolated onto the requested grid, and each grid point is recorded
+    as an event of the run.
+
+    Detectors must be free-running (i.e., posting monitor updates) during
+    the move; triggers are not fired. A paused fly scan continues the move
+    from where the positioner stopped when resumed.
+
+    Examples
+    --------
+    Fly motor m1 from -10 to 10, reconstructing onto 200 intervals::
+
+    >>>flyscan(m1, -10, 10, 200)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(FlyScan, self).__init__()
+        self.mode = 'interpolate'
+        self.capacity = 4096
+        self.capture = None
+
+    def __call__(self, positioner, start, stop, npts, **kwargs):
+        """Fly positioner from start to stop
+
+        Parameters
+        ----------
+        positioner : Positioner
+            The positioner object to fly
+        start : float
+            The start position of the positioner
+        stop : float
+            The stop position of the positioner
+        npts : int
+            The number of intervals in the reconstructed grid
+        mode : {'interpolate', 'bin'}, optional
+            How to map the captured data onto the grid
+        """
+        kwargs, run_kwargs = self._split_kwargs(kwargs)
+        self.setup_scan(positioner, start, stop, npts, **kwargs)
+        return self.run(**run_kwargs)
+
+    def setup_scan(self, positioner, start, stop, npts, mode=None,
+                   capacity=None, **kwargs):
+        """Setup the fly scan only. The scan can be executed using
+        :py:meth:`run` method.
+
+        Parameters
+        ----------
+        positioner : Positioner
+            The positioner object to fly
+        start : float
+            The start position of the positioner
+        stop : float
+            The stop position of the positioner
+        npts : int
+            The number of intervals in the reconstructed grid
+        mode : {'interpolate', 'bin'}, optional
+            How to map the captured data onto the grid
+        capacity : int, optional
+            Number of samples to preallocate per capture buffer
+        """
+        if mode is not None:
+            self.mode = mode
+        if capacity is not None:
+            self.capacity = capacity
+
+        self.start = start
+        self.stop = stop
+        self.npts = npts
+        self.scan_command = self._format_command_line(positioner, start,
+                                                      stop, npts, **kwargs)
+
+        self.positioners = [positioner]
+        self.paths = [np.linspace(start, stop, npts + 1)]
+        self.datapoints = [npts + 1]
+        self.dimension = 1
+
+        self.estimate_duration()
+
+    def estimate_duration(self):
+        """Estimate the duration of the single move from start to stop
+
+        Returns
+        -------
+        float
+            The estimated move time, in seconds
+        """
+        pos = self.positioners[0]
+        self.estimated_duration = pos.estimate_move_time(self.stop,
+                                                         self.start)
+        return self.estimated_duration
+
+    def prepare(self):
+        """Prepare the fly scan to be run
+
+        As :py:meth:`Scan.prepare`, with the capture of the positioner and
+        detectors for the run engine to fly.
+        """
+        super(FlyScan, self).prepare()
+
+        self.capture = FlyCapture(self.positioners[0], self.detectors,
+                                  capacity=self.capacity)
+
+        scan_args = self._scan_args
+        scan_args['triggers'] = []
+        scan_args['fly'] = self.capture
+        scan_args['fly_target'] = self.stop
+        scan_args['fly_mode'] = self.mode
+        scan_args['grid'] = self.paths[0]
+
+    def setup_triggers(self, triggers):
+        """Fly scans do not fire triggers"""
+        pass
+
+    def set_trajectory(self):
+        """Move the positioner to the start of the fly scan"""
+        self.positioners[0].move(self.start, wait=True)
+
+
+class ScanQueue(object):
+    """Run scans back to back
+
+    Each queued scan is prepared (its trajectory set up, its paths checked
+    against the limits and its detectors connected, see
+    :py:meth:`Scan.prepare`) in the background while the scan before it is
+    running, so that it can start as soon as the previous scan has
+    finished.
+
+    Scans are queued as copies, so the same scan object may be queued
+    several times with different arguments.
+
+    Examples
+    --------
+    Queue scans of m1 and then m2, and run them::
+
+    >>>queue = ScanQueue()
+    >>>queue.add(ascan, m1, -10, 10, 20)
+    >>>queue.add(ascan, m2, -5, 5, 20)
+    >>>queue.run()
+    """
+
+    def __init__(self):
+        self._queue = collections.deque()
+        self.prefetch = True
+        self.current = None
+
+    def __len__(self):
+        return len(self._queue)
+
+    def add(self, scan, *args, **kwargs):
+        """Queue a scan
+
+        Parameters
+        ----------
+        scan : Scan
+            The scan to run
+        args, kwargs
+            Passed to the :py:meth:`setup_scan` method of the scan (if it
+            has one) and kwargs to :py:meth:`run`, as when calling the scan
+        """
+        scan = copy.copy(scan)
+        scan._scan_args = None
+        self._queue.append({'scan': scan, 'args': args, 'kwargs': kwargs,
+                            'thread': None, 'error': None})
+
+    def clear(self):
+        """Remove all queued scans"""
+        self._queue.clear()
+
+    def _prepare(self, entry):
+        """Set up and prepare a queued scan"""
+        scan = entry['scan']
+        try:
+            if hasattr(scan, 'setup_scan'):
+                kwargs, entry['kwargs'] = scan._split_kwargs(entry['kwargs'])
+                scan.setup_scan(*entry['args'], **kwargs)
+
+            scan.prepare()
+        except Exception as ex:
+            entry['error'] = ex
+
+    def _prefetch(self, entry):
+        """Prepare a queued scan in the background"""
+        thread = CAThread(target=self._prepare, args=(entry, ),
+                          name='ScanQueue')
+        thread.daemon = True
+        entry['thread'] = thread
+        thread.start()
+
+    def run(self):
+        """Run the queued scans
+
+        The queue stops at the first scan which fails or is paused; the
+        remaining scans stay queued. A paused scan (:py:attr:`current`) may
+        be resumed, and the queue then continued by calling :py:meth:`run`
+        again.
+        """
+        while self._queue:
+            entry = self._queue[0]
+            if entry['thread'] is None:
+                self._prepare(entry)
+            else:
+                entry['thread'].join()
+
+            if entry['error'] is not None:
+                self._queue.popleft()
+                raise entry['error']
+
+            if self.prefetch and len(self._queue) > 1:
+                self._prefetch(self._queue[1])
+
+            self._queue.popleft()
+            self.current = entry['scan']
+            try:
+                self.current.run(**entry['kwargs'])
+            finally:
+                if self._queue and self._queue[0]['thread'] is not None:
+                    # Wait for the prefetch, so that it cannot be left
+                    # running when the queue stops
+                    self._queue[0]['thread'].join()
+
+            if self.current.paused:
+                logger.info('Scan queue stopped: scan %s paused (%d scans '
+                            'remaining)', self.current.scan_id,
+                            len(self._queue))
+                return
+
+
 class Count(Scan):
     """Trigger and collect a single measurement
 
@@ -0,0 +1,260 @@
+# vi: ts=4 sw=4 sts=4 expandtab
+'''
+:mod:`ophyd.utils.buffers` - Preallocated data buffers
+======================================================
+
+.. module:: ophyd.utils.buffers
+   :synopsis: Growable, preallocated numpy buffers for timestamped and
+              scan data
+'''
+
+from __future__ import print_function
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class TimestampedBuffer(object):
+    '''A preallocated buffer of (timestamp, value) pairs
+
+    Storage is allocated up front and doubled when full, so appending from
+    a monitor callback does not allocate on every update.
+
+    Parameters
+    ----------
+    capacity : int, optional
+        Number of entries to preallocate
+    dtype : numpy dtype, optional
+        The value data type
+    shape : tuple, optional
+        The shape of a single value (for array-valued signals)
+    '''
+
+    def __init__(self, capacity=1024, dtype=float, shape=()):
+        capacity = max(int(capacity), 1)
+
+        self._lock = threading.Lock()
+        self._dtype = np.dtype(dtype)
+        self._shape = tuple(shape)
+        self._values = np.empty((capacity, ) + self._shape, dtype=self._dtype)
+        self._timestamps = np.empty(capacity, dtype=float)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def capacity(self):
+        '''The number of entries currently allocated'''
+        return self._timestamps.shape[0]
+
+    def _grow(self, capacity):
+        values = np.empty((capacity, ) + self._shape, dtype=self._dtype)
+        timestamps = np.empty(capacity, dtype=float)
+
+        values[:self._count] = self._values[:self._count]
+        timestamps[:self._count] = self._timestamps[:self._count]
+
+        self._values = values
+        self._timestamps = timestamps
+
+    def append(self, value, timestamp):
+        '''Append a single value and its timestamp'''
+        with self._lock:
+            if self._count >= self.capacity:
+                self._grow(2 * self.capacity)
+
+            self._values[self._count] = value
+            self._timestamps[self._count] = timestamp
+            self._count += 1
+
+    def clear(self):
+        '''Reset the buffer, keeping the allocated storage'''
+        with self._lock:
+            self._count = 0
+
+    @property
+    def values(self):
+        '''A view of the valid values'''
+        return self._values[:self._count]
+
+    @property
+    def timestamps(self):
+        '''A view of the valid timestamps'''
+        return self._timestamps[:self._count]
+
+    def capture(self, value=None, timestamp=None, **kwargs):
+        '''Subscription callback which appends to the buffer
+
+        Suitable for passing to :func:`OphydObject.subscribe`
+        '''
+        if value is None:
+            return
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        self.append(value, timestamp)
+
+
+class ScanBuffer(object):
+    '''Columnar, preallocated storage for the data of a scan
+
+    Each data key gets a :class:`TimestampedBuffer` column of values and
+    timestamps, typed and shaped according to its data key information.
+    Columns are preallocated for the expected number of points, up to
+    `max_preallocate` bytes each, and double in size as required (e.g.,
+    for large meshes or open-ended counts).
+
+    Indexing by data key gives a view of the values collected so far, so
+    the data may be read while the scan is in progress without copying.
+    Mapping-style :func:`keys`, :func:`values` and :func:`items` are
+    provided for handing the buffer over as a dictionary of arrays; note
+    that `len()` is the number of points.
+
+    Parameters
+    ----------
+    data_keys : dict
+        {name: {'dtype': dtype, 'shape': shape, ...}}, as in an event
+        descriptor
+    capacity : int, optional
+        Expected number of points
+
+    Attributes
+    ----------
+    timings : RecordBuffer or None
+        Per-point timings, kept alongside the data by the run engine
+    '''
+
+    _dtypes = {'number': float,
+               'array': float,
+               'string': object,
+               }
+
+    # Upper limit on the initial allocation of each column, in bytes
+    max_preallocate = 1024 * 1024
+
+    def __init__(self, data_keys, capacity=None):
+        if not capacity:
+            capacity = 64
+
+        self._columns = OrderedDict()
+        for name, info in data_keys.items():
+            dtype = np.dtype(self._dtypes.get(info.get('dtype'), object))
+            shape = info.get('shape') or ()
+            point_size = dtype.itemsize * int(np.prod(shape)) + 8
+            initial = min(capacity, self.max_preallocate // point_size)
+            self._columns[name] = TimestampedBuffer(initial, dtype=dtype,
+                                                    shape=shape)
+
+        self._count = 0
+        self.timings = None
+
+    def __repr__(self):
+        return '{}(keys={!r}, points={})'.format(self.__class__.__name__,
+                                                 self.keys(), len(self))
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __getitem__(self, name):
+        return self._columns[name].values
+
+    def keys(self):
+        return list(self._columns.keys())
+
+    def values(self):
+        return [column.values for column in self._columns.values()]
+
+    def items(self):
+        return [(name, column.values)
+                for name, column in self._columns.items()]
+
+    def column(self, name):
+        '''The :class:`TimestampedBuffer` of a data key'''
+        return self._columns[name]
+
+    def timestamps(self, name):
+        '''A view of the timestamps of a data key'''
+        return self._columns[name].timestamps
+
+    def append(self, event):
+        '''Append a point
+
+        Parameters
+        ----------
+        event : dict
+            {name: [value, timestamp]} for every data key
+        '''
+        for name, column in self._columns.items():
+            value, timestamp = event[name]
+            column.append(value, timestamp)
+
+        self._count += 1
+
+
+class RecordBuffer(object):
+    '''Growable storage of records of float fields, one timestamp each
+
+    Parameters
+    ----------
+    fields : sequence of str
+        The field names
+    capacity : int, optional
+        Number of records to preallocate
+    '''
+
+    def __init__(self, fields, capacity=64):
+        self.fields = list(fields)
+        self._index = dict((field, i) for i, field in enumerate(self.fields))
+        self._buffer = TimestampedBuffer(capacity, shape=(len(self.fields), ))
+
+    def __repr__(self):
+        return '{}(fields={!r}, records={})'.format(self.__class__.__name__,
+                                                    self.fields, len(self))
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def __contains__(self, field):
+        return field in self._index
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __getitem__(self, field):
+        return self._buffer.values[:, self._index[field]]
+
+    def keys(self):
+        return list(self.fields)
+
+    def values(self):
+        return [self[field] for field in self.fields]
+
+    def items(self):
+        return [(field, self[field]) for field in self.fields]
+
+    @property
+    def timestamps(self):
+        '''A view of the record timestamps'''
+        return self._buffer.timestamps
+
+    def append(self, record, timestamp):
+        '''Append a record
+
+        Parameters
+        ----------
+        record : dict
+            {field: value} for every field
+        timestamp : float
+        '''
+        self._buffer.append([record[field] for field in self.fields],
+                            timestamp)
@@ -0,0 +1,115 @@
+# vi: ts=4 sw=4 sts=4 expandtab
+'''
+:mod:`ophyd.utils.cache` - Calculation caches
+=============================================
+
+.. module:: ophyd.utils.cache
+   :synopsis: Bounded caches for expensive position calculations
+'''
+
+from __future__ import print_function
+import threading
+from collections import OrderedDict
+
+
+class PositionCache(object):
+    '''A bounded least-recently-used cache, keyed on quantized positions
+
+    Positions within `tolerance` of one another (per axis) share a cache
+    entry.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of entries
+    tolerance : float, optional
+        Quantization step for each position. If 0, positions must match
+        exactly.
+
+    Attributes
+    ----------
+    hits : int
+        Number of lookups which were found in the cache
+    misses : int
+        Number of lookups which were not
+    '''
+
+    def __init__(self, maxsize, tolerance=0.0):
+        self.maxsize = int(maxsize)
+        self.tolerance = float(tolerance)
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __repr__(self):
+        return '{0}(maxsize={1.maxsize!r}, tolerance={1.tolerance!r})' \
+               ''.format(self.__class__.__name__, self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _key(self, position):
+        if self.tolerance > 0.0:
+            return tuple(int(round(value / self.tolerance))
+                         for value in position)
+        else:
+            return tuple(position)
+
+    def get(self, position):
+        '''Look up a position
+
+        Parameters
+        ----------
+        position : sequence of float
+
+        Returns
+        -------
+        value
+            The cached value
+
+        Raises
+        ------
+        KeyError
+            If the position is not cached
+        '''
+        key = self._key(position)
+
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                raise
+
+            # Re-insert as the most recently used entry
+            self._entries[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, position, value):
+        '''Add a position and its calculated value to the cache'''
+        key = self._key(position)
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        '''Remove all entries (statistics are kept)'''
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def info(self):
+        '''Cache statistics'''
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'tolerance': self.tolerance,
+                }
@@ -0,0 +1,125 @@
+from __future__ import print_function
+
+import logging
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from ophyd.utils.buffers import (TimestampedBuffer, ScanBuffer, RecordBuffer)
+from ophyd.runengine.runengine import (summarize_timings, TIMING_PHASES)
+
+
+logger = logging.getLogger(__name__)
+
+
+class TimestampedBufferTests(unittest.TestCase):
+    def test_grow(self):
+        buf = TimestampedBuffer(capacity=2)
+        for i in range(5):
+            buf.append(i * 2.0, i)
+
+        self.assertEquals(len(buf), 5)
+        self.assertEquals(buf.capacity, 8)
+        assert_array_equal(buf.values, [0, 2, 4, 6, 8])
+        assert_array_equal(buf.timestamps, range(5))
+
+        buf.clear()
+        self.assertEquals(len(buf), 0)
+        self.assertEquals(buf.capacity, 8)
+
+    def test_shape(self):
+        buf = TimestampedBuffer(capacity=1, shape=(3, ))
+        buf.append([1, 2, 3], 0.0)
+        buf.append([4, 5, 6], 1.0)
+        assert_array_equal(buf.values, [[1, 2, 3], [4, 5, 6]])
+
+    def test_capture(self):
+        buf = TimestampedBuffer()
+        buf.capture(value=1.0, timestamp=10.0)
+        buf.capture(value=None, timestamp=11.0)
+        buf.capture(value=2.0)
+
+        assert_array_equal(buf.values, [1.0, 2.0])
+        self.assertEquals(buf.timestamps[0], 10.0)
+
+
+class ScanBufferTests(unittest.TestCase):
+    data_keys = {'motor': {'dtype': 'number', 'shape': None},
+                 'image': {'dtype': 'array', 'shape': [512, 512]},
+                 'name': {'dtype': 'string', 'shape': None},
+                 }
+
+    def test_append(self):
+        buf = ScanBuffer(self.data_keys, capacity=2)
+        image = np.zeros((512, 512))
+        for i in range(3):
+            buf.append({'motor': [float(i), i + 0.5],
+                        'image': [image + i, i + 0.25],
+                        'name': ['point%d' % i, i]})
+
+        self.assertEquals(len(buf), 3)
+        self.assertEquals(sorted(buf.keys()), sorted(self.data_keys))
+        assert_array_equal(buf['motor'], [0, 1, 2])
+        assert_array_equal(buf.timestamps('motor'), [0.5, 1.5, 2.5])
+        self.assertEquals(buf['image'].shape, (3, 512, 512))
+        self.assertEquals(buf['image'][2, 0, 0], 2)
+        self.assertEquals(list(buf['name']), ['point0', 'point1', 'point2'])
+
+    def test_preallocate_limit(self):
+        num_points = 10 ** 8
+        buf = ScanBuffer(self.data_keys, capacity=num_points)
+
+        for name in ('motor', 'name'):
+            column = buf.column(name)
+            self.assertLessEqual(column._values.nbytes,
+                                 ScanBuffer.max_preallocate)
+
+        self.assertEquals(buf.column('motor').capacity,
+                          ScanBuffer.max_preallocate // 16)
+        # At least one point is always allocated
+        self.assertEquals(buf.column('image').capacity, 1)
+
+        small = ScanBuffer(self.data_keys, capacity=10)
+        self.assertEquals(small.column('motor').capacity, 10)
+
+    def test_grow(self):
+        buf = ScanBuffer({'motor': {'dtype': 'number', 'shape': None}})
+        initial = buf.column('motor').capacity
+
+        for i in range(initial + 1):
+            buf.append({'motor': [i, i]})
+
+        self.assertEquals(buf.column('motor').capacity, 2 * initial)
+        assert_array_equal(buf['motor'], np.arange(initial + 1))
+
+
+class RecordBufferTests(unittest.TestCase):
+    def test_append(self):
+        fields = TIMING_PHASES + ('total', )
+        buf = RecordBuffer(fields, capacity=1)
+
+        for i in range(4):
+            record = dict((field, float(i)) for field in fields)
+            record['total'] = 2.0 * len(TIMING_PHASES) * i
+            buf.append(record, 100.0 + i)
+
+        self.assertEquals(len(buf), 4)
+        self.assertEquals(buf.keys(), list(fields))
+        assert_array_equal(buf['move'], [0, 1, 2, 3])
+        assert_array_equal(buf.timestamps, [100, 101, 102, 103])
+
+        summary = summarize_timings(buf)
+        self.assertEquals(list(summary.keys()), list(fields))
+        self.assertAlmostEqual(summary['move']['mean'], 1.5)
+        self.assertAlmostEqual(summary['move']['share'], 0.5 / 6)
+        self.assertAlmostEqual(summary['total']['share'], 1.0)
+
+    def test_empty(self):
+        buf = RecordBuffer(['a'])
+        self.assertEquals(len(buf['a']), 0)
+        self.assertEquals(len(summarize_timings(buf)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+from __future__ import print_function
+
+import logging
+import unittest
+
+from ophyd.controls.pseudopos import PseudoPositioner
+from ophyd.controls.sim import SimPositioner
+from ophyd.utils.cache import PositionCache
+
+
+logger = logging.getLogger(__name__)
+
+
+class PositionCacheTests(unittest.TestCase):
+    def test_lookup(self):
+        cache = PositionCache(4)
+        self.assertRaises(KeyError, cache.get, [1.0, 2.0])
+
+        cache.put([1.0, 2.0], 'a')
+        self.assertEquals(cache.get([1.0, 2.0]), 'a')
+        self.assertRaises(KeyError, cache.get, [1.0, 2.000001])
+
+        self.assertEquals(cache.hits, 1)
+        self.assertEquals(cache.misses, 2)
+
+    def test_lru(self):
+        cache = PositionCache(3)
+        for i in range(3):
+            cache.put([i], i)
+
+        # Using the oldest entry keeps it over the next oldest
+        cache.get([0])
+        cache.put([3], 3)
+
+        self.assertEquals(len(cache), 3)
+        self.assertRaises(KeyError, cache.get, [1])
+        self.assertEquals([cache.get([i]) for i in (0, 2, 3)], [0, 2, 3])
+
+    def test_tolerance(self):
+        cache = PositionCache(4, tolerance=1e-3)
+        cache.put([1.0, -2.0], 'a')
+
+        self.assertEquals(cache.get([1.0002, -2.0001]), 'a')
+        self.assertRaises(KeyError, cache.get, [1.002, -2.0])
+
+    def test_clear(self):
+        cache = PositionCache(4)
+        cache.put([1.0], 'a')
+        cache.get([1.0])
+        cache.clear()
+
+        self.assertRaises(KeyError, cache.get, [1.0])
+        self.assertEquals(cache.info, {'hits': 1, 'misses': 1, 'size': 0,
+                                       'maxsize': 4, 'tolerance': 0.0})
+
+
+class PseudoCacheTests(unittest.TestCase):
+    def make_pseudo(self, **kwargs):
+        self.calls = []
+
+        def forward(pseudo=0.0):
+            self.calls.append(pseudo)
+            scale = pseudo_pos.parameters.get('scale', 2.0)
+            return [pseudo * scale]
+
+        def reverse(real=0.0):
+            return [real / 2.0]
+
+        real = SimPositioner(name='real')
+        pseudo_pos = PseudoPositioner('pseudo', [real], forward=forward,
+                                      reverse=reverse, **kwargs)
+        return pseudo_pos
+
+    def test_forward(self):
+        pseudo = self.make_pseudo(cache_size=8)
+        for i in range(3):
+            self.assertEquals(pseudo.calc_forward(pseudo=1.5), [3.0])
+
+        self.assertEquals(self.calls, [1.5])
+        self.assertEquals(pseudo.cache_info['forward']['hits'], 2)
+
+    def test_parameters(self):
+        pseudo = self.make_pseudo(cache_size=8)
+        pseudo.calc_forward(pseudo=1.0)
+
+        pseudo.update_parameters(scale=3.0)
+        self.assertEquals(pseudo.calc_forward(pseudo=1.0), [3.0])
+        self.assertEquals(len(self.calls), 2)
+
+    def test_disabled(self):
+        pseudo = self.make_pseudo()
+        pseudo.calc_forward(pseudo=1.0)
+        pseudo.calc_forward(pseudo=1.0)
+
+        self.assertEquals(len(self.calls), 2)
+        self.assertTrue(pseudo.cache_info is None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+from __future__ import print_function
+
+import logging
+import threading
+import time
+import unittest
+
+from ophyd.runengine.demuxer import (Demuxer, Policy)
+from ophyd.runengine.runengine import RunState
+from .test_runengine import make_run
+
+
+logger = logging.getLogger(__name__)
+
+
+def run_items(demuxer, items):
+    demuxer.start()
+    for item in items:
+        demuxer.enqueue(item)
+
+
+class DemuxerTests(unittest.TestCase):
+    def test_block(self):
+        demuxer = Demuxer()
+        consumer = demuxer.register('block', maxsize=4)
+        received = []
+
+        def consume():
+            for item in consumer:
+                received.append(item)
+                time.sleep(0.001)
+
+        thread = threading.Thread(target=consume)
+        thread.start()
+
+        run_items(demuxer, range(50))
+        demuxer.stop(timeout=5.0)
+        thread.join(5.0)
+
+        self.assertEquals(received, list(range(50)))
+        self.assertEquals(consumer.policy, Policy.BLOCK)
+        self.assertEquals(consumer.stats['dropped'], 0)
+        self.assertLessEqual(consumer.max_lag, 5)
+
+    def test_drop(self):
+        demuxer = Demuxer()
+        consumer = demuxer.register('drop', maxsize=4, policy=Policy.DROP)
+
+        run_items(demuxer, range(50))
+        demuxer.stop(timeout=5.0)
+
+        # The newest items, and the end of the run, are kept
+        self.assertEquals(list(consumer), [47, 48, 49])
+        self.assertEquals(consumer.dropped, 47)
+        self.assertEquals(consumer.lag, 0)
+
+    def test_spill(self):
+        demuxer = Demuxer()
+        consumer = demuxer.register('spill', maxsize=4, policy=Policy.SPILL)
+
+        run_items(demuxer, range(50))
+        demuxer.stop(timeout=5.0)
+
+        self.assertEquals(consumer.spilled, 47)
+        self.assertEquals(list(consumer), list(range(50)))
+        self.assertEquals(consumer.dropped, 0)
+        demuxer.unregister(consumer)
+
+    def test_stalled(self):
+        demuxer = Demuxer(maxsize=10)
+        stalled = demuxer.register('stalled', maxsize=4)
+        spill = demuxer.register('spill', maxsize=4, policy=Policy.SPILL)
+
+        run_items(demuxer, range(12))
+
+        t0 = time.time()
+        demuxer.stop(timeout=0.2)
+        self.assertLess(time.time() - t0, 1.0)
+        self.assertFalse(demuxer.running)
+
+        # The stalled consumer loses items, the others get all of them
+        self.assertEquals(stalled.policy, Policy.DROP)
+        self.assertEquals(list(stalled), [9, 10, 11])
+        self.assertEquals(list(spill), list(range(12)))
+
+    def test_stalled_run(self):
+        run, scan_args, sink = make_run(points=10)
+        run.consumer_timeout = 0.2
+        stalled = run.register_consumer('stalled', maxsize=2)
+
+        t0 = time.time()
+        data = run.start_run(1, scan_args=scan_args)
+        self.assertLess(time.time() - t0, 2.0)
+
+        self.assertEquals(run.state, RunState.IDLE)
+        self.assertEquals(len(data), 10)
+        self.assertEquals(stalled.policy, Policy.DROP)
+        self.assertEquals(sink.documents['run_stop'][-1]['exit_status'],
+                          'success')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+from __future__ import print_function
+
+import logging
+import unittest
+
+import numpy as np
+
+from ophyd.runengine.peakstats import PeakStats
+from ophyd.userapi.scan_api import estimate
+
+
+logger = logging.getLogger(__name__)
+
+
+class PeakStatsTests(unittest.TestCase):
+    def assertStatsEqual(self, live, full):
+        self.assertEquals(sorted(live), sorted(full))
+        for key, value in full.items():
+            self.assertTrue(np.allclose(np.ravel(live[key]), np.ravel(value),
+                                        equal_nan=True),
+                            '%s: %s != %s' % (key, live[key], value))
+
+    def test_estimate(self):
+        rng = np.random.RandomState(0)
+        for trial in range(200):
+            count = rng.randint(2, 60)
+            x = np.sort(rng.rand(count))
+            if trial % 2:
+                # Many equal values, some of them at the half maximum
+                y = np.round(rng.rand(count) * 4) + 1
+            else:
+                y = rng.rand(count)
+
+            stats = PeakStats('x', 'y', capacity=4, register=False)
+            for i in range(count):
+                stats.update(x[i], y[i])
+                if rng.rand() < 0.3 or i == count - 1:
+                    self.assertStatsEqual(stats.stats,
+                                          estimate(x[:i + 1], y[:i + 1]))
+
+    def test_gaussian(self):
+        x = np.linspace(-5, 5, 201)
+        y = np.exp(-(x - 1.5) ** 2 / (2 * 0.5 ** 2))
+
+        stats = PeakStats('x', 'y', register=False)
+        for xi, yi in zip(x, y):
+            stats.update(xi, yi)
+
+        self.assertStatsEqual(stats.stats, estimate(x, y))
+        self.assertAlmostEqual(stats.stats['cen'][0], 1.5, places=1)
+        self.assertAlmostEqual(stats.x_at_ymax, 1.5)
+        self.assertAlmostEqual(stats.center_of_mass, 1.5)
+
+    def test_empty(self):
+        stats = PeakStats('x', 'y', register=False)
+        self.assertEquals(stats.stats, {})
+        self.assertEquals(len(stats), 0)
+        self.assertTrue(stats.ymax is None)
+        self.assertTrue(np.isnan(stats.center_of_mass))
+
+    def test_zero_sum(self):
+        stats = PeakStats('x', 'y', register=False)
+        for x, y in [(1.0, 1.0), (2.0, -1.0)]:
+            stats.update(x, y)
+
+        self.assertTrue(np.isnan(stats.center_of_mass))
+        self.assertTrue(np.isnan(stats.stats['center_of_mass']))
+
+    def test_clear(self):
+        stats = PeakStats('x', 'y', register=False)
+        stats.update(0, 10)
+        stats.clear()
+        stats.update(1, 2)
+
+        self.assertEquals(len(stats), 1)
+        self.assertEquals(stats.ymax, 2)
+        self.assertEquals(stats.center_of_mass, 1)
+
+    def test_subscribe(self):
+        stats = PeakStats('x', 'y', register=False)
+        points = []
+
+        def updated(x=None, y=None, obj=None, **kwargs):
+            points.append((x, y, obj.ymax))
+
+        stats.subscribe(updated, run=False)
+        stats.update(0, 1)
+        stats.update(1, 3)
+        stats.update(2, 2)
+
+        self.assertEquals(points, [(0, 1, 1), (1, 3, 3), (2, 2, 3)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,338 @@
+from __future__ import print_function
+
+import logging
+import threading
+import time
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal
+from epics import ca
+
+from ophyd.controls.positioner import (PositionerGroup, MotionModel,
+                                       CoalescingMover)
+from ophyd.controls.sim import SimPositioner
+from ophyd.utils import (TimeoutError, LimitError)
+
+
+logger = logging.getLogger(__name__)
+
+
+def setUpModule():
+    # Movers issue moves from threads attached to the initial channel
+    # access context, which a session creates on startup
+    ca.use_initial_context()
+
+
+def follow(pos, count):
+    return [pos.next_pos for i in range(count)]
+
+
+class MotionModelTests(unittest.TestCase):
+    def test_trapezoid(self):
+        model = MotionModel(velocity=2.0, acceleration=0.5)
+        # Full velocity is reached on moves longer than 1.0
+        self.assertAlmostEqual(model.move_time(0, 4), 2.5)
+        self.assertAlmostEqual(model.move_time(4, 0), 2.5)
+        self.assertAlmostEqual(model.move_time(0, 0.25), 0.5)
+        self.assertAlmostEqual(model.move_time(1, 1), 0.0)
+
+    def test_backlash(self):
+        model = MotionModel(velocity=1.0, backlash=0.1)
+        self.assertAlmostEqual(model.move_time(0, 1), 1.0)
+        # Overshoot by the backlash distance, and come back
+        self.assertAlmostEqual(model.move_time(0, -1), 1.2)
+        self.assertAlmostEqual(model.move_time(0, 0.05), 0.05)
+
+    def test_settle(self):
+        model = MotionModel(settle_time=0.3)
+        self.assertAlmostEqual(model.move_time(0, 100), 0.3)
+
+        model = MotionModel(velocity=1.0, settle_time=0.3)
+        self.assertAlmostEqual(model.move_time(0, 1), 1.3)
+
+    def test_array(self):
+        model = MotionModel(velocity=1.0, acceleration=0.2, backlash=-0.1)
+        start = np.array([0.0, 1.0, -2.0, 0.5])
+        target = np.array([1.0, 0.0, 2.0, 0.52])
+
+        times = model.move_time(start, target)
+        self.assertEquals(times.shape, (4, ))
+        for t, begin, end in zip(times, start, target):
+            self.assertAlmostEqual(t, model.move_time(begin, end))
+
+        self.assertTrue(isinstance(model.move_time(0, 1), float))
+
+    def test_positioner(self):
+        pos = SimPositioner(name='pos', position=1.0,
+                            motion_model=MotionModel(velocity=4.0))
+        self.assertAlmostEqual(pos.estimate_move_time(3.0), 0.5)
+        self.assertAlmostEqual(pos.estimate_move_time(3.0, start=2.0), 0.25)
+
+        t0 = time.time()
+        pos.move(3.0, wait=True)
+        self.assertAlmostEqual(time.time() - t0, 0.5, places=1)
+
+
+class MoveTimeoutTests(unittest.TestCase):
+    def test_move_timeout(self):
+        pos = SimPositioner(name='pos', motion_model=MotionModel(velocity=2.0))
+        self.assertAlmostEqual(pos.move_timeout(4.0), 2.0 * 2.0 + 2.0)
+        self.assertAlmostEqual(pos.move_timeout(4.0, start=3.0), 2.0 * 0.5 + 2.0)
+
+        pos.timeout_factor = 3.0
+        pos.timeout_allowance = 0.5
+        self.assertAlmostEqual(pos.move_timeout(4.0), 3.0 * 2.0 + 0.5)
+
+        # No velocity, no estimate
+        pos = SimPositioner(name='pos')
+        self.assertEquals(pos.move_timeout(1e6), pos.default_timeout)
+
+    def test_status(self):
+        pos = SimPositioner(name='pos', motion_model=MotionModel(velocity=1.0))
+        pos.timeout_factor = 0.1
+        pos.timeout_allowance = 0.05
+
+        status = pos.move(1.0, wait=False)
+        self.assertAlmostEqual(status.timeout, 0.15)
+        self.assertFalse(status.timed_out)
+
+        time.sleep(0.2)
+        self.assertTrue(status.timed_out)
+        pos.stop()
+
+    def test_wait(self):
+        pos = SimPositioner(name='pos', motion_model=MotionModel(velocity=1.0))
+
+        t0 = time.time()
+        self.assertRaises(TimeoutError, pos.move, 1.0, timeout=0.1)
+        self.assertLess(time.time() - t0, 0.5)
+
+        status = pos.move(0.1, wait=False)
+        self.assertTrue(status.wait(status.timeout))
+        self.assertFalse(status.timed_out)
+
+
+class TrajectoryTests(unittest.TestCase):
+    def test_follow(self):
+        pos = SimPositioner(name='pos')
+        pos.set_trajectory([1, 2, 3])
+
+        self.assertEquals(follow(pos, 4), [1, 2, 3, None])
+        self.assertEquals(pos.trajectory_index, 3)
+
+    def test_unset(self):
+        pos = SimPositioner(name='pos')
+        self.assertRaises(ValueError, getattr, pos, 'next_pos')
+        self.assertRaises(ValueError, pos.rewind_trajectory, 0)
+
+    def test_rewind_sequence(self):
+        pos = SimPositioner(name='pos')
+        points = np.linspace(0, 1, 200000)
+        pos.set_trajectory(points)
+
+        follow(pos, 100000)
+        pos.rewind_trajectory(99998)
+        self.assertEquals(pos.trajectory_index, 99998)
+
+        rest = [pos.next_pos for i in range(len(points) - 99998)]
+        assert_array_equal(rest, points[99998:])
+        self.assertEquals(pos.next_pos, None)
+
+        pos.rewind_trajectory(0)
+        self.assertEquals(pos.next_pos, 0.0)
+
+        self.assertRaises(ValueError, pos.rewind_trajectory, 2)
+        self.assertRaises(ValueError, pos.rewind_trajectory, -1)
+
+    def test_rewind_generator(self):
+        pos = SimPositioner(name='pos')
+        pos.set_trajectory(iter(range(100)))
+
+        follow(pos, 50)
+        pos.rewind_trajectory(48)
+        self.assertEquals(follow(pos, 3), [48, 49, 50])
+
+        # Only the latest points of a generator are kept
+        self.assertRaises(ValueError, pos.rewind_trajectory, 0)
+        self.assertEquals(pos.trajectory_index, 51)
+
+        pos.rewind_trajectory(51 - pos.rewind_limit)
+        self.assertEquals(pos.next_pos, 51 - pos.rewind_limit)
+        self.assertLessEqual(len(pos._recent), pos.rewind_limit)
+
+
+class CoalescingMoverTests(unittest.TestCase):
+    def test_latest_wins(self):
+        pos = SimPositioner(name='pos',
+                            motion_model=MotionModel(velocity=100.0))
+        mover = CoalescingMover(pos, max_rate=10.0)
+        done = []
+
+        def moved(success=True, superseded=False, **kwargs):
+            done.append((success, superseded))
+
+        self.assertTrue(mover.move(-1.0).wait(1.0))
+
+        # Requested within the issue period of the first move
+        statuses = [mover.move(0.01 * i, moved_cb=moved) for i in range(50)]
+        self.assertTrue(statuses[-1].wait(1.0))
+        mover.stop()
+
+        self.assertEquals(pos.position, 0.49)
+        self.assertTrue(statuses[-1].success)
+        for status in statuses[:-1]:
+            self.assertTrue(status.done)
+            self.assertFalse(status.success)
+            self.assertTrue(status.superseded)
+
+        self.assertEquals(mover.requested, 51)
+        self.assertEquals(mover.issued, 2)
+        self.assertEquals(mover.superseded, 49)
+        self.assertEquals(len(done), 50)
+        self.assertEquals(done[-1], (True, False))
+
+    def test_rate(self):
+        pos = SimPositioner(name='pos')
+        mover = CoalescingMover(pos, max_rate=20.0)
+
+        t0 = time.time()
+        while time.time() - t0 < 0.5:
+            status = mover.move(time.time() - t0)
+            time.sleep(0.002)
+
+        self.assertTrue(status.wait(1.0))
+        mover.stop()
+        self.assertLessEqual(mover.issued, 0.5 * 20.0 + 2)
+        self.assertEquals(pos.position, status.target)
+
+    def test_in_flight(self):
+        pos = SimPositioner(name='pos',
+                            motion_model=MotionModel(velocity=1.0))
+        mover = CoalescingMover(pos, max_rate=20.0)
+
+        first = mover.move(1.0)
+        time.sleep(0.1)
+        second = mover.move(0.2)
+
+        self.assertTrue(second.wait(1.0))
+        self.assertTrue(second.success)
+        self.assertEquals(pos.position, 0.2)
+
+        self.assertFalse(first.success)
+        self.assertTrue(first.superseded)
+        self.assertEquals(mover.issued, 2)
+        mover.stop()
+
+    def test_stop(self):
+        pos = SimPositioner(name='pos')
+        mover = CoalescingMover(pos, max_rate=1.0)
+
+        mover.move(1.0).wait(1.0)
+        pending = mover.move(2.0)
+        mover.stop()
+
+        self.assertTrue(pending.done)
+        self.assertTrue(pending.superseded)
+        self.assertEquals(pos.position, 1.0)
+        self.assertTrue(mover._thread is None)
+
+    def test_callback_move(self):
+        pos = SimPositioner(name='pos')
+        mover = CoalescingMover(pos, max_rate=1.0)
+        mover.move(1.0).wait(1.0)
+
+        # A callback may request a move (here, from another thread)
+        def moved(success=True, superseded=False, **kwargs):
+            if superseded:
+                thread = threading.Thread(target=mover.move, args=(3.0, ))
+                thread.start()
+                thread.join(1.0)
+                retried.append(not thread.is_alive())
+
+        retried = []
+        mover.move(2.0, moved_cb=moved)
+        mover.move(2.5)
+
+        self.assertEquals(retried, [True])
+        self.assertEquals(mover._pending[0], 3.0)
+        mover.stop()
+
+
+class PositionerGroupTests(unittest.TestCase):
+    def make_group(self, velocity=10.0):
+        m1 = SimPositioner(name='m1', limits=(-5, 5),
+                           motion_model=MotionModel(velocity=velocity))
+        m2 = SimPositioner(name='m2',
+                           motion_model=MotionModel(velocity=velocity))
+        return PositionerGroup([m1, m2], name='group'), m1, m2
+
+    def test_move(self):
+        group, m1, m2 = self.make_group()
+
+        t0 = time.time()
+        group.move([1.0, 2.0], wait=True)
+        self.assertLess(time.time() - t0, 0.5)
+        self.assertEquals(group.position, [1.0, 2.0])
+
+        status = group.move([0.0, 0.0], wait=False)
+        self.assertTrue(status.wait(1.0))
+        self.assertTrue(status.success)
+
+    def test_limits(self):
+        group, m1, m2 = self.make_group()
+
+        # Nothing moves if any target is invalid
+        self.assertRaises(LimitError, group.move, [10.0, 1.0])
+        self.assertRaises(ValueError, group.move, [1.0])
+        self.assertEquals(group.position, [0.0, 0.0])
+
+    def test_timeout(self):
+        group, m1, m2 = self.make_group(velocity=1.0)
+
+        t0 = time.time()
+        self.assertRaises(TimeoutError, group.move, [1.0, 3.0], timeout=0.1)
+        self.assertLess(time.time() - t0, 0.5)
+        self.assertFalse(group.moving)
+
+    def test_failure(self):
+        group, m1, m2 = self.make_group(velocity=1.0)
+
+        threading.Timer(0.1, m2.stop).start()
+        self.assertRaises(RuntimeError, group.move, [1.0, 3.0], timeout=10.0)
+        self.assertEquals(m2.position, 0.0)
+
+
+class MoveStatusTests(unittest.TestCase):
+    def test_callback(self):
+        pos = SimPositioner(name='pos')
+        status = pos.move(1.0, wait=False)
+        self.assertTrue(status.wait(1.0))
+
+        # Called immediately once complete
+        finished = []
+        status.add_callback(finished.append)
+        self.assertEquals(finished, [status])
+
+    def test_next_move(self):
+        pos = SimPositioner(name='pos', motion_model=MotionModel(velocity=10.0))
+        statuses = []
+
+        # The next move is requested as soon as the first completes, as by
+        # the run engine
+        def next_move(status):
+            statuses.append(pos.move(0.2, wait=False))
+
+        pos.move(0.1, wait=False).add_callback(next_move)
+        for i in range(50):
+            if statuses:
+                break
+            time.sleep(0.01)
+
+        self.assertTrue(statuses[0].wait(1.0))
+        self.assertTrue(statuses[0].success)
+        self.assertEquals(pos.position, 0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,377 @@
+from __future__ import print_function
+
+import logging
+import math
+import threading
+import time
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+from epics import ca
+
+from ophyd.controls.positioner import MotionModel
+from ophyd.controls.pseudopos import (PseudoPositioner, InverseSolver)
+from ophyd.controls.sim import SimPositioner
+from ophyd.utils import LimitError
+
+
+logger = logging.getLogger(__name__)
+
+
+def setUpModule():
+    # Update threads attach to the initial channel access context, which a
+    # session creates on startup
+    ca.use_initial_context()
+
+
+def slit_forward(mid=0.0, gap=0.0):
+    return [mid - gap / 2., mid + gap / 2.]
+
+
+def slit_reverse(low=0.0, high=0.0):
+    return [(low + high) / 2., high - low]
+
+
+def make_slit(name='slit', motion_model=None, **kwargs):
+    low = SimPositioner(name='low', motion_model=motion_model)
+    high = SimPositioner(name='high', motion_model=motion_model)
+    slit = PseudoPositioner(name, [low, high], forward=slit_forward,
+                            reverse=slit_reverse, pseudo=['mid', 'gap'],
+                            **kwargs)
+    return slit, low, high
+
+
+def record_readback(pos):
+    values = []
+
+    def readback(value=None, **kwargs):
+        values.append(value)
+
+    pos.subscribe(readback, event_type=pos.SUB_READBACK, run=False)
+    return values
+
+
+class MoveTimeTests(unittest.TestCase):
+    def test_estimate(self):
+        model = MotionModel(velocity=1.0)
+        slit, low, high = make_slit(motion_model=model)
+        self.assertAlmostEqual(slit.estimate_move_time([0.0, 2.0],
+                                                       [0.0, 0.0]), 1.0)
+
+        slit, low, high = make_slit(motion_model=model, concurrent=False)
+        self.assertAlmostEqual(slit.estimate_move_time([0.0, 2.0],
+                                                       [0.0, 0.0]), 2.0)
+
+    def test_move_timeout(self):
+        slit, low, high = make_slit(motion_model=MotionModel(velocity=1.0))
+        low._set_position(0.0)
+        self.assertAlmostEqual(slit.move_timeout([0.0, 2.0]),
+                               slit.timeout_factor * 1.0 +
+                               slit.timeout_allowance)
+
+        slit, low, high = make_slit()
+        self.assertEquals(slit.move_timeout([0.0, 2.0]), slit.default_timeout)
+
+    def test_estimate_array(self):
+        slit, low, high = make_slit(motion_model=MotionModel(velocity=1.0))
+        targets = np.array([[0.0, 2.0], [1.0, 2.0], [1.0, 4.0]])
+        starts = np.array([[0.0, 0.0], [0.0, 2.0], [1.0, 2.0]])
+
+        assert_array_almost_equal(slit.estimate_move_time(targets, starts),
+                                  [1.0, 1.0, 1.0])
+
+
+class ArrayKinematicsTests(unittest.TestCase):
+    pseudo = np.array([[0.0, 2.0], [1.0, 2.0], [-1.0, 0.5]])
+    real = np.array([[-1.0, 1.0], [0.0, 2.0], [-1.25, -0.75]])
+
+    def test_vectorized(self):
+        calls = []
+
+        def forward(mid=0.0, gap=0.0):
+            calls.append(mid)
+            return slit_forward(mid, gap)
+
+        low = SimPositioner(name='low')
+        high = SimPositioner(name='high')
+        slit = PseudoPositioner('slit', [low, high], forward=forward,
+                                reverse=slit_reverse, pseudo=['mid', 'gap'])
+
+        assert_array_almost_equal(slit.calc_forward_array(self.pseudo),
+                                  self.real)
+        assert_array_almost_equal(slit.calc_reverse_array(self.real),
+                                  self.pseudo)
+        self.assertEquals(len(calls), 1)
+        self.assertEquals(slit._vectorized, {'forward': True,
+                                             'reverse': True})
+
+    def test_point_by_point(self):
+        def forward(mid=0.0, gap=0.0):
+            # math functions only accept scalars
+            return [mid - math.fabs(gap) / 2., mid + math.fabs(gap) / 2.]
+
+        low = SimPositioner(name='low')
+        high = SimPositioner(name='high')
+        slit = PseudoPositioner('slit', [low, high], forward=forward,
+                                reverse=slit_reverse, pseudo=['mid', 'gap'])
+
+        assert_array_almost_equal(slit.calc_forward_array(self.pseudo),
+                                  self.real)
+        self.assertEquals(slit._vectorized['forward'], False)
+
+        # A single point
+        assert_array_almost_equal(slit.calc_forward_array([0.0, 2.0]),
+                                  [[-1.0, 1.0]])
+
+    def test_shape(self):
+        slit, low, high = make_slit()
+        self.assertRaises(ValueError, slit.calc_forward_array, [[1, 2, 3]])
+
+    def test_check_array(self):
+        low = SimPositioner(name='low', limits=(-1, 1))
+        high = SimPositioner(name='high', limits=(-1, 2))
+        slit = PseudoPositioner('slit', [low, high], forward=slit_forward,
+                                reverse=slit_reverse, pseudo=['mid', 'gap'])
+
+        slit.check_array(self.pseudo[:2])
+        try:
+            slit.check_array(self.pseudo)
+        except LimitError as ex:
+            self.assertIn('Position 2', str(ex))
+            self.assertIn('low', str(ex))
+        else:
+            self.fail('LimitError not raised')
+
+
+def curved(x):
+    return np.array([x[0] + 0.1 * x[1] ** 2, x[1] + 0.2 * np.sin(x[0])])
+
+
+class InverseSolverTests(unittest.TestCase):
+    def test_linear(self):
+        matrix = np.array([[2.0, 1.0], [-1.0, 3.0]])
+        solver = InverseSolver(lambda x: np.dot(matrix, x), 2)
+
+        expected = np.array([0.5, -1.5])
+        assert_array_almost_equal(solver.solve(np.dot(matrix, expected)),
+                                  expected)
+
+    def test_nonlinear(self):
+        solver = InverseSolver(curved, 2)
+        for expected in ([0.3, -0.7], [2.0, 1.0], [-1.0, 0.0]):
+            x = solver.solve(curved(np.array(expected)))
+            assert_array_almost_equal(x, expected)
+            self.assertLess(np.linalg.norm(curved(x) - curved(expected)),
+                            solver.tolerance)
+
+    def test_tracking(self):
+        solver = InverseSolver(curved, 2)
+        path = np.linspace([0.0, 0.0], [0.5, 0.5], 100)
+        solver.solve(curved(path[0]))
+
+        evaluations = solver.jacobian_evaluations
+        for expected in path[1:]:
+            assert_array_almost_equal(solver.solve(curved(expected)),
+                                      expected)
+
+        # The cached Jacobian is refined rather than estimated again
+        stats = solver.stats
+        self.assertEquals(stats['calls'], 100)
+        self.assertLess(stats['mean_iterations'], 3)
+        self.assertLess(solver.jacobian_evaluations - evaluations, 10)
+
+    def test_reset(self):
+        solver = InverseSolver(curved, 2)
+        solver.solve(curved(np.array([1.0, 1.0])))
+        solver.reset()
+
+        self.assertTrue(solver._jacobian is None)
+        assert_array_almost_equal(solver._last_solution, [0.0, 0.0])
+
+    def test_numeric_reverse(self):
+        low = SimPositioner(name='low')
+        high = SimPositioner(name='high')
+        slit = PseudoPositioner('slit', [low, high], forward=slit_forward,
+                                pseudo=['mid', 'gap'], numeric_reverse=True)
+
+        low._set_position(-1.0)
+        high._set_position(2.0)
+        assert_array_almost_equal(slit.position, [0.5, 3.0])
+        assert_array_almost_equal(slit.calc_reverse(low=0.0, high=1.0),
+                                  [0.5, 1.0])
+        self.assertGreater(slit.solver_stats['calls'], 0)
+
+        self.assertRaises(ValueError, PseudoPositioner, 'slit', [low, high],
+                          forward=slit_forward, reverse=slit_reverse,
+                          pseudo=['mid', 'gap'], numeric_reverse=True)
+
+
+class PositionerGraphTests(unittest.TestCase):
+    def make_diamond(self):
+        '''slit -> total, and (slit, total) -> width: width is the gap'''
+        slit, low, high = make_slit()
+        low._set_position(0.0)
+        mid, gap = slit.pseudos['mid'], slit.pseudos['gap']
+
+        def total_reverse(**kwargs):
+            return [kwargs['slit.mid'] + kwargs['slit.gap']]
+
+        total = PseudoPositioner('total', [mid, gap],
+                                 forward=lambda total=0.0: [total, 0.0],
+                                 reverse=total_reverse, pseudo=['sum'])
+        total.graph.update_all()
+
+        def width_reverse(**kwargs):
+            return [kwargs['total.sum'] - kwargs['slit.mid']]
+
+        width = PseudoPositioner('width', [total.pseudos['sum'], mid],
+                                 forward=lambda width=0.0: [width, 0.0],
+                                 reverse=width_reverse, pseudo=['width'])
+        return slit, total, width, low, high
+
+    def test_order(self):
+        slit, total, width, low, high = self.make_diamond()
+        graph = width.graph
+
+        self.assertTrue(graph is total.graph and graph is slit.graph)
+        self.assertEquals(graph.order, [slit, total, width])
+        self.assertEquals(graph.dependencies,
+                          {'slit': [], 'total': ['slit'],
+                           'width': ['total', 'slit']})
+        self.assertEquals(graph.dependents(slit), [total, width])
+
+    def test_update_once(self):
+        slit, total, width, low, high = self.make_diamond()
+        values = record_readback(width)
+        evaluations = width.graph.evaluations
+
+        high._set_position(3.0)
+        low._set_position(1.0)
+
+        # Each pseudo positioner is recalculated once per real update, and
+        # only ever sees consistent inputs
+        self.assertEquals(width.graph.evaluations - evaluations, 6)
+        self.assertEquals(values, [[3.0], [2.0]])
+
+    def test_update_all(self):
+        slit, total, width, low, high = self.make_diamond()
+        values = record_readback(width)
+
+        width.graph.update_all()
+        self.assertEquals(values, [[0.0]])
+
+
+class CoalescingTests(unittest.TestCase):
+    def test_immediate(self):
+        slit, low, high = make_slit()
+        values = record_readback(slit)
+
+        low._set_position(-1.0)
+        high._set_position(1.0)
+        self.assertEquals(values, [[-0.5, 1.0], [0.0, 2.0]])
+        self.assertTrue(slit._update_thread is None)
+
+    def test_rate(self):
+        slit, low, high = make_slit(update_rate=20.0)
+        values = record_readback(slit)
+        threads = set()
+        slit.subscribe(lambda **kwargs: threads.add(threading.current_thread()),
+                       event_type=slit.SUB_READBACK, run=False)
+
+        t0 = time.time()
+        for i in range(100):
+            high._set_position(0.01 * (i + 1))
+            time.sleep(0.002)
+
+        elapsed = time.time() - t0
+        time.sleep(0.1)
+
+        # One recalculation per update period, on a single update thread
+        self.assertLessEqual(len(values), elapsed * 20.0 + 2)
+        self.assertEquals(values[-1], [0.5, 1.0])
+        self.assertEquals(threads, set([slit._update_thread]))
+
+    def test_batch(self):
+        slit, low, high = make_slit()
+        values = record_readback(slit)
+
+        with slit.batch_updates():
+            low._set_position(-2.0)
+            high._set_position(2.0)
+            self.assertEquals(values, [])
+
+        self.assertEquals(values, [[0.0, 4.0]])
+
+    def test_flush(self):
+        slit, low, high = make_slit(update_rate=1.0)
+        values = record_readback(slit)
+
+        # Within the first update period, so the recalculation is pending
+        slit._last_update = time.time()
+        high._set_position(3.0)
+        self.assertEquals(values, [])
+
+        slit._flush_update()
+        self.assertEquals(values, [[1.5, 3.0]])
+
+    def test_destroy(self):
+        slit, low, high = make_slit(update_rate=20.0)
+        values = record_readback(slit)
+        thread = slit._update_thread
+
+        slit.destroy()
+        self.assertFalse(thread.is_alive())
+
+        high._set_position(3.0)
+        time.sleep(0.1)
+        self.assertEquals(values, [])
+
+
+class NestedCoalescingTests(unittest.TestCase):
+    def make_nested(self, **kwargs):
+        slit, low, high = make_slit()
+        # The slit position is known once a real positioner has reported
+        low._set_position(0.0)
+
+        def forward(center=0.0):
+            return [center]
+
+        def reverse(**kwargs):
+            return [kwargs['slit.mid'] * 10.]
+
+        outer = PseudoPositioner('outer', [slit.pseudos['mid']],
+                                 forward=forward, reverse=reverse,
+                                 pseudo=['center'], **kwargs)
+        return outer, slit, low, high
+
+    def test_rate(self):
+        outer, slit, low, high = self.make_nested(update_rate=20.0)
+        self.assertTrue(outer.graph is not None)
+        values = record_readback(outer)
+
+        t0 = time.time()
+        for i in range(100):
+            low._set_position(0.01 * (i + 1))
+            time.sleep(0.002)
+
+        elapsed = time.time() - t0
+        time.sleep(0.1)
+
+        self.assertLessEqual(len(values), elapsed * 20.0 + 2)
+        self.assertAlmostEqual(values[-1][0], 5.0)
+
+    def test_batch(self):
+        outer, slit, low, high = self.make_nested()
+        values = record_readback(outer)
+
+        with outer.batch_updates():
+            low._set_position(1.0)
+            high._set_position(3.0)
+            self.assertEquals(values, [])
+
+        self.assertEquals(values, [[20.0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,214 @@
+from __future__ import print_function
+
+import logging
+import threading
+import time
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from ophyd.controls.positioner import MotionModel
+from ophyd.controls.signal import SignalGroup
+from ophyd.controls.sim import (SimPositioner, SimDetector)
+from ophyd.runengine.runengine import (RunEngine, RunState, EventSchema,
+                                       TIMING_PHASES, summarize_timings)
+from ophyd.runengine.sinks import MemorySink
+from ophyd.utils.buffers import RecordBuffer
+from ophyd.session.sessionmgr import SessionManager
+from ophyd.utils import TimeoutError
+
+
+logger = logging.getLogger(__name__)
+
+
+def make_run(points=20, velocity=20.0):
+    motor = SimPositioner(name='m',
+                          motion_model=MotionModel(velocity=velocity))
+    det = SimDetector(name='d', func=lambda: 2.0 * motor.position)
+    motor.set_trajectory(np.arange(points, dtype=float))
+
+    sink = MemorySink()
+    scan_args = {'positioners': [motor], 'detectors': [det], 'sink': sink,
+                 'num_points': points}
+    return RunEngine(None), scan_args, sink
+
+
+class EventSchemaTests(unittest.TestCase):
+    def test_data_keys(self):
+        motor = SimPositioner(name='m')
+        scalar = SimDetector(name='scalar', value=1.0)
+        image = SimDetector(name='image', value=np.zeros((4, 3)))
+
+        group = SignalGroup(name='group')
+        group.add_signal(SimDetector(name='a', value=2.0))
+        group.add_signal(SimDetector(name='b', value=3.0))
+
+        schema = EventSchema([motor], [scalar, image, group])
+        self.assertEquals(schema.keys, ['m', 'scalar', 'image', 'a', 'b'])
+        self.assertEquals(schema.data_keys['m'],
+                          {'source': None, 'dtype': 'number', 'shape': None})
+        self.assertEquals(schema.data_keys['image']['dtype'], 'array')
+        self.assertEquals(schema.data_keys['image']['shape'], [4, 3])
+        self.assertEquals(schema.data_keys['a']['dtype'], 'number')
+
+    def test_format_event(self):
+        schema = EventSchema([SimPositioner(name='m')],
+                             [SimDetector(name='d', value=1.0)])
+        values = {'m': {'value': 1.5, 'timestamp': 10.0},
+                  'd': {'value': 2.5, 'timestamp': 11.0},
+                  'other': {'value': 0.0, 'timestamp': 12.0}}
+
+        self.assertEquals(schema.format_event(values),
+                          {'m': [1.5, 10.0], 'd': [2.5, 11.0]})
+
+    def test_run(self):
+        run, scan_args, sink = make_run(points=5)
+        schema = EventSchema(scan_args['positioners'],
+                             scan_args['detectors'])
+        scan_args['schema'] = schema
+        run.start_run(1, scan_args=scan_args)
+
+        # The schema given is used for the descriptor, inserted once
+        descriptor, = sink.documents['descriptor']
+        self.assertEquals(descriptor['data_keys'], schema.data_keys)
+        self.assertEquals(sorted(sink.events[0]['data']), ['d', 'm'])
+
+
+class TimingTests(unittest.TestCase):
+    def test_summarize(self):
+        fields = TIMING_PHASES + ('total', )
+        timings = RecordBuffer(fields)
+        for i in range(20):
+            timing = dict.fromkeys(fields, 0.0)
+            timing.update(move=0.01 * (i + 1), read=0.002, total=0.0)
+            timing['total'] = timing['move'] + timing['read']
+            timings.append(timing, float(i))
+
+        summary = summarize_timings(timings)
+        self.assertEquals(list(summary), list(fields))
+        self.assertAlmostEqual(summary['move']['mean'], 0.105)
+        self.assertAlmostEqual(summary['move']['p95'],
+                               np.percentile(0.01 * np.arange(1, 21), 95))
+        self.assertAlmostEqual(summary['read']['total'], 0.04)
+        self.assertAlmostEqual(summary['total']['share'], 1.0)
+        self.assertAlmostEqual(sum(summary[phase]['share']
+                                   for phase in TIMING_PHASES), 1.0)
+
+        self.assertEquals(summarize_timings(RecordBuffer(fields)), {})
+
+    def test_run(self):
+        run, scan_args, sink = make_run(points=10, velocity=100.0)
+        data = run.start_run(1, scan_args=scan_args)
+
+        self.assertEquals(len(data.timings), 10)
+        move = data.timings['move']
+        self.assertTrue(all(move[1:] >= 0.01))
+
+        summary = run.timing_summary
+        self.assertGreater(summary['move']['share'], 0.5)
+        self.assertAlmostEqual(summary['total']['total'],
+                               np.sum(data.timings['total']))
+
+
+class PauseTests(unittest.TestCase):
+    def test_pause_resume(self):
+        run, scan_args, sink = make_run()
+
+        threading.Timer(0.2, run.pause).start()
+        data = run.start_run(1, scan_args=scan_args)
+
+        self.assertEquals(run.state, RunState.PAUSED)
+        paused_at = run.checkpoint['seq_num']
+        self.assertTrue(0 < paused_at < 20)
+        self.assertEquals(len(data), paused_at)
+        self.assertEquals(run.checkpoint['positions'], {'m': paused_at})
+        self.assertEquals(len(sink.events), paused_at)
+
+        data = run.resume()
+        self.assertEquals(run.state, RunState.IDLE)
+        assert_array_equal(data['m'], np.arange(20))
+        assert_array_equal(data['d'], 2.0 * np.arange(20))
+
+        self.assertEquals([event['seq_num'] for event in sink.events],
+                          list(range(20)))
+        self.assertEquals(len(sink.documents['descriptor']), 1)
+        self.assertEquals(sink.documents['run_stop'][-1]['exit_status'],
+                          'success')
+
+    def test_abort(self):
+        run, scan_args, sink = make_run()
+
+        threading.Timer(0.2, run.pause).start()
+        run.start_run(1, scan_args=scan_args)
+
+        run.abort()
+        self.assertEquals(run.state, RunState.IDLE)
+        self.assertEquals(sink.documents['run_stop'][-1]['exit_status'],
+                          'abort')
+        self.assertRaises(RuntimeError, run.resume)
+        self.assertRaises(RuntimeError, run.abort)
+
+    def test_stop_paused(self):
+        run, scan_args, sink = make_run()
+
+        threading.Timer(0.2, run.pause).start()
+        run.start_run(1, scan_args=scan_args)
+
+        run.stop()
+        self.assertEquals(run.state, RunState.IDLE)
+        self.assertEquals(sink.documents['run_stop'][-1]['exit_status'],
+                          'abort')
+
+
+class MoveTimeoutTests(unittest.TestCase):
+    def test_stuck(self):
+        run, scan_args, sink = make_run(velocity=1.0)
+        motor, = scan_args['positioners']
+        motor.timeout_factor = 0.1
+        motor.timeout_allowance = 0.05
+
+        t0 = time.time()
+        self.assertRaises(TimeoutError, run.start_run, 1,
+                          scan_args=scan_args)
+        self.assertLess(time.time() - t0, 1.0)
+
+        self.assertEquals(run.state, RunState.IDLE)
+        self.assertFalse(motor.moving)
+        self.assertEquals(sink.documents['run_stop'][-1]['exit_status'],
+                          'fail')
+
+
+class SigintTests(unittest.TestCase):
+    def setUp(self):
+        # Only what the SIGINT handler uses, without starting a session
+        self.session = SessionManager.__new__(SessionManager)
+        self.session._logger = logger
+        self.session._run_engines = set()
+        self.session._registry = {'positioners': {}}
+        self.interrupts = []
+        self.session._orig_sigint_hdlr = \
+            lambda sig, frame: self.interrupts.append(sig)
+
+    def test_pause_active(self):
+        idle, idle_args, idle_sink = make_run()
+        run, scan_args, sink = make_run()
+        self.session.register(idle)
+        self.session.register(run)
+
+        threading.Timer(0.2, self.session.sigint_hdlr,
+                        args=(2, None)).start()
+        run.start_run(1, scan_args=scan_args)
+
+        self.assertEquals(run.state, RunState.PAUSED)
+        self.assertEquals(idle.state, RunState.IDLE)
+        self.assertEquals(self.interrupts, [2])
+        self.assertEquals(self.session.run_engines, [run])
+        self.assertTrue(self.session.active_run_engine is None)
+
+        run.abort()
+        self.assertEquals(self.session.run_engines, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
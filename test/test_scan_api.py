@@ -0,0 +1,528 @@
+from __future__ import print_function
+
+import itertools
+import logging
+import threading
+import time
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from ophyd.controls.positioner import (FlyCapture, MotionModel)
+from ophyd.controls.pseudopos import PseudoPositioner
+from ophyd.controls.sim import (SimPositioner, SimDetector)
+from ophyd.runengine.sinks import MemorySink
+from ophyd.userapi.scan_api import (Scan, AScan, DScan, FlyScan, GridPath,
+                                    AdaptiveScan, ScanQueue, total_move_time,
+                                    point_move_times, refine_points)
+
+
+logger = logging.getLogger(__name__)
+
+
+def mesh_paths(start, stop, npts):
+    '''The positions of an AScan mesh, computed in full'''
+    npts = np.array(npts) + 1
+    edges = [np.linspace(0, 1, n) for n in npts]
+    grid = [np.array(a) for a in zip(*itertools.product(*edges))]
+
+    paths = []
+    for dim in range(len(npts)):
+        for begin, end in zip(start[dim], stop[dim]):
+            paths.append(begin + ((end - begin) * grid[dim]))
+
+    return paths
+
+
+class Logbook(object):
+    '''Records log entries instead of posting them'''
+    def __init__(self):
+        self.entries = []
+
+    def log(self, text, **kwargs):
+        self.entries.append(text)
+
+
+class SimScanTest(unittest.TestCase):
+    '''Base class of tests running scans of simulated hardware'''
+    def setUp(self):
+        self._config = dict(Scan._shared_config)
+        Scan._shared_config.update(default_detectors=[], user_detectors=[],
+                                   default_triggers=[], user_triggers=[])
+
+    def tearDown(self):
+        Scan._shared_config.update(self._config)
+
+    def make_scan(self, scan_class, detectors=()):
+        scan = scan_class()
+        scan.sink = MemorySink()
+        scan.logbook = Logbook()
+        scan.user_detectors = list(detectors)
+        return scan
+
+
+class AScanTests(SimScanTest):
+    def test_scan(self):
+        m1 = SimPositioner(name='m1',
+                           motion_model=MotionModel(velocity=100.0))
+        det = SimDetector(name='det', func=lambda: 2.0 * m1.position)
+
+        scan = self.make_scan(AScan, [det])
+        scan(m1, 0, 1, 4)
+
+        data = scan.last_data
+        assert_array_equal(data.m1, np.linspace(0, 1, 5))
+        assert_array_equal(data.det, 2.0 * np.linspace(0, 1, 5))
+
+        self.assertEquals([event['seq_num'] for event in scan.sink.events],
+                          list(range(5)))
+        self.assertEquals(scan.sink.documents['run_stop'][-1]['exit_status'],
+                          'success')
+
+        entry, = scan.logbook.entries
+        self.assertIn('m1', entry)
+        self.assertIn('det', entry)
+
+    def test_mesh(self):
+        m1 = SimPositioner(name='m1')
+        m2 = SimPositioner(name='m2')
+        det = SimDetector(name='det',
+                          func=lambda: m1.position + 10 * m2.position)
+
+        scan = self.make_scan(AScan, [det])
+        scan([m1, m2], [0, 0], [1, 2], [1, 2])
+
+        data = scan.last_data
+        expected = mesh_paths([[0], [0]], [[1], [2]], [1, 2])
+        assert_array_equal(data.m1, expected[0])
+        assert_array_equal(data.m2, expected[1])
+        assert_array_equal(data.det, expected[0] + 10 * expected[1])
+
+
+class FlyCaptureTests(unittest.TestCase):
+    def make_capture(self):
+        pos = SimPositioner(name='pos')
+        det = SimDetector(name='det', value=0.0)
+        capture = FlyCapture(pos, [det], capacity=4)
+
+        # The positioner moves from 0 to 1 in 1 s, and the detector reads
+        # twice the position
+        for t in np.linspace(0, 1, 11):
+            capture.readback.append(t, 100.0 + t)
+        for t in np.linspace(0.1, 0.9, 9):
+            capture.detectors['det'].append(2.0 * t, 100.0 + t)
+
+        return capture
+
+    def test_interpolate(self):
+        capture = self.make_capture()
+        data = capture.reconstruct([0.1, 0.5, 0.9])
+
+        assert_array_equal(data['pos'], [0.1, 0.5, 0.9])
+        self.assertTrue(np.allclose(data['det'], [0.2, 1.0, 1.8]))
+
+    def test_bin(self):
+        capture = self.make_capture()
+        data = capture.reconstruct([0.0, 0.5, 1.0], mode='bin')
+
+        # Bins are split at 0.25 and 0.75
+        self.assertTrue(np.allclose(data['det'], [0.3, 1.0, 1.7]))
+        self.assertRaises(ValueError, capture.reconstruct, [0.0], mode='x')
+
+    def test_times(self):
+        capture = self.make_capture()
+        self.assertTrue(np.allclose(capture.times_at([0.0, 0.25, 1.0]),
+                                    [100.0, 100.25, 101.0]))
+
+    def test_capture(self):
+        pos = SimPositioner(name='pos')
+        det = SimDetector(name='det', value=0.0)
+        pos.subscribe(lambda value=None, **kwargs: det.put(2.0 * value),
+                      event_type=pos.SUB_READBACK, run=False)
+
+        capture = pos.fly(1.0, detectors=[det])
+        assert_array_equal(capture.readback.values, [0.0, 1.0, 1.0])
+        assert_array_equal(capture.detectors['det'].values, [2.0])
+
+        # Nothing is captured once the move is complete
+        pos.move(2.0)
+        self.assertEquals(len(capture.readback), 3)
+
+
+class DurationTests(SimScanTest):
+    def test_estimate(self):
+        m1 = SimPositioner(name='m1',
+                           motion_model=MotionModel(velocity=10.0))
+        m2 = SimPositioner(name='m2', position=1.0,
+                           motion_model=MotionModel(velocity=1.0))
+
+        scan = AScan()
+        scan.setup_scan([[m1, m2]], [[0, 1]], [[1, 1.5]], [4])
+        # The first point is a move of m1 only; m2 is the slowest after it
+        self.assertAlmostEqual(scan.estimated_duration, 0.5)
+
+        scan.settle_time = 0.05
+        self.assertAlmostEqual(scan.estimate_duration(), 0.75)
+
+    def test_scan(self):
+        m1 = SimPositioner(name='m1',
+                           motion_model=MotionModel(velocity=2.0))
+        det = SimDetector(name='det', value=1.0)
+
+        scan = self.make_scan(AScan, [det])
+        scan.setup_scan(m1, 0, 1, 4)
+
+        t0 = time.time()
+        scan.run()
+        self.assertAlmostEqual(time.time() - t0, scan.estimated_duration,
+                               places=1)
+
+
+def gaussian(x, center=1.3, sigma=0.5):
+    return np.exp(-(x - center) ** 2 / (2 * sigma ** 2))
+
+
+class AdaptiveScanTests(SimScanTest):
+    def test_refine_points(self):
+        x = np.linspace(-5, 5, 11)
+        points = refine_points(x, gaussian(x), 0.1)
+
+        # The peak and both half maximum crossings are bracketed
+        self.assertTrue(np.all(np.diff(points) > 0))
+        self.assertIn(1.5, points)
+        self.assertIn(0.5, points)
+        self.assertIn(2.5, points)
+        self.assertEquals(len(refine_points(x, gaussian(x), 1.0)), 0)
+
+    def test_scan(self):
+        m1 = SimPositioner(name='m1')
+        det = SimDetector(name='det', func=lambda: gaussian(m1.position))
+
+        scan = self.make_scan(AdaptiveScan, [det])
+        scan(m1, -5, 5, 20, det, 0.01)
+
+        x = np.sort(scan.last_data.m1)
+        self.assertEquals(scan.sink.documents['run_stop'][-1]['exit_status'],
+                          'success')
+        self.assertEquals(len(scan.sink.events), len(x))
+
+        # Far fewer points than a uniform scan at the resolution, with the
+        # maximum bracketed to within the resolution
+        self.assertLess(len(x), 100)
+        peak = np.argmax(gaussian(x))
+        self.assertLessEqual(x[peak + 1] - x[peak - 1], 2 * 0.01)
+
+        fwhm = 2 * np.sqrt(2 * np.log(2)) * 0.5
+        self.assertAlmostEqual(scan.stats['cen'][0], 1.3, delta=0.01)
+        self.assertAlmostEqual(scan.stats['width'], fwhm, delta=0.02)
+        self.assertTrue(scan._consumer is None)
+
+    def test_max_points(self):
+        m1 = SimPositioner(name='m1')
+        det = SimDetector(name='det', func=lambda: gaussian(m1.position))
+
+        scan = self.make_scan(AdaptiveScan, [det])
+        scan(m1, -5, 5, 20, det, 0.001, max_points=30)
+        self.assertEquals(len(scan.last_data.m1), 30)
+
+    def test_resolution(self):
+        m1 = SimPositioner(name='m1')
+        scan = AdaptiveScan()
+        self.assertRaises(ValueError, scan.setup_scan, m1, -5, 5, 20, 'det', 0)
+
+
+class PreparedScan(AScan):
+    '''Records the thread which prepared the scan'''
+    def prepare(self):
+        self.prepared_by = threading.current_thread().name
+        super(PreparedScan, self).prepare()
+
+
+class ScanQueueTests(SimScanTest):
+    def make_queue(self, *stops):
+        self.m1 = SimPositioner(name='m1', limits=(-1, 1),
+                                motion_model=MotionModel(velocity=2.0))
+        det = SimDetector(name='det', func=lambda: self.m1.position)
+
+        scan = self.make_scan(PreparedScan, [det])
+        queue = ScanQueue()
+        for stop in stops:
+            queue.add(scan, self.m1, 0, stop, 4)
+
+        return queue, scan
+
+    def run_stops(self, scan):
+        return [doc['exit_status']
+                for doc in scan.sink.documents['run_stop']]
+
+    def test_run(self):
+        queue, scan = self.make_queue(0.5, -0.5, 1.0)
+        self.assertEquals(len(queue), 3)
+
+        queue.run()
+        self.assertEquals(len(queue), 0)
+        self.assertEquals(self.run_stops(scan), ['success'] * 3)
+        self.assertEquals(self.m1.position, 1.0)
+
+        # Scans after the first were prepared while the previous one ran
+        assert_array_equal(queue.current.last_data.m1, np.linspace(0, 1, 5))
+        self.assertEquals(queue.current.prepared_by, 'ScanQueue')
+        self.assertTrue(scan._scan_args is None)
+
+    def test_error(self):
+        queue, scan = self.make_queue(0.5, 5.0, 1.0)
+
+        self.assertRaises(ValueError, queue.run)
+        self.assertEquals(self.run_stops(scan), ['success'])
+        self.assertEquals(len(queue), 1)
+
+        queue.run()
+        self.assertEquals(self.run_stops(scan), ['success'] * 2)
+
+    def test_pause(self):
+        queue, scan = self.make_queue(1.0, 0.0)
+
+        threading.Timer(0.1, scan._run_eng.pause).start()
+        queue.run()
+        self.assertTrue(queue.current.paused)
+        self.assertEquals(len(queue), 1)
+
+        queue.current.resume()
+        queue.run()
+        self.assertEquals(self.run_stops(scan), ['success'] * 2)
+        self.assertEquals(self.m1.position, 0.0)
+
+
+class FlyScanTests(SimScanTest):
+    def fly(self, scan, *args, **kwargs):
+        '''Run a fly scan, with the detector following the positioner'''
+        pos, start, stop = args[:3]
+        det = scan.detectors[0]
+        done = threading.Event()
+
+        def follow():
+            # The simulated positioner only updates its position at the end
+            # of a move, so the detector value is the expected position
+            while not done.is_set():
+                if pos.moving:
+                    fraction = (time.time() - t0) / duration
+                    det.put(start + min(fraction, 1.0) * (stop - start))
+                time.sleep(0.002)
+
+        duration = pos.estimate_move_time(stop, start)
+        t0 = time.time()
+        thread = threading.Thread(target=follow)
+        thread.start()
+        try:
+            scan(*args, **kwargs)
+        finally:
+            done.set()
+            thread.join()
+
+    def test_fly(self):
+        m1 = SimPositioner(name='m1',
+                           motion_model=MotionModel(velocity=5.0))
+        det = SimDetector(name='det', value=0.0)
+
+        scan = self.make_scan(FlyScan, [det])
+        self.fly(scan, m1, 0, 1, 10)
+
+        self.assertEquals(m1.position, 1)
+        self.assertGreater(len(scan.capture.detectors['det']), 10)
+        self.assertAlmostEqual(scan.estimated_duration, 0.2)
+
+        data = scan.last_data
+        assert_array_equal(data.m1, np.linspace(0, 1, 11))
+        self.assertTrue(np.allclose(data.det, data.m1, atol=0.2))
+
+        self.assertEquals([event['seq_num'] for event in scan.sink.events],
+                          list(range(11)))
+        self.assertEquals(scan.sink.documents['run_stop'][-1]['exit_status'],
+                          'success')
+        self.assertEquals(len(scan.logbook.entries), 1)
+        self.assertEquals(scan.peak_stats['det'].x, 'm1')
+
+    def test_pause(self):
+        m1 = SimPositioner(name='m1',
+                           motion_model=MotionModel(velocity=2.0))
+        det = SimDetector(name='det', value=0.0)
+
+        scan = self.make_scan(FlyScan, [det])
+        threading.Timer(0.1, scan._run_eng.pause).start()
+        self.fly(scan, m1, 0, 1, 4)
+
+        self.assertTrue(scan.paused)
+        self.assertEquals(scan.sink.events, [])
+        self.assertEquals(m1.position, 0)
+
+        scan.resume()
+        self.assertFalse(scan.paused)
+        self.assertEquals(m1.position, 1)
+        self.assertEquals([event['seq_num'] for event in scan.sink.events],
+                          list(range(5)))
+        self.assertEquals(scan.sink.documents['run_stop'][-1]['exit_status'],
+                          'success')
+
+    def test_abort(self):
+        m1 = SimPositioner(name='m1',
+                           motion_model=MotionModel(velocity=2.0))
+        det = SimDetector(name='det', value=0.0)
+
+        scan = self.make_scan(FlyScan, [det])
+        threading.Timer(0.1, scan._run_eng.pause).start()
+        self.fly(scan, m1, 0, 1, 4)
+
+        scan.abort()
+        self.assertEquals(scan.sink.events, [])
+        self.assertEquals(scan.sink.documents['run_stop'][-1]['exit_status'],
+                          'abort')
+
+
+class DryRunTests(SimScanTest):
+    def test_dry_run(self):
+        m1 = SimPositioner(name='m1', motion_model=MotionModel(velocity=1.0))
+        det = SimDetector(name='det', func=lambda: 2.0 * m1.position)
+
+        scan = self.make_scan(AScan, [det])
+        report = scan(m1, 0, 2, 4, dry_run=True, dwell_time=0.5)
+
+        # Nothing moved, counted or recorded
+        self.assertEquals(m1.position, 0)
+        self.assertEquals(scan.sink.events, [])
+        self.assertEquals(scan.logbook.entries, [])
+
+        self.assertEquals(report['points'], 5)
+        self.assertEquals(report['limit_violations'], [])
+        self.assertAlmostEqual(report['move_time'], 2.0)
+        self.assertAlmostEqual(report['dwell_time'], 2.5)
+        self.assertEquals(report['data_bytes'], 5 * (16 + 16))
+        self.assertAlmostEqual(report['duration'],
+                               report['move_time'] + report['settle_time'] +
+                               report['dwell_time'] + report['overhead'])
+
+    def test_violations(self):
+        m1 = SimPositioner(name='m1', limits=(-1, 1))
+        det = SimDetector(name='det', value=1.0)
+
+        scan = self.make_scan(AScan, [det])
+        scan.setup_scan(m1, 0, 2, 4)
+
+        def start_run(*args, **kwargs):
+            raise AssertionError('Points simulated despite limit violations')
+
+        scan._run_eng.start_run = start_run
+
+        report = scan.dry_run()
+        self.assertEquals(report['points'], 5)
+        self.assertEquals(len(report['limit_violations']), 1)
+        self.assertIn('m1', report['limit_violations'][0])
+        self.assertFalse('duration' in report)
+
+    def test_pseudo_violations(self):
+        real = SimPositioner(name='real', limits=(-0.5, 0.5))
+        pseudo = PseudoPositioner('pseudo', [real],
+                                  forward=lambda pseudo=0.0: [pseudo *
+                                                              (2 - pseudo)],
+                                  reverse=lambda real=0.0: [1 - real],
+                                  pseudo=['pseudo'])
+        real._set_position(0.0)
+
+        # The real positioner is within its limits at either end of the
+        # path, but not halfway
+        scan = self.make_scan(AScan)
+        scan.setup_scan(pseudo['pseudo'], 0, 2, 4)
+        violations = scan.limit_violations()
+
+        self.assertEquals(len(violations), 1)
+        self.assertIn('pseudo', violations[0])
+        self.assertRaises(ValueError, scan.check_paths)
+
+
+class GridPathTests(unittest.TestCase):
+    def test_mesh(self):
+        m1 = SimPositioner(name='m1')
+        m2 = SimPositioner(name='m2')
+        m3 = SimPositioner(name='m3')
+
+        scan = AScan()
+        scan.setup_scan([[m1, m2], m3], [[-10, -5], -2], [[10, 5], 2],
+                        [7, 4])
+
+        expected = mesh_paths([[-10, -5], [-2]], [[10, 5], [2]], [7, 4])
+        self.assertEquals(len(scan.paths), 3)
+        for path, ref in zip(scan.paths, expected):
+            self.assertTrue(isinstance(path, GridPath))
+            self.assertEquals(len(path), len(ref))
+            assert_array_equal(np.asarray(path), ref)
+            assert_array_equal(list(path), ref)
+            assert_array_equal(path[2:9:3], ref[2:9:3])
+            self.assertEquals(path[-1], ref[-1])
+            self.assertEquals(path.min(), ref.min())
+            self.assertEquals(path.max(), ref.max())
+
+        self.assertRaises(IndexError, lambda: scan.paths[0][len(expected[0])])
+
+    def test_chunks(self):
+        path = GridPath(0, 1, (3, 5), 1)
+        path.chunk_size = 4
+        assert_array_equal(list(path), np.tile(np.linspace(0, 1, 5), 3))
+
+    def test_offset(self):
+        path = GridPath(-1, 1, (4, ), 0)
+        shifted = path + 2.5
+        self.assertTrue(isinstance(shifted, GridPath))
+        assert_array_equal(np.asarray(shifted), np.linspace(-1, 1, 4) + 2.5)
+        assert_array_equal(np.asarray(shifted - 2.5), np.asarray(path))
+
+        m1 = SimPositioner(name='m1')
+        scan = DScan()
+        scan.setup_scan(m1, -1, 1, 4)
+        assert_array_equal(np.asarray(scan.paths[0]), np.linspace(-1, 1, 5))
+
+    def test_large(self):
+        m1 = SimPositioner(name='m1')
+        m2 = SimPositioner(name='m2')
+
+        scan = AScan()
+        scan.setup_scan([m1, m2], [-1, -1], [1, 1], [9999, 9999])
+
+        path = scan.paths[1]
+        self.assertEquals(len(path), 10000 ** 2)
+        self.assertEquals(path[10000 + 1], path[1])
+        self.assertEquals((path.min(), path.max()), (-1, 1))
+
+    def test_rewind(self):
+        pos = SimPositioner(name='pos')
+        path = GridPath(0, 1, (1000, 1000), 1)
+        pos.set_trajectory(path)
+
+        for i in range(1500):
+            pos.next_pos
+
+        pos.rewind_trajectory(1001)
+        self.assertEquals(pos.next_pos, path[1001])
+        self.assertTrue(pos._recent is None)
+
+    def test_move_time(self):
+        rng = np.random.RandomState(1)
+        for trial in range(50):
+            shape = [rng.randint(1, 6) for dim in range(rng.randint(1, 4))]
+
+            positioners, paths = [], []
+            for dim in range(len(shape)):
+                model = MotionModel(velocity=rng.rand() * 3 + 0.1,
+                                    acceleration=rng.rand() * 0.2,
+                                    backlash=rng.choice([0, 0.1, -0.2]))
+                positioners.append(SimPositioner(name='p%d' % dim,
+                                                 motion_model=model,
+                                                 position=rng.randn()))
+                paths.append(GridPath(rng.randn(), rng.randn(), shape, dim))
+
+            total = total_move_time(positioners, paths)
+            per_point = np.sum(point_move_times(positioners, paths))
+            self.assertAlmostEqual(total, per_point)
+
+
+if __name__ == '__main__':
+    unittest.main()
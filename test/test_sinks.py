@@ -0,0 +1,107 @@
+from __future__ import print_function
+
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+
+from ophyd.runengine import sinks
+from ophyd.runengine.sinks import (MemorySink, FileSink, SQLiteSink)
+from .test_runengine import make_run
+
+
+logger = logging.getLogger(__name__)
+
+
+def run_documents(sink, points=5):
+    '''Run a scan into a sink'''
+    run, scan_args, memory = make_run(points=points)
+    scan_args['sink'] = sink
+    run.start_run(1, scan_args=scan_args)
+    sink.close()
+
+
+class SinkTests(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_memory(self):
+        sink = MemorySink()
+        desc = sink.insert_event_descriptor({'uid': 'start'}, 0.0, {})
+        docs = sink.insert_events(desc, [{'time': 1.0, 'data': {'x': i},
+                                          'seq_num': i} for i in range(3)])
+
+        self.assertEquals(sink.events, docs)
+        self.assertEquals(set(doc['descriptor'] for doc in docs),
+                          set([desc['uid']]))
+        self.assertEquals(len(set(doc['uid'] for doc in docs)), 3)
+
+        sink.clear()
+        self.assertEquals(sink.documents['descriptor'], [])
+
+    def test_jsonl(self):
+        path = os.path.join(self.path, 'run.jsonl')
+        run_documents(FileSink(path))
+
+        with open(path) as f:
+            records = [json.loads(line) for line in f]
+
+        names = [name for name, doc in records]
+        self.assertEquals(names, ['run_start', 'descriptor'] +
+                          ['event'] * 5 + ['run_stop'])
+
+        events = [doc for name, doc in records if name == 'event']
+        self.assertEquals([event['seq_num'] for event in events],
+                          list(range(5)))
+        self.assertEquals(events[2]['data']['d'][0], 4.0)
+        self.assertEquals(records[-1][1]['exit_status'], 'success')
+
+    @unittest.skipIf(sinks.msgpack is None, 'msgpack is not available')
+    def test_msgpack(self):
+        path = os.path.join(self.path, 'run.msgpack')
+        sink = FileSink(path, format='msgpack')
+        sink.insert_event({'uid': 'desc'}, 1.0, {'x': np.arange(3)}, 0)
+        sink.close()
+
+        with open(path, 'rb') as f:
+            (name, doc), = list(sinks.msgpack.Unpacker(f, raw=False))
+
+        self.assertEquals(name, 'event')
+        self.assertEquals(doc['data']['x'], [0, 1, 2])
+
+    def test_format(self):
+        self.assertRaises(ValueError, FileSink,
+                          os.path.join(self.path, 'run.txt'), format='txt')
+
+    def test_sqlite(self):
+        path = os.path.join(self.path, 'runs.db')
+        run_documents(SQLiteSink(path), points=7)
+
+        conn = sqlite3.connect(path)
+        try:
+            rows = conn.execute('SELECT seq_num, data FROM events '
+                                'ORDER BY seq_num').fetchall()
+            status, = conn.execute('SELECT exit_status FROM '
+                                   'run_stops').fetchone()
+            descriptors, = conn.execute('SELECT COUNT(*) FROM '
+                                        'descriptors').fetchone()
+        finally:
+            conn.close()
+
+        self.assertEquals([seq_num for seq_num, data in rows],
+                          list(range(7)))
+        self.assertEquals(json.loads(rows[3][1])['m'][0], 3.0)
+        self.assertEquals(status, 'success')
+        self.assertEquals(descriptors, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
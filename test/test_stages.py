@@ -0,0 +1,219 @@
+from __future__ import print_function
+
+import logging
+import threading
+import time
+import unittest
+
+import epics
+
+from ophyd.controls.signal import (Signal, EpicsSignal, SignalGroup)
+from ophyd.runengine import stages
+from ophyd.runengine.runengine import RunEngine
+from ophyd.runengine.stages import (TriggerStage, DetectorReadout)
+from ophyd.utils import TimeoutError
+from .test_runengine import make_run
+
+
+logger = logging.getLogger(__name__)
+
+
+class FakePV(object):
+    '''A stand-in for epics.PV which completes puts after `delay` seconds'''
+    delay = 0.0
+
+    def __init__(self, pvname, callback=None, connection_callback=None,
+                 auto_monitor=None, form=None, **kwargs):
+        self.pvname = pvname
+        self.chid = pvname
+        self.ftype = 'native'
+        self.auto_monitor = auto_monitor
+        self.connected = True
+        self.value = None
+        self.timestamp = None
+        self.puts = []
+
+    def wait_for_connection(self, timeout=None):
+        return True
+
+    def get(self, **kwargs):
+        return self.value
+
+    def put(self, value, wait=False, timeout=30.0, use_complete=False,
+            callback=None, callback_data=None):
+        self.puts.append((value, use_complete))
+        self.value = value
+        self.timestamp = time.time()
+
+        if use_complete and callback is not None:
+            threading.Timer(self.delay, callback,
+                            kwargs={'pvname': self.pvname,
+                                    'data': callback_data}).start()
+
+
+class FakeCA(object):
+    '''A stand-in for epics.ca, reading time-stamped values from `iocs`'''
+    def __init__(self, iocs):
+        self.iocs = iocs
+        self.pending = []
+        self.flushes = 0
+
+    def promote_type(self, chid, use_time=False, use_ctrl=False):
+        return 'time' if use_time else 'native'
+
+    def get(self, chid, ftype=None, wait=True, **kwargs):
+        self.pending.append((chid, ftype))
+
+    def flush_io(self):
+        self.flushes += 1
+
+    def get_complete_with_metadata(self, chid, ftype=None, timeout=None,
+                                   **kwargs):
+        self.pending.remove((chid, 'time'))
+        value, timestamp = self.iocs[chid]
+        return {'value': value, 'timestamp': timestamp}
+
+
+def fake_signal(pvname, delay=0.0, **kwargs):
+    sig = EpicsSignal(pvname, **kwargs)
+    sig._write_pv.delay = delay
+    return sig
+
+
+class TriggerStageTests(unittest.TestCase):
+    def setUp(self):
+        self._pv_class = epics.PV
+        epics.PV = FakePV
+
+    def tearDown(self):
+        epics.PV = self._pv_class
+
+    def test_put_complete(self):
+        for put_complete in (False, True):
+            trig = fake_signal('trig', put_complete=put_complete)
+            TriggerStage([trig]).fire()
+            self.assertEquals(trig._write_pv.puts, [(1, True)])
+
+    def test_put_use_complete(self):
+        sig = fake_signal('sig')
+        sig.put(2, use_complete=True)
+        sig.put(3)
+        self.assertEquals(sig._write_pv.puts, [(2, True), (3, False)])
+
+    def test_parallel(self):
+        triggers = [fake_signal('trig%d' % i, delay=0.2) for i in range(3)]
+        triggers.append(Signal(name='plain'))
+
+        t0 = time.time()
+        TriggerStage(triggers).fire()
+        elapsed = time.time() - t0
+
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertLess(elapsed, 0.4)
+        self.assertEquals(triggers[-1].value, 1)
+
+    def test_groups(self):
+        a = fake_signal('a', delay=0.1)
+        b = fake_signal('b', delay=0.1)
+
+        t0 = time.time()
+        TriggerStage([[a], [b]], value=5).fire()
+        self.assertGreaterEqual(time.time() - t0, 0.2)
+        self.assertEquals(b._write_pv.puts, [(5, True)])
+
+    def test_timeout(self):
+        a = fake_signal('a', delay=0.05)
+        b = fake_signal('b', delay=1.0)
+
+        stage = TriggerStage([a, b], timeout={'b': 0.1})
+        self.assertRaises(TimeoutError, stage.fire)
+
+    def test_default_timeout(self):
+        a = fake_signal('a', delay=1.0)
+        self.assertEquals(TriggerStage([a])._timeouts, [[30.0]])
+
+        # Also for triggers missing from a dictionary of timeouts
+        stage = TriggerStage([a], timeout={'b': 2.0})
+        self.assertEquals(stage._timeouts, [[30.0]])
+
+    def test_stop(self):
+        a = fake_signal('a', delay=1.0)
+        stop_event = threading.Event()
+        threading.Timer(0.1, stop_event.set).start()
+
+        t0 = time.time()
+        stage = TriggerStage([a], stop_event=stop_event)
+        self.assertFalse(stage.fire())
+        self.assertLess(time.time() - t0, 0.5)
+
+
+class DetectorReadoutTests(unittest.TestCase):
+    def setUp(self):
+        self._pv_class = epics.PV
+        self._ca = stages.ca
+        epics.PV = FakePV
+        self.iocs = {}
+        stages.ca = FakeCA(self.iocs)
+
+    def tearDown(self):
+        epics.PV = self._pv_class
+        stages.ca = self._ca
+
+    def test_read(self):
+        monitored = fake_signal('mon', auto_monitor=True)
+        monitored._read_pv.value = 1.0
+        monitored._read_pv.timestamp = 100.0
+
+        fetched = [fake_signal('get%d' % i, auto_monitor=False)
+                   for i in range(3)]
+        for i, sig in enumerate(fetched):
+            self.iocs[sig._read_pv.chid] = (10.0 + i, 200.0 + i)
+
+        plain = Signal(name='plain', value=5)
+        readout = DetectorReadout([monitored, plain] + fetched)
+
+        values = readout.read()
+        self.assertEquals(values['mon'], {'value': 1.0, 'timestamp': 100.0})
+        for i, sig in enumerate(fetched):
+            self.assertEquals(values[sig.name],
+                              {'value': 10.0 + i, 'timestamp': 200.0 + i})
+
+        self.assertEquals(values['plain']['value'], 5)
+        self.assertEquals(len(values), 5)
+
+        # All gets were issued before any was collected
+        self.assertEquals(stages.ca.flushes, 1)
+        self.assertEquals(stages.ca.pending, [])
+
+    def test_group(self):
+        group = SignalGroup(name='group')
+        for i in range(2):
+            sig = fake_signal('sig%d' % i, auto_monitor=False)
+            self.iocs[sig._read_pv.chid] = (float(i), 300.0)
+            group.add_signal(sig)
+
+        readout = DetectorReadout([group])
+        self.assertEquals(readout.names, ['sig0', 'sig1'])
+        self.assertEquals(readout.read()['sig1'],
+                          {'value': 1.0, 'timestamp': 300.0})
+
+
+class ReadDelayTests(unittest.TestCase):
+    def run_settle(self, **kwargs):
+        run, scan_args, sink = make_run(points=5)
+        scan_args['triggers'] = [Signal(name='trig')]
+        scan_args.update(kwargs)
+        data = run.start_run(1, scan_args=scan_args)
+        return data.timings['settle']
+
+    def test_default(self):
+        settle = self.run_settle()
+        self.assertTrue(all(settle >= RunEngine.trigger_read_delay))
+
+    def test_read_delay(self):
+        settle = self.run_settle(read_delay=0)
+        self.assertTrue(all(settle < RunEngine.trigger_read_delay))
+
+
+if __name__ == '__main__':
+    unittest.main()
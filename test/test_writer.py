@@ -0,0 +1,107 @@
+from __future__ import print_function
+
+import logging
+import time
+import unittest
+
+from ophyd.runengine.writer import EventWriter
+
+
+logger = logging.getLogger(__name__)
+
+
+class Inserts(object):
+    '''Records inserted events, taking `delay` seconds per insert'''
+    def __init__(self, delay=0.0, fail_at=None):
+        self.delay = delay
+        self.fail_at = fail_at
+        self.events = []
+        self.batches = []
+
+    def _insert(self, events):
+        time.sleep(self.delay)
+        for event in events:
+            if event['seq_num'] == self.fail_at:
+                raise RuntimeError('Insert failed')
+
+            self.events.append(event)
+
+    def insert_event(self, **event):
+        self._insert([event])
+
+    def insert_events(self, event_descriptor, events):
+        self.batches.append((event_descriptor, len(events)))
+        self._insert(events)
+
+
+def enqueue(writer, count, descriptor='desc', start=0):
+    for seq_num in range(start, start + count):
+        writer.enqueue(descriptor, time.time(), {'x': seq_num}, seq_num)
+
+
+class EventWriterTests(unittest.TestCase):
+    def test_single(self):
+        inserts = Inserts()
+        writer = EventWriter(inserts.insert_event)
+        writer.start()
+
+        enqueue(writer, 20)
+        writer.stop()
+
+        self.assertEquals([event['seq_num'] for event in inserts.events],
+                          list(range(20)))
+        self.assertEquals(inserts.events[0]['event_descriptor'], 'desc')
+        self.assertEquals(writer.written, 20)
+        self.assertFalse(writer.running)
+
+    def test_batches(self):
+        inserts = Inserts(delay=0.05)
+        writer = EventWriter(inserts.insert_event, inserts.insert_events,
+                             batch_size=8)
+        writer.start()
+
+        enqueue(writer, 30)
+        writer.flush()
+        self.assertEquals(writer.depth, 0)
+
+        # Events pile up during the first (slow) insert, and are then
+        # inserted in as few batches as the batch size allows
+        self.assertEquals([event['seq_num'] for event in inserts.events],
+                          list(range(30)))
+        self.assertLessEqual(len(inserts.batches), 6)
+        self.assertTrue(all(size <= 8 for desc, size in inserts.batches))
+        self.assertEquals(writer.stats['written'], 30)
+        self.assertGreater(writer.max_depth, 8)
+        writer.stop()
+
+    def test_descriptors(self):
+        inserts = Inserts()
+        writer = EventWriter(inserts.insert_event, inserts.insert_events)
+
+        # Pending when the writer starts, so taken as a single batch
+        enqueue(writer, 3, 'a')
+        enqueue(writer, 2, 'b', start=3)
+        writer.start()
+        writer.stop()
+
+        # The batch is split where the descriptor changes
+        self.assertEquals(inserts.batches, [('a', 3), ('b', 2)])
+        self.assertEquals(len(inserts.events), 5)
+        self.assertFalse('event_descriptor' in inserts.events[0])
+
+    def test_error(self):
+        inserts = Inserts(fail_at=2)
+        writer = EventWriter(inserts.insert_event)
+        writer.start()
+
+        enqueue(writer, 5)
+        self.assertRaises(RuntimeError, writer.flush)
+        self.assertEquals(len(inserts.events), 2)
+
+        # Reported once
+        writer.flush()
+        writer.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()